@@ -0,0 +1,80 @@
+"""
+大尺寸 JPEG 缩小解码对比：完整解码 vs 按目标尺寸 draft 解码
+用法: python benchmark_draft_decode.py [重复次数]
+生成 2000x2667 / 4000x5333 / 6000x8000 的测试 JPEG，按默认上传优化参数（长边 1536）预处理，
+对比耗时和解码后的像素缓冲区大小（RGB，每像素 3 字节）
+"""
+
+import os
+import sys
+import time
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+from services.geometry import apply_plan, plan_geometry
+from services.image_pipeline import prepare_image, to_rgb
+from services.payload_optimizer import PayloadOptimizer
+
+SIZES = [(2000, 2667), (4000, 5333), (6000, 8000)]
+
+
+def make_test_jpeg(width: int, height: int) -> bytes:
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    step = height // 12
+    for i in range(12):
+        draw.rectangle((width // 16, i * step + 10, width - width // 16, i * step + step // 2), fill=(230, 180, 90))
+    noise = Image.frombytes("RGB", (256, 256), os.urandom(256 * 256 * 3)).resize((width, height))
+    img = Image.blend(img, noise, 0.05)
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def full_decode(data: bytes, optimizer: PayloadOptimizer) -> None:
+    """旧流程：先完整解码，再缩放填充"""
+    with Image.open(BytesIO(data)) as src:
+        plan = plan_geometry(src.size, max_long_edge=optimizer.max_long_edge)
+        optimizer.optimize(apply_plan(to_rgb(src), plan), source_bytes=len(data))
+
+
+def draft_decode(data: bytes, optimizer: PayloadOptimizer) -> None:
+    """新流程：prepare_image 按目标尺寸缩小解码"""
+    prepare_image(data, optimizer=optimizer)
+
+
+def decoded_mb(data: bytes, draft: bool) -> float:
+    """解码后的 RGB 像素缓冲区大小"""
+    with Image.open(BytesIO(data)) as src:
+        if draft:
+            src.draft("RGB", plan_geometry(src.size, max_long_edge=1536).content_size)
+        width, height = src.size
+    return width * height * 3 / (1024 * 1024)
+
+
+def measure(fn, data: bytes, repeat: int) -> float:
+    optimizer = PayloadOptimizer()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(data, optimizer)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    print(f"每种尺寸重复 {repeat} 次，上传长边上限 1536")
+    print(f"{'原图':<12}{'完整解码(ms)':>14}{'缩小解码(ms)':>14}{'加速':>8}{'解码内存(MB)':>18}")
+    for width, height in SIZES:
+        data = make_test_jpeg(width, height)
+        full_ms = measure(full_decode, data, repeat)
+        draft_ms = measure(draft_decode, data, repeat)
+        full_mb, draft_mb = decoded_mb(data, draft=False), decoded_mb(data, draft=True)
+        print(
+            f"{width}x{height:<7}{full_ms:>14.0f}{draft_ms:>14.0f}{full_ms / draft_ms:>7.1f}x"
+            f"{full_mb:>10.1f} -> {draft_mb:<6.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+输出编码配置对比：各配置的编码耗时与输出体积
+用法: python benchmark_output_profiles.py [图片路径] [重复次数]
+未指定图片时生成一张 1024x1536 的商品图风格测试图（渐变背景 + 文字块 + 噪点）
+"""
+
+import os
+import sys
+import time
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+from services.image_pipeline import to_rgb
+from services.output_profiles import available_profiles, encode_output
+
+
+def make_test_image() -> Image.Image:
+    width, height = 1024, 1536
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    for i in range(12):
+        top = 80 + i * 110
+        draw.rectangle((60, top, width - 60, top + 70), fill=(240 - i * 10, 200, 120 + i * 8))
+        draw.text((80, top + 20), "Товар высокого качества " * 2, fill=(20, 20, 20))
+    noise = Image.frombytes("RGB", (width, height), os.urandom(width * height * 3))
+    return Image.blend(img, noise, 0.04)
+
+
+def main():
+    if len(sys.argv) > 1:
+        with Image.open(sys.argv[1]) as src:
+            img = to_rgb(src)
+            img.load()
+    else:
+        img = make_test_image()
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    # 基线：旧流程的 JPEG quality=95
+    buffer = BytesIO()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        buffer = BytesIO()
+        img.save(buffer, format="JPEG", quality=95)
+    baseline_ms = (time.perf_counter() - start) / repeat * 1000
+    baseline_kb = len(buffer.getvalue()) / 1024
+
+    print(f"测试图 {img.size[0]}x{img.size[1]}，每个配置编码 {repeat} 次")
+    print(f"{'配置':<12}{'耗时(ms)':>10}{'体积(KB)':>10}{'相对基线':>10}")
+    print(f"{'jpeg_q95':<12}{baseline_ms:>10.1f}{baseline_kb:>10.1f}{'100%':>10}")
+    for name, profile in available_profiles().items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            data = encode_output(img, profile)
+        elapsed_ms = (time.perf_counter() - start) / repeat * 1000
+        size_kb = len(data) / 1024
+        print(f"{name:<12}{elapsed_ms:>10.1f}{size_kb:>10.1f}{size_kb / baseline_kb:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
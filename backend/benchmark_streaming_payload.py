@@ -0,0 +1,64 @@
+"""
+提交请求体峰值内存对比：旧流程（完整 base64 字符串 + data URL + json=）与流式请求体
+用法: python benchmark_streaming_payload.py [图片MB] [并发数]
+"""
+
+import asyncio
+import base64
+import os
+import sys
+import tracemalloc
+
+import httpx
+
+from services.streaming_payload import DATA_URL_PLACEHOLDER, StreamingJSONBody
+
+
+class DrainTransport(httpx.AsyncBaseTransport):
+    """像 socket 一样逐块消费请求体后丢弃，不在内存中累积"""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        async for _ in request.stream:
+            await asyncio.sleep(0)
+        return httpx.Response(200, json={"code": 200})
+
+
+def make_payload(image_url: str) -> dict:
+    return {"model": "gpt-4o-image", "prompt": "translate", "size": "1:1", "n": 1, "image_urls": [image_url]}
+
+
+async def submit_legacy(client: httpx.AsyncClient, data: bytes) -> None:
+    base64_data = base64.b64encode(data).decode("utf-8")
+    image_url = f"data:image/jpeg;base64,{base64_data}"
+    await client.post("https://api.fake/v1/images/generations", json=make_payload(image_url))
+
+
+async def submit_streaming(client: httpx.AsyncClient, data: bytes) -> None:
+    body = StreamingJSONBody(make_payload(DATA_URL_PLACEHOLDER), data, "image/jpeg")
+    await client.post("https://api.fake/v1/images/generations", content=body, headers=body.headers)
+
+
+async def measure(submit, payloads) -> float:
+    async with httpx.AsyncClient(transport=DrainTransport()) as client:
+        tracemalloc.start()
+        await asyncio.gather(*(submit(client, data) for data in payloads))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    payloads = [os.urandom(int(size_mb * 1024 * 1024)) for _ in range(concurrency)]
+    print(f"图片 {size_mb}MB x {concurrency} 并发提交（图片字节本身不计入峰值）")
+
+    legacy = asyncio.run(measure(submit_legacy, payloads))
+    streaming = asyncio.run(measure(submit_streaming, payloads))
+    print(f"旧流程峰值内存:   {legacy:8.1f} MB")
+    print(f"流式请求体峰值内存: {streaming:8.1f} MB")
+    print(f"节省: {legacy - streaming:.1f} MB ({(1 - streaming / legacy) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -24,7 +24,66 @@ class Settings:
         "TRANSLATION_PROMPT",
         "将图片中的文字替换为俄语"
     )
-    TRANSLATION_CONCURRENCY: int = int(os.getenv("TRANSLATION_CONCURRENCY", "5"))
+    TRANSLATION_CONCURRENCY: int = int(os.getenv("TRANSLATION_CONCURRENCY", "5"))  # 同时上传提交的任务数
+    PREPROCESS_CONCURRENCY: int = int(os.getenv("PREPROCESS_CONCURRENCY", str(os.cpu_count() or 2)))  # 本地预处理并发
+    MAX_INFLIGHT_TASKS: int = int(os.getenv("MAX_INFLIGHT_TASKS", "200"))  # 上游在途任务上限（已提交、未完成）
+
+    # AIMD 自适应并发：上游健康时逐步放大在途上限，429/5xx/超时时成倍收缩（上界为 MAX_INFLIGHT_TASKS）
+    ADAPTIVE_CONCURRENCY: bool = os.getenv("ADAPTIVE_CONCURRENCY", "true").lower() == "true"
+    ADAPTIVE_MIN_INFLIGHT: int = int(os.getenv("ADAPTIVE_MIN_INFLIGHT", "2"))
+    ADAPTIVE_INITIAL_INFLIGHT: int = int(os.getenv("ADAPTIVE_INITIAL_INFLIGHT", "20"))
+    ADAPTIVE_DECREASE_FACTOR: float = float(os.getenv("ADAPTIVE_DECREASE_FACTOR", "0.5"))
+    ADAPTIVE_LATENCY_TARGET: float = float(os.getenv("ADAPTIVE_LATENCY_TARGET", "10"))  # 健康响应的延迟上限（秒）
+    ADAPTIVE_COOLDOWN: float = float(os.getenv("ADAPTIVE_COOLDOWN", "5"))  # 两次收缩的最小间隔（秒）
+
+    # 上游熔断（提交 / 状态查询 / 下载 各自独立）
+    CIRCUIT_BREAKER_ENABLED: bool = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+    CIRCUIT_FAILURE_RATE: float = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))  # 触发熔断的错误率
+    CIRCUIT_MIN_REQUESTS: int = int(os.getenv("CIRCUIT_MIN_REQUESTS", "10"))  # 窗口内最少请求数
+    CIRCUIT_WINDOW_SECONDS: float = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "60"))  # 错误率统计窗口（秒）
+    CIRCUIT_OPEN_SECONDS: float = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))  # 熔断持续时间（秒）
+    CIRCUIT_HALF_OPEN_CALLS: int = int(os.getenv("CIRCUIT_HALF_OPEN_CALLS", "2"))  # 半开状态试探请求数
+
+    # 上游请求重试（指数退避 + 抖动，遵循 Retry-After）
+    RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))  # 单次请求最多尝试次数（含首次）
+    RETRY_BASE_DELAY: float = float(os.getenv("RETRY_BASE_DELAY", "0.5"))  # 退避基准时间（秒）
+    RETRY_MAX_DELAY: float = float(os.getenv("RETRY_MAX_DELAY", "20"))  # 单次退避上限（秒）
+    RETRY_BUDGET_PER_IMAGE: int = int(os.getenv("RETRY_BUDGET_PER_IMAGE", "8"))  # 每张图片累计重试次数上限
+
+    # 上传数据优化（API 输出约 1024-1536px，无需上传全分辨率原图）
+    PAYLOAD_OPTIMIZER_ENABLED: bool = os.getenv("PAYLOAD_OPTIMIZER_ENABLED", "true").lower() == "true"
+    PAYLOAD_MAX_EDGE: int = int(os.getenv("PAYLOAD_MAX_EDGE", "1536"))  # 上传图片长边上限（像素）
+    PAYLOAD_FORMAT: str = os.getenv("PAYLOAD_FORMAT", "jpeg")  # jpeg / webp / png
+    PAYLOAD_QUALITY: int = int(os.getenv("PAYLOAD_QUALITY", "90"))  # 初始编码质量
+    PAYLOAD_MIN_QUALITY: int = int(os.getenv("PAYLOAD_MIN_QUALITY", "60"))  # 压缩到预算时的最低质量
+    PAYLOAD_TARGET_KB: int = int(os.getenv("PAYLOAD_TARGET_KB", "1024"))  # 上传数据字节预算（KB）
+
+    # 翻译结果输出编码（批次未指定时的默认值）：ozon_jpeg / webp / png / avif
+    OUTPUT_PROFILE: str = os.getenv("OUTPUT_PROFILE", "ozon_jpeg")
+
+    # 图片处理进程池（预处理、结果裁剪/编码在独立进程中执行，不受 GIL 限制）
+    IMAGE_PROCESS_POOL_ENABLED: bool = os.getenv("IMAGE_PROCESS_POOL_ENABLED", "true").lower() == "true"
+    IMAGE_PROCESS_WORKERS: int = int(os.getenv("IMAGE_PROCESS_WORKERS", "0"))  # 工作进程数，0 表示 CPU 核数
+
+    # 上传文件保存：按块流式写盘，同时计算哈希、识别文件头
+    UPLOAD_CONCURRENCY: int = int(os.getenv("UPLOAD_CONCURRENCY", "4"))  # 同时保存的文件数
+
+    # 上传准入校验（扣积分之前只读文件头判断，不合格的文件不进入翻译流程、不扣积分）
+    ADMISSION_FORMATS: str = os.getenv("ADMISSION_FORMATS", "JPEG,PNG,WEBP,MPO")  # 允许的图片格式（PIL 格式名）
+    ADMISSION_MAX_FILE_MB: float = float(os.getenv("ADMISSION_MAX_FILE_MB", "30"))  # 单个文件大小上限（MB）
+    ADMISSION_MAX_PIXELS: int = int(os.getenv("ADMISSION_MAX_PIXELS", "50000000"))  # 像素数上限（防解压炸弹）
+    ADMISSION_MAX_EDGE: int = int(os.getenv("ADMISSION_MAX_EDGE", "20000"))  # 单边像素上限
+
+    # 长图分块翻译（仅原比例模式）：长边 / 短边达到阈值时切成重叠的 2:3 / 3:2 分块并发翻译再拼接
+    TILING_ENABLED: bool = os.getenv("TILING_ENABLED", "true").lower() == "true"
+    TILE_MIN_ASPECT: float = float(os.getenv("TILE_MIN_ASPECT", "2.0"))  # 触发分块的长宽比
+    TILE_OVERLAP: float = float(os.getenv("TILE_OVERLAP", "0.1"))  # 相邻分块最小重叠（占分块长边比例）
+    TILE_MAX_TILES: int = int(os.getenv("TILE_MAX_TILES", "8"))  # 单张图片分块数上限，超出按整图处理
+
+    # 按负载类型划分的线程池（互不占用，避免大图处理拖慢文件读写等请求），0 表示 CPU 核数
+    EXECUTOR_IMAGE_CPU_WORKERS: int = int(os.getenv("EXECUTOR_IMAGE_CPU_WORKERS", "0"))  # PIL 处理
+    EXECUTOR_DISK_IO_WORKERS: int = int(os.getenv("EXECUTOR_DISK_IO_WORKERS", "8"))  # 文件读写
+    EXECUTOR_ENCODING_WORKERS: int = int(os.getenv("EXECUTOR_ENCODING_WORKERS", "2"))  # 哈希等字节处理
     
     # 服务模式
     SERVICE_MODE: str = os.getenv("SERVICE_MODE", "real")  # mock 或 real
@@ -36,6 +95,30 @@ class Settings:
     # 任务轮询配置
     POLL_INTERVAL: float = float(os.getenv("POLL_INTERVAL", "3"))  # 轮询间隔（秒）
     POLL_MAX_ATTEMPTS: int = int(os.getenv("POLL_MAX_ATTEMPTS", "100"))  # 最大轮询次数
+    POLL_REQUEST_RATE: float = float(os.getenv("POLL_REQUEST_RATE", "10"))  # 全局状态查询速率（次/秒）
+    POLL_REQUEST_BURST: int = int(os.getenv("POLL_REQUEST_BURST", "20"))  # 全局状态查询突发数
+    POLL_ADAPTIVE: bool = os.getenv("POLL_ADAPTIVE", "true").lower() == "true"  # 按预测完成时间轮询
+    POLL_FIRST_DELAY: float = float(os.getenv("POLL_FIRST_DELAY", "15"))  # 无历史样本时首次查询延迟（秒）
+    POLL_MAX_INTERVAL: float = float(os.getenv("POLL_MAX_INTERVAL", "15"))  # 自适应轮询最大间隔（秒）
+
+    # 翻译结果缓存配置（相同图片 + 提示词 + 模式直接复用结果）
+    RESULT_CACHE_ENABLED: bool = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    RESULT_CACHE_DIR: str = os.getenv(
+        "RESULT_CACHE_DIR",
+        str(Path(__file__).parent / "data" / "result_cache")
+    )
+    RESULT_CACHE_MAX_MB: int = int(os.getenv("RESULT_CACHE_MAX_MB", "2048"))  # 磁盘预算（MB）
+
+    # 上游 HTTP 连接池配置
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))  # API 主机最大连接数
+    HTTP_CDN_MAX_CONNECTIONS: int = int(os.getenv("HTTP_CDN_MAX_CONNECTIONS", "50"))  # 结果图片 CDN 最大连接数
+    HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))  # 保持的空闲长连接数
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))  # 空闲长连接保留时间（秒）
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "false").lower() == "true"  # 需要安装 h2
+
+    # 上游提交限流（令牌桶，进程内所有批次共享）
+    UPSTREAM_SUBMIT_RATE: float = float(os.getenv("UPSTREAM_SUBMIT_RATE", "2"))  # 每秒提交数，<= 0 不限
+    UPSTREAM_SUBMIT_BURST: int = int(os.getenv("UPSTREAM_SUBMIT_BURST", "5"))  # 允许的突发提交数
 
     # 数据库配置
     DB_PATH: str = os.getenv(
@@ -43,6 +126,17 @@ class Settings:
         str(Path(__file__).parent / "data" / "app.db")
     )
     DB_URL: str = os.getenv("DATABASE_URL", f"sqlite:///{DB_PATH}")
+    DB_BUSY_TIMEOUT_MS: int = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))  # SQLite 写锁等待时间（毫秒）
+
+    # 翻译任务队列（批次和图片持久化在数据库中，工作循环按租约认领执行，重启后未完成的图片继续处理）
+    EMBEDDED_WORKER: bool = os.getenv("EMBEDDED_WORKER", "true").lower() == "true"  # Web 进程内是否运行工作循环（独立运行 python -m worker 时关闭）
+    JOB_WORKER_CONCURRENCY: int = int(os.getenv("JOB_WORKER_CONCURRENCY", "200"))  # 同时执行的图片数上限（实际按在途上限 + 预处理并发认领）
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))  # 队列为空时的轮询间隔（秒）
+    JOB_LEASE_SECONDS: int = int(os.getenv("JOB_LEASE_SECONDS", "120"))  # 租约时长，执行中定期续约
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))  # 单张图片最多执行次数（含租约过期后的重新认领）
+    JOB_RETRY_DELAY: float = float(os.getenv("JOB_RETRY_DELAY", "30"))  # 上游熔断导致失败时的重试间隔（秒）
+    JOB_RETENTION_SECONDS: int = int(os.getenv("JOB_RETENTION_SECONDS", "1800"))  # 批次完成后保留结果的时间（秒）
+    JOB_UPLOAD_TIMEOUT: float = float(os.getenv("JOB_UPLOAD_TIMEOUT", "3600"))  # 批次超过该时间仍未上传完成则取消（秒）
 
     # JWT 配置
     JWT_SECRET: str = os.getenv("JWT_SECRET", "dev-secret-change-me")
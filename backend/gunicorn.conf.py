@@ -10,6 +10,7 @@ bind = "0.0.0.0:8000"
 worker_class = "uvicorn.workers.UvicornWorker"
 
 # Worker 数量（生产环境建议使用多个，但这里先用 1 个便于调试）
+# 翻译容量不依赖这里的 worker 数量：设置 EMBEDDED_WORKER=false 并启动独立的工作进程（python -m worker）扩展
 workers = 1
 
 # 请求超时时间（5 分钟 = 300 秒）
@@ -8,9 +8,13 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from config import settings
 from routers import translate, auth, payments, admin
 from services.file_handler import ensure_temp_root_exists
 from services.db import init_db
+from services.executors import shutdown_executors
+from services.job_worker import start_job_worker, stop_job_worker
+from services.translation import get_translation_service, close_translation_service, peek_translation_service
 
 # 配置日志格式
 logging.basicConfig(
@@ -31,10 +35,22 @@ async def lifespan(app: FastAPI):
     init_db()
     logger.info("✅ 临时目录已就绪")
     
+    # 启动翻译任务队列的工作循环（继续处理重启前未完成的批次），并预热上游连接池和图片处理进程；
+    # 关闭时由独立的工作进程（python -m worker）执行翻译，Web 进程只负责接收上传和查询进度，
+    # 不预热（同步接口用到翻译服务时再按需创建连接和进程）
+    if settings.EMBEDDED_WORKER:
+        await get_translation_service().warmup()
+        start_job_worker()
+    else:
+        logger.info("未启用内嵌工作循环，翻译由独立的工作进程执行")
+    
     yield
     
     # 关闭时执行
     logger.info("👋 图片翻译服务正在关闭...")
+    await stop_job_worker()
+    await close_translation_service()
+    shutdown_executors()
 
 
 # 创建 FastAPI 应用
@@ -78,8 +94,17 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """健康检查端点"""
-    return {"status": "healthy"}
+    """健康检查端点（附带上游熔断状态）"""
+    # 只读取已存在的翻译服务：纯 Web 进程不为健康检查创建进程池和上游连接池
+    service = peek_translation_service()
+    if service is None:
+        return {"status": "healthy", "upstream": None, "upstream_source": "worker"}
+    breakers = service.metrics().get("circuit_breakers", {})
+    return {
+        "status": "healthy",
+        "upstream": {name: state["state"] for name, state in breakers.items()},
+        "upstream_source": "web",
+    }
 
 
 if __name__ == "__main__":
@@ -24,3 +24,53 @@ class Order(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     paid_at: Optional[datetime] = None
     notify_payload: Optional[str] = None
+
+
+class TranslationBatch(SQLModel, table=True):
+    """一次批量翻译请求（异步接口的 task_id）"""
+    id: str = Field(primary_key=True)
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True)
+    status: str = Field(default="uploading", index=True)  # uploading / processing / completed / cancelled
+    target_mode: str = Field(default="original")
+    output_profile: Optional[str] = None
+    total: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = Field(default=None, index=True)  # 到期后清理临时目录和记录
+
+
+class TranslationJob(SQLModel, table=True):
+    """批次中的单张图片（工作进程按租约认领执行）"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    batch_id: str = Field(foreign_key="translationbatch.id", index=True)
+    position: int  # 在批次中的上传顺序
+    status: str = Field(default="queued", index=True)  # queued / running / succeeded / failed / rejected / cancelled
+    original_name: str
+    input_path: Optional[str] = None
+    content_hash: Optional[str] = None
+    size: int = Field(default=0)
+    image_format: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    attempts: int = Field(default=0)
+    available_at: datetime = Field(default_factory=datetime.utcnow, index=True)  # 重试退避：此时间之后才可认领
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = Field(default=None, index=True)
+    output_name: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class WorkerHeartbeat(SQLModel, table=True):
+    """翻译任务工作循环的心跳（内嵌在 Web 进程或独立运行的 python -m worker）"""
+    worker_id: str = Field(primary_key=True)
+    hostname: str
+    pid: int
+    concurrency: int
+    running: int = Field(default=0)
+    succeeded: int = Field(default=0)
+    failed: int = Field(default=0)
+    started_at: datetime = Field(default_factory=datetime.utcnow)
+    last_seen_at: datetime = Field(default_factory=datetime.utcnow, index=True)
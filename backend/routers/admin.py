@@ -9,6 +9,11 @@ from config import settings
 from models.db_models import User, Order
 from routers.auth import get_current_user
 from services.db import get_session
+from services import job_queue
+from services.executors import executor_stats
+from services.job_worker import get_job_worker
+from services.result_cache import get_result_cache
+from services.translation import peek_translation_service
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
@@ -44,3 +49,23 @@ async def get_metrics(
         "dau": int(dau),
         "paid_amount": float(paid_amount or 0),
     }
+
+
+@router.get("/translation-metrics")
+async def get_translation_metrics(
+    session: Session = Depends(get_session),
+    user: User = Depends(require_admin_user),
+):
+    """翻译流水线运行指标（缓存命中率、限流器令牌与等待时间、任务队列积压等）"""
+    cache = get_result_cache()
+    worker = get_job_worker()
+    # 纯 Web 进程不创建翻译服务，翻译流水线指标由工作进程持有
+    service = peek_translation_service()
+    return {
+        "result_cache": cache.stats() if cache is not None else None,
+        **(service.metrics() if service is not None else {}),
+        "executors": executor_stats(),
+        "job_queue": job_queue.queue_stats(session),
+        "job_worker": worker.stats() if worker is not None else None,
+        "workers": job_queue.active_workers(session, settings.JOB_LEASE_SECONDS),
+    }
@@ -12,6 +12,7 @@ from sqlmodel import Session, select
 from config import settings
 from models.db_models import Order, User
 from routers.auth import get_current_user
+from services.credits import add_credits
 from services.db import get_session
 
 router = APIRouter(prefix="/api/payments", tags=["Payments"])
@@ -163,10 +164,8 @@ async def zpay_notify(
         order.paid_at = datetime.utcnow()
         order.notify_payload = json.dumps(payload, ensure_ascii=False)
 
-        user = session.exec(select(User).where(User.id == order.user_id)).first()
-        if user:
-            user.credits += order.credits
-            session.add(user)
+        # 原子增加：不覆盖同时进行的翻译请求扣除的积分
+        add_credits(session, order.user_id, order.credits)
 
         session.add(order)
         session.commit()
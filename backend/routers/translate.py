@@ -4,17 +4,22 @@
 """
 
 import asyncio
+import contextlib
 import logging
-import random
 import json
 import time
+import weakref
 from pathlib import Path
-from typing import List, Optional
-from fastapi import APIRouter, UploadFile, File, BackgroundTasks, HTTPException, Form, Depends
+from typing import Dict, List, Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends, Request, Response
 from fastapi.responses import StreamingResponse, FileResponse
 from pydantic import BaseModel
+from starlette.requests import ClientDisconnect
 
+from config import settings
+from services.admission import AdmissionPolicy, RejectedUpload, admit_or_reject
 from services.file_handler import (
+    SavedUpload,
     generate_request_id,
     get_temp_dir,
     save_all_upload_files,
@@ -22,19 +27,19 @@ from services.file_handler import (
     cleanup_temp_dir,
     TEMP_ROOT,
 )
-from services.translation import get_translation_service, TranslationService
-from services.task_manager import (
-    TaskStatus,
-    save_task_status,
-    load_task_status,
-    delete_task_status,
-    ensure_task_status_dir
-)
+from services import job_queue
+from services.credits import charge_credits
+from services.executors import IMAGE_CPU, run_in
+from services.job_worker import notify_job_worker
+from services.output_profiles import available_profiles, media_type_for
+from services.translation import get_translation_service, peek_translation_service, TranslationService
+from services.upload_stream import MultipartError, iter_multipart_uploads
+from services.variants import parse_variant_spec, render_variant, variant_etag, variant_path
 from sqlmodel import Session
 
 from models.db_models import User
 from routers.auth import get_current_user
-from services.db import get_session
+from services.db import get_session, run_db
 
 # #region agent log
 # Debug logging helper
@@ -60,19 +65,6 @@ def log_debug(location, message, data=None, hypothesis_id=None):
 logger = logging.getLogger(__name__)
 
 
-async def delayed_cleanup(request_id: str, delay_seconds: int = 1800):
-    """
-    延迟清理临时目录
-    
-    Args:
-        request_id: 请求ID
-        delay_seconds: 延迟时间（秒），默认30分钟
-    """
-    await asyncio.sleep(delay_seconds)
-    cleanup_temp_dir(request_id)
-    logger.info(f"[{request_id}] 已执行延迟清理")
-
-
 # 响应模型
 class TranslatedImage(BaseModel):
     """翻译后的图片信息"""
@@ -97,51 +89,71 @@ logger = logging.getLogger(__name__)
 # 创建路由器
 router = APIRouter(prefix="/api", tags=["翻译"])
 
-# 并发控制：最多同时处理 20 个翻译任务
-MAX_CONCURRENT_TASKS = 20
-semaphore = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+def validate_output_profile(output_profile: Optional[str]) -> None:
+    """校验批次指定的输出格式，不支持时返回 400"""
+    if output_profile and output_profile not in available_profiles():
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的输出格式: {output_profile}，可选: {', '.join(available_profiles())}"
+        )
+
+
+def no_valid_files_error(rejected: List[RejectedUpload]) -> HTTPException:
+    """没有文件通过准入校验时的 400 响应（附前几个文件的拒绝原因）"""
+    reasons = "; ".join(f"{item.original_name}: {item.reason}" for item in rejected[:5])
+    return HTTPException(status_code=400, detail=f"没有有效的文件可处理{f' ({reasons})' if reasons else ''}")
+
+
+def rejected_image(item: RejectedUpload) -> TranslatedImage:
+    """被拒绝文件在结果列表中的记录"""
+    return TranslatedImage(
+        original_name=item.original_name,
+        translated_name="",
+        file_path="",
+        status="failed",
+        error=item.reason
+    )
 
 
 async def process_single_image(
     input_path: Path,
     output_dir: Path,
     service: TranslationService,
-    delay: float = 0.0,
-    target_mode: str = "original"
+    target_mode: str = "original",
+    output_profile: Optional[str] = None,
+    upload: Optional[SavedUpload] = None
 ) -> Path | None:
     """
-    处理单张图片（受信号量控制 + 错峰延迟）
+    处理单张图片
+    并发由翻译服务分阶段控制（预处理 / 提交 / 上游在途），提交速率由共享令牌桶限流
     
     Args:
         input_path: 输入图片路径
         output_dir: 输出目录
         service: 翻译服务实例
-        delay: 启动延迟（秒），用于错峰发送
         target_mode: 输出模式
+        output_profile: 输出编码配置
+        upload: 上传文件元数据（内容哈希、尺寸）
         
     Returns:
         成功返回输出路径，失败返回 None
     """
-    # 错峰延迟：避免瞬时并发造成网络拥堵
-    if delay > 0:
-        logger.info(f"[错峰] {input_path.name} 将在 {delay:.1f}秒后开始处理")
-        await asyncio.sleep(delay)
-    
-    async with semaphore:
-        try:
-            result = await service.translate(input_path, output_dir, target_mode=target_mode)
-            return result
-        except Exception as e:
-            logger.error(f"翻译失败 {input_path.name}: {e}", exc_info=True)
-            # 返回 Exception 以便上层获取错误信息
-            return e
+    try:
+        result = await service.translate(
+            input_path, output_dir, target_mode=target_mode, output_profile=output_profile, upload=upload
+        )
+        return result
+    except Exception as e:
+        logger.error(f"翻译失败 {input_path.name}: {e}", exc_info=True)
+        # 返回 Exception 以便上层获取错误信息
+        return e
 
 
 @router.post("/translate-bulk", response_model=TranslationResponse)
 async def translate_bulk(
-    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(..., description="要翻译的图片文件列表"),
     target_mode: str = Form("original", description="输出模式：original 或 ozon_3_4"),
+    output_profile: Optional[str] = Form(None, description="输出格式：ozon_jpeg / webp / png / avif"),
     user: User = Depends(get_current_user),
     session: Session = Depends(get_session),
 ):
@@ -151,9 +163,12 @@ async def translate_bulk(
     接收多张图片，并发调用翻译服务，返回翻译结果信息。
     
     - **files**: 图片文件列表 (支持 jpg, png, webp 等格式)
+    - **output_profile**: 输出格式（默认使用服务配置）
     
     返回: 翻译结果列表 (包含文件路径，用于后续下载)
     """
+    validate_output_profile(output_profile)
+    
     # #region agent log
     start_time = time.time()
     log_debug('translate.py:140', 'Request received', {'file_count': len(files), 'start_time': start_time}, 'H4')
@@ -169,40 +184,47 @@ async def translate_bulk(
     
     logger.info(f"[{request_id}] 开始处理批量翻译请求，共 {len(files)} 个文件")
     
-    # 检查并扣除积分
-    if user.credits < len(files):
-        raise HTTPException(status_code=403, detail="积分不足 (Insufficient credits)")
-    user.credits -= len(files)
-    session.add(user)
-    session.commit()
-
+    # 上游熔断中：在扣除积分前快速失败
+    translation_service = get_translation_service()
+    if not translation_service.is_available():
+        cleanup_temp_dir(request_id)
+        raise HTTPException(status_code=503, detail="翻译服务暂时不可用，请稍后重试 (Upstream unavailable)")
+    
     try:
         # 2. 保存上传的文件到临时输入目录
-        saved_files = await save_all_upload_files(files, input_dir)
+        saved_files = await save_all_upload_files(files, input_dir, concurrency=settings.UPLOAD_CONCURRENCY)
+        
+        # 准入校验（只读文件头）：不合格的文件不翻译、不扣积分
+        admission = AdmissionPolicy.from_settings()
+        checked = await asyncio.gather(*(admit_or_reject(upload, admission) for upload in saved_files))
+        saved_files = [item for item in checked if isinstance(item, SavedUpload)]
+        rejected = [item for item in checked if isinstance(item, RejectedUpload)]
         
         if not saved_files:
-            logger.error(f"[{request_id}] 没有成功保存任何文件")
-            cleanup_temp_dir(request_id)
-            return {"error": "没有有效的文件可处理"}
+            logger.error(f"[{request_id}] 没有通过校验的文件")
+            raise no_valid_files_error(rejected)
         
-        logger.info(f"[{request_id}] 已保存 {len(saved_files)} 个文件")
+        logger.info(f"[{request_id}] 已保存 {len(saved_files)} 个文件，拒绝 {len(rejected)} 个")
         
-        # 3. 获取翻译服务并创建并发任务（错峰发送）
-        translation_service = get_translation_service()
+        # 检查并扣除积分（只按通过校验的文件计；条件更新，并发请求不会透支）
+        if not charge_credits(session, user.id, len(saved_files)):
+            raise HTTPException(status_code=403, detail="积分不足 (Insufficient credits)")
+        session.commit()
         
-        # 为每个任务分配递增的延迟（1-2秒随机间隔），避免瞬时并发
+        # 3. 创建并发任务（提交速率由共享令牌桶控制）
         tasks = [
             process_single_image(
-                file_path, 
+                upload.path, 
                 output_dir, 
                 translation_service,
-                delay=i * random.uniform(1.0, 2.0),  # 每个任务延迟递增
-                target_mode=target_mode
+                target_mode=target_mode,
+                output_profile=output_profile,
+                upload=upload
             )
-            for i, file_path in enumerate(saved_files)
+            for upload in saved_files
         ]
         
-        logger.info(f"[{request_id}] 已创建 {len(tasks)} 个翻译任务（错峰模式）")
+        logger.info(f"[{request_id}] 已创建 {len(tasks)} 个翻译任务")
         
         # 4. 并发执行所有翻译任务，记录每个任务的结果
         results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -212,13 +234,13 @@ async def translate_bulk(
         success_count = 0
         fail_count = 0
         
-        for i, (result, original_file) in enumerate(zip(results, saved_files)):
+        for i, (result, upload) in enumerate(zip(results, saved_files)):
             if isinstance(result, Exception) or result is None:
                 # 翻译失败
                 fail_count += 1
                 error_msg = str(result) if isinstance(result, Exception) else "未知错误"
                 translated_images.append(TranslatedImage(
-                    original_name=original_file.name,
+                    original_name=upload.path.name,
                     translated_name="",
                     file_path="",
                     status="failed",
@@ -230,12 +252,16 @@ async def translate_bulk(
                 # 生成可访问的文件路径 (相对于 TEMP_ROOT)
                 relative_path = f"{request_id}/output/{result.name}"
                 translated_images.append(TranslatedImage(
-                    original_name=original_file.name,
+                    original_name=upload.path.name,
                     translated_name=result.name,
                     file_path=relative_path,
                     status="success"
                 ))
         
+        # 未通过校验的文件记为失败
+        translated_images.extend(rejected_image(item) for item in rejected)
+        fail_count += len(rejected)
+        
         logger.info(f"[{request_id}] 翻译完成: 成功 {success_count}, 失败 {fail_count}")
         
         # #region agent log
@@ -250,8 +276,8 @@ async def translate_bulk(
         }, 'H4')
         # #endregion
         
-        # 6. 注册后台清理任务（30分钟后清理，给用户时间下载）
-        background_tasks.add_task(delayed_cleanup, request_id, 1800)
+        # 6. 登记到期清理（保留一段时间供用户下载，由任务队列的工作循环清理）
+        await run_db(job_queue.schedule_cleanup, request_id, settings.JOB_RETENTION_SECONDS, user_id=user.id)
         
         # 7. 返回翻译结果
         return TranslationResponse(
@@ -343,10 +369,65 @@ async def download_file(file_path: str):
     return FileResponse(
         path=full_path,
         filename=full_path.name,
-        media_type="image/jpeg"
+        media_type=media_type_for(full_path.name)
     )
 
 
+# 同一派生图片的并发请求只渲染一次（弱引用：没有请求持有时锁自动释放，不会残留）
+_variant_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+@router.get("/variants/{file_path:path}")
+async def get_image_variant(
+    file_path: str,
+    request: Request,
+    w: Optional[int] = None,
+    h: Optional[int] = None,
+    fmt: str = "webp",
+    q: Optional[int] = None,
+):
+    """
+    获取翻译结果的派生图片（缩略图 / 缩放 / 转格式）
+    
+    - **file_path**: 文件路径 (格式: request_id/output/filename)
+    - **w** / **h**: 外接框宽高（白名单取值，保持比例，不放大）
+    - **fmt**: 输出格式 webp / jpeg / png
+    - **q**: 质量（白名单取值）
+    
+    首次请求时渲染并缓存，之后直接返回缓存文件；支持 ETag / If-None-Match
+    """
+    try:
+        spec = parse_variant_spec(w, h, fmt, q)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # 安全检查：只允许访问 TEMP_ROOT 内各请求 output 目录下的文件
+    full_path = (TEMP_ROOT / file_path).resolve()
+    if not str(full_path).startswith(str(TEMP_ROOT.resolve())) or full_path.parent.name != "output":
+        logger.warning(f"非法文件访问尝试: {file_path}")
+        raise HTTPException(status_code=403, detail="非法文件路径")
+    if not full_path.is_file():
+        raise HTTPException(status_code=404, detail="文件不存在")
+    
+    etag = variant_etag(full_path, spec)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=3600"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    cached_path = variant_path(full_path, spec)
+    if not cached_path.exists() or cached_path.stat().st_mtime < full_path.stat().st_mtime:
+        lock = _variant_locks.setdefault(str(cached_path), asyncio.Lock())
+        async with lock:
+            if not cached_path.exists() or cached_path.stat().st_mtime < full_path.stat().st_mtime:
+                try:
+                    await run_in(IMAGE_CPU, render_variant, full_path, spec)
+                except Exception as e:
+                    logger.error(f"生成派生图片失败 {file_path}: {e}")
+                    raise HTTPException(status_code=422, detail="无法生成该图片的派生版本")
+    
+    return FileResponse(path=cached_path, media_type=spec.media_type, headers=headers)
+
+
 # ============================================
 # 异步翻译接口（新增）
 # ============================================
@@ -370,186 +451,180 @@ class TaskStatusResponse(BaseModel):
     error: Optional[str] = None
 
 
-async def background_translate_task(
-    task_id: str,
-    saved_files: List[Path],
-    output_dir: Path,
-    target_mode: str = "original"
-):
-    """
-    后台翻译任务
-    
-    Args:
-        task_id: 任务ID
-        saved_files: 已保存的文件列表
-        output_dir: 输出目录
-        target_mode: 输出模式
-    """
-    from config import settings
-    
-    try:
-        # 初始化任务状态
-        task_status = TaskStatus(
-            task_id=task_id,
-            status="processing",
-            total=len(saved_files),
-            processed=0,
-            success=0,
-            failed=0,
-            images=[]
-        )
-        await save_task_status(task_status)
-        
-        logger.info(f"[{task_id}] 后台翻译任务开始")
-        
-        # 获取翻译服务
-        translation_service = get_translation_service()
-        
-        # 为每个任务分配递增的延迟
-        tasks = [
-            process_single_image(
-                file_path,
-                output_dir,
-                translation_service,
-                delay=i * random.uniform(1.0, 2.0),
-                target_mode=target_mode
-            )
-            for i, file_path in enumerate(saved_files)
-        ]
-        
-        # 执行翻译
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # 构建结果
-        translated_images = []
-        success_count = 0
-        fail_count = 0
-        
-        for result, original_file in zip(results, saved_files):
-            if isinstance(result, Exception) or result is None:
-                fail_count += 1
-                error_msg = str(result) if isinstance(result, Exception) else "未知错误"
-                translated_images.append({
-                    "original_name": original_file.name,
-                    "translated_name": "",
-                    "file_path": "",
-                    "status": "failed",
-                    "error": error_msg
-                })
-            else:
-                success_count += 1
-                relative_path = f"{task_id}/output/{result.name}"
-                translated_images.append({
-                    "original_name": original_file.name,
-                    "translated_name": result.name,
-                    "file_path": relative_path,
-                    "status": "success"
-                })
-        
-        # 更新任务状态为完成
-        task_status.status = "completed"
-        task_status.processed = len(saved_files)
-        task_status.success = success_count
-        task_status.failed = fail_count
-        task_status.images = translated_images
-        await save_task_status(task_status)
-        
-        logger.info(f"[{task_id}] 后台翻译任务完成: 成功 {success_count}, 失败 {fail_count}")
-        
-        # 30分钟后清理
-        await asyncio.sleep(1800)
-        cleanup_temp_dir(task_id)
-        await delete_task_status(task_id)
-        
-    except Exception as e:
-        logger.error(f"[{task_id}] 后台翻译任务失败: {e}", exc_info=True)
-        # 更新任务状态为失败
-        task_status = TaskStatus(
-            task_id=task_id,
-            status="failed",
-            total=len(saved_files),
-            processed=0,
-            success=0,
-            failed=len(saved_files),
-            images=[],
-            error=str(e)
-        )
-        await save_task_status(task_status)
-
-
-@router.post("/translate-bulk-async", response_model=AsyncTranslationSubmitResponse)
+# 异步接口可识别的表单字段及默认值
+_ASYNC_FORM_DEFAULTS = {"target_mode": "original", "output_profile": None}
+
+
+@router.post(
+    "/translate-bulk-async",
+    response_model=AsyncTranslationSubmitResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["files"],
+                        "properties": {
+                            "target_mode": {"type": "string", "default": "original", "description": "输出模式"},
+                            "output_profile": {"type": "string", "description": "输出格式：ozon_jpeg / webp / png / avif"},
+                            "files": {"type": "array", "items": {"type": "string", "format": "binary"},
+                                      "description": "要翻译的图片文件列表"},
+                        },
+                    }
+                }
+            },
+        }
+    },
+)
 async def translate_bulk_async(
-    background_tasks: BackgroundTasks,
-    files: List[UploadFile] = File(..., description="要翻译的图片文件列表"),
-    target_mode: str = Form("original", description="输出模式"),
+    request: Request,
     user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
 ):
     """
     批量翻译图片接口（异步版本）
     
-    立即返回任务ID，翻译在后台进行
-    前端通过轮询 /api/task-status/{task_id} 获取进度
+    边上传边翻译：请求体按流式解析，每个文件写入磁盘后立即进入持久化的任务队列，
+    由工作循环认领翻译，上传耗时与上游处理耗时重叠；请求体接收完毕后返回任务ID，
+    前端通过轮询 /api/task-status/{task_id} 获取进度。服务重启不会丢失已提交的批次
     
+    - **target_mode** / **output_profile**: 表单字段，顺序不限；全部放在文件之前时收到第一个文件即开始翻译，
+      否则已入队的文件等到参数确定（收齐字段或请求体结束）后再翻译
     - **files**: 图片文件列表 (支持 jpg, png, webp 等格式)
     
+    每个文件写完后先做准入校验（格式、大小、像素数，只读文件头），不合格的文件不翻译、不扣积分；
+    积分在文件入队时逐个扣除，积分用完后剩余的文件不再处理；上传中断时退还尚未开始翻译的文件的积分
+    
     返回: 任务ID和状态
     """
-    # 确保任务状态目录存在
-    ensure_task_status_dir()
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith("multipart/form-data"):
+        raise HTTPException(status_code=400, detail="请求须为 multipart/form-data")
     
     # 生成任务ID
     task_id = generate_request_id()
-    input_dir, output_dir = get_temp_dir(task_id)
+    input_dir, _ = get_temp_dir(task_id)
     
-    logger.info(f"[{task_id}] 接收异步翻译请求，共 {len(files)} 个文件")
+    logger.info(f"[{task_id}] 接收异步翻译请求")
+
+    # 上游熔断中：在扣除积分前快速失败（纯 Web 进程不创建翻译服务，熔断由工作进程处理）
+    service = peek_translation_service()
+    if service is not None and not service.is_available():
+        cleanup_temp_dir(task_id)
+        raise HTTPException(status_code=503, detail="翻译服务暂时不可用，请稍后重试 (Upstream unavailable)")
 
-    # 检查并扣除积分
-    if user.credits < len(files):
+    if user.credits < 1:
+        cleanup_temp_dir(task_id)
         raise HTTPException(status_code=403, detail="积分不足 (Insufficient credits)")
-    user.credits -= len(files)
-    session.add(user)
-    session.commit()
+    
+    form = dict(_ASYNC_FORM_DEFAULTS)
+    received_fields = set()
+    batch_created = False
+    # 参数是否已确定（确定后入队的图片才会被认领）
+    batch_open = False
+    position = 0
+    accepted = 0
+    rejected: List[RejectedUpload] = []
+    admission = AdmissionPolicy.from_settings()
     
     try:
-        # 保存上传的文件
-        saved_files = await save_all_upload_files(files, input_dir)
+        # 边接收边保存，每个文件写完立即入队
+        uploads = iter_multipart_uploads(content_type, request.stream(), input_dir, admission=admission)
+        async with contextlib.aclosing(uploads):
+            async for name, value in uploads:
+                if isinstance(value, str):
+                    if name not in form:
+                        continue
+                    value = value or _ASYNC_FORM_DEFAULTS[name]
+                    if batch_open:
+                        # 参数已确定且可能已有图片在翻译，重复的字段不能再改变取值
+                        if value != form[name]:
+                            raise HTTPException(status_code=400, detail=f"表单字段 {name} 重复且取值不同")
+                        continue
+                    form[name] = value
+                    received_fields.add(name)
+                    validate_output_profile(form["output_profile"])
+                    if batch_created and received_fields == form.keys():
+                        await run_db(job_queue.open_batch, task_id, form["target_mode"], form["output_profile"])
+                        batch_open = True
+                    continue
+                
+                if name != "files":
+                    if isinstance(value, SavedUpload):
+                        value.path.unlink(missing_ok=True)
+                    continue
+                
+                if not batch_created:
+                    # 字段已收齐时立即开始翻译；否则先保存并入队，参数确定后再翻译
+                    batch_open = received_fields == form.keys()
+                    await run_db(
+                        job_queue.create_batch, task_id, user_id=user.id,
+                        target_mode=form["target_mode"], output_profile=form["output_profile"],
+                        held=not batch_open
+                    )
+                    batch_created = True
+                
+                if isinstance(value, SavedUpload):
+                    value = await admit_or_reject(value, admission)
+                if isinstance(value, SavedUpload):
+                    # 入队时预扣积分（与入队同一事务）：积分不足的文件不翻译
+                    if await run_db(job_queue.enqueue_upload, task_id, position, value) is None:
+                        value.path.unlink(missing_ok=True)
+                        value = RejectedUpload(value.original_name, "积分不足 (Insufficient credits)")
+                
+                if isinstance(value, RejectedUpload):
+                    await run_db(job_queue.record_rejected, task_id, position, value)
+                    rejected.append(value)
+                else:
+                    accepted += 1
+                    notify_job_worker()
+                    logger.info(f"[{task_id}] 第 {accepted} 个文件已保存并入队: {value.path.name}")
+                position += 1
         
-        if not saved_files:
-            logger.error(f"[{task_id}] 没有成功保存任何文件")
-            cleanup_temp_dir(task_id)
-            raise HTTPException(status_code=400, detail="没有有效的文件可处理")
-        
-        logger.info(f"[{task_id}] 已保存 {len(saved_files)} 个文件")
+        if not accepted:
+            logger.error(f"[{task_id}] 没有通过校验的文件")
+            raise no_valid_files_error(rejected)
         
-        # 初始化任务状态为 pending
-        initial_status = TaskStatus(
-            task_id=task_id,
-            status="pending",
-            total=len(saved_files),
-            processed=0,
-            success=0,
-            failed=0,
-            images=[]
-        )
-        await save_task_status(initial_status)
+        # 请求体结束：未出现的字段使用默认值
+        if not batch_open:
+            await run_db(job_queue.open_batch, task_id, form["target_mode"], form["output_profile"])
         
-        # 将翻译任务添加到后台
-        background_tasks.add_task(background_translate_task, task_id, saved_files, output_dir, target_mode)
+        # 上传完成：批次进入处理中（积分已在入队时扣除）
+        charged = await run_db(job_queue.seal_batch, task_id, settings.JOB_RETENTION_SECONDS)
+        if charged is None:
+            raise HTTPException(status_code=408, detail="上传超时，批次已取消 (Upload timed out)")
         
-        logger.info(f"[{task_id}] 翻译任务已提交到后台队列")
+        logger.info(
+            f"[{task_id}] 上传完成，已入队 {accepted} 个文件"
+            f"{f'，拒绝 {len(rejected)} 个' if rejected else ''}"
+        )
         
+        message = f"翻译任务已提交，共 {accepted} 个文件"
+        if rejected:
+            message += f"（{len(rejected)} 个文件未通过校验或积分不足，未处理）"
         return AsyncTranslationSubmitResponse(
             task_id=task_id,
-            status="pending",
-            message=f"翻译任务已提交，共 {len(saved_files)} 个文件"
+            status="processing",
+            message=message
         )
         
-    except HTTPException:
-        raise
-    except Exception as e:
+    except BaseException as e:
+        # 请求未完成：取消批次（排队中的图片不再执行并退还积分），只按已开始执行的图片扣积分
+        if batch_created:
+            await run_db(job_queue.cancel_batch, task_id, settings.JOB_RETENTION_SECONDS)
+        else:
+            cleanup_temp_dir(task_id)
+        if isinstance(e, HTTPException):
+            raise
+        if isinstance(e, MultipartError):
+            raise HTTPException(status_code=400, detail=str(e))
+        if isinstance(e, ClientDisconnect):
+            logger.warning(f"[{task_id}] 客户端在上传过程中断开，批次已取消")
+            raise HTTPException(status_code=400, detail="上传中断 (Client disconnected)")
+        if not isinstance(e, Exception):
+            raise
         logger.error(f"[{task_id}] 提交翻译任务失败: {e}", exc_info=True)
-        cleanup_temp_dir(task_id)
         raise HTTPException(status_code=500, detail=f"提交任务失败: {str(e)}")
 
 
@@ -560,23 +635,11 @@ async def get_task_status(task_id: str):
     
     - **task_id**: 任务ID
     
-    返回: 任务状态和进度
+    返回: 任务状态和进度（已结束的图片结果按上传顺序列出）
     """
-    status = await load_task_status(task_id)
+    status = await run_db(job_queue.batch_status, task_id)
     
     if not status:
         raise HTTPException(status_code=404, detail="任务不存在")
     
-    # 转换为响应模型
-    images = [TranslatedImage(**img) for img in status.images]
-    
-    return TaskStatusResponse(
-        task_id=status.task_id,
-        status=status.status,
-        total=status.total,
-        processed=status.processed,
-        success=status.success,
-        failed=status.failed,
-        images=images,
-        error=status.error
-    )
+    return TaskStatusResponse(**status)
@@ -0,0 +1,114 @@
+"""
+AIMD 自适应并发控制
+上游健康（请求成功且延迟达标）时线性增加在途任务上限，
+遇到 429 / 5xx / 超时 / 连接中断时按比例收缩，避免在上游降级时继续施压
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from services.concurrency import ConcurrencyLimiter
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+class AIMDController:
+    """
+    加性增 / 乘性减 (AIMD) 并发控制器
+
+    - 每累计 limit 次"健康"响应，上限 +increase（约等于每轮往返增加一个名额）
+    - 每次过载信号，上限 *= decrease_factor；cooldown 秒内的连续过载只收缩一次
+    """
+
+    def __init__(self, limiter: ConcurrencyLimiter, min_limit: int = 2, max_limit: int = 200,
+                 initial_limit: Optional[int] = None, increase: int = 1,
+                 decrease_factor: float = 0.5, latency_target: float = 10.0, cooldown: float = 5.0):
+        """
+        初始化控制器
+
+        Args:
+            limiter: 被控制的并发限制器
+            min_limit: 上限的下界
+            max_limit: 上限的上界
+            initial_limit: 初始上限（默认取 limiter 当前上限）
+            increase: 每轮增加的名额数
+            decrease_factor: 过载时的收缩系数
+            latency_target: 请求延迟目标（秒），超过时不计为健康响应
+            cooldown: 两次收缩的最小间隔（秒）
+        """
+        self.limiter = limiter
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._healthy_streak = 0
+        self._last_decrease = 0.0
+
+        # 统计
+        self.successes = 0
+        self.slow_responses = 0
+        self.overloads = 0
+        self.increases = 0
+        self.decreases = 0
+        self.last_overload_reason = ""
+
+        start = initial_limit if initial_limit is not None else limiter.limit
+        self.limiter.set_limit(min(self.max_limit, max(self.min_limit, start)))
+
+    @property
+    def limit(self) -> int:
+        return self.limiter.limit
+
+    def on_success(self, latency: float) -> None:
+        """记录一次成功响应"""
+        with self._lock:
+            self.successes += 1
+            if latency > self.latency_target:
+                self.slow_responses += 1
+                return
+            self._healthy_streak += 1
+            if self._healthy_streak < self.limit or self.limit >= self.max_limit:
+                return
+            self._healthy_streak = 0
+            new_limit = min(self.max_limit, self.limit + self.increase)
+            self.increases += 1
+        self.limiter.set_limit(new_limit)
+
+    def on_overload(self, reason: str) -> None:
+        """记录一次过载信号（429 / 5xx / 超时 / 连接中断）"""
+        now = time.monotonic()
+        with self._lock:
+            self.overloads += 1
+            self.last_overload_reason = reason
+            self._healthy_streak = 0
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            old_limit = self.limit
+            new_limit = max(self.min_limit, int(old_limit * self.decrease_factor))
+            if new_limit == old_limit:
+                return
+            self.decreases += 1
+        self.limiter.set_limit(new_limit)
+        logger.warning(f"上游过载 ({reason})，在途任务上限 {old_limit} -> {new_limit}")
+
+    def stats(self) -> Dict[str, object]:
+        """控制器统计信息"""
+        return {
+            "limit": self.limit,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.limiter.in_use,
+            "successes": self.successes,
+            "slow_responses": self.slow_responses,
+            "overloads": self.overloads,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "last_overload_reason": self.last_overload_reason,
+        }
@@ -0,0 +1,119 @@
+"""
+上传准入校验
+在扣除积分、进入翻译流程之前，只根据文件头判断格式、文件大小和像素数，不解码像素：
+无法识别的文件、不支持的格式、超大文件和解压炸弹（文件很小、解码后像素极多）都在这里被拒绝，
+不会占用图片处理进程和上游配额，也不扣积分
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import FrozenSet, Optional, Union
+
+from PIL import Image
+
+from services.executors import DISK_IO, run_in
+from services.file_handler import SavedUpload
+from services.image_pipeline import probe_image
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+class AdmissionError(ValueError):
+    """上传文件未通过准入校验"""
+
+
+@dataclass(frozen=True)
+class RejectedUpload:
+    """被拒绝的上传文件（不翻译、不扣积分）"""
+    original_name: str
+    reason: str
+
+
+@dataclass(frozen=True)
+class AdmissionPolicy:
+    """准入规则"""
+    formats: FrozenSet[str] = frozenset({"JPEG", "PNG", "WEBP", "MPO"})
+    max_bytes: int = 30 * 1024 * 1024
+    max_pixels: int = 50_000_000
+    max_edge: int = 20000
+
+    @classmethod
+    def from_settings(cls) -> "AdmissionPolicy":
+        from config import settings
+
+        return cls(
+            formats=frozenset(fmt.strip().upper() for fmt in settings.ADMISSION_FORMATS.split(",") if fmt.strip()),
+            max_bytes=int(settings.ADMISSION_MAX_FILE_MB * 1024 * 1024),
+            max_pixels=settings.ADMISSION_MAX_PIXELS,
+            max_edge=settings.ADMISSION_MAX_EDGE,
+        )
+
+    def size_error(self, size: int) -> Optional[str]:
+        """文件大小超限时返回拒绝原因（流式上传过程中也会调用）"""
+        if size > self.max_bytes:
+            return f"文件超过 {round(self.max_bytes / (1024 * 1024), 1):g}MB"
+        return None
+
+
+def check_upload(upload: SavedUpload, policy: AdmissionPolicy) -> None:
+    """
+    按上传时识别的元数据校验文件
+
+    Raises:
+        AdmissionError: 未通过校验
+    """
+    if upload.size == 0:
+        raise AdmissionError("文件为空")
+    size_error = policy.size_error(upload.size)
+    if size_error:
+        raise AdmissionError(size_error)
+    if upload.format is None or upload.dimensions is None:
+        raise AdmissionError("无法识别的图片文件")
+    if upload.format not in policy.formats:
+        raise AdmissionError(f"不支持的图片格式 {upload.format}，可选: {', '.join(sorted(policy.formats))}")
+
+    width, height = upload.dimensions
+    if width <= 0 or height <= 0:
+        raise AdmissionError("图片尺寸无效")
+    if max(width, height) > policy.max_edge:
+        raise AdmissionError(f"图片尺寸 {width}x{height} 超过单边上限 {policy.max_edge}")
+    if width * height > policy.max_pixels:
+        raise AdmissionError(f"图片像素 {width}x{height} 超过上限 {policy.max_pixels / 1_000_000:.0f}MP")
+
+
+async def admit_upload(upload: SavedUpload, policy: AdmissionPolicy) -> SavedUpload:
+    """
+    校验已保存的上传文件
+
+    上传时保留的文件头无法识别时（如 JPEG 的 EXIF 很大，尺寸信息在更后面；
+    或像素数超过 PIL 自身上限），再从磁盘只读取文件头识别一次，仍不解码像素
+
+    Returns:
+        通过校验的文件（元数据可能已补全）
+
+    Raises:
+        AdmissionError: 未通过校验
+    """
+    if upload.format is None and upload.size > 0 and policy.size_error(upload.size) is None:
+        try:
+            info = await run_in(DISK_IO, probe_image, upload.path)
+        except Image.DecompressionBombError:
+            raise AdmissionError(f"图片像素超过上限 {policy.max_pixels / 1_000_000:.0f}MP")
+        except Exception:
+            info = None
+        if info is not None:
+            upload.format, upload.dimensions = info.format, info.size
+
+    check_upload(upload, policy)
+    return upload
+
+
+async def admit_or_reject(upload: SavedUpload, policy: AdmissionPolicy) -> Union[SavedUpload, RejectedUpload]:
+    """校验已保存的上传文件，未通过时删除文件并返回拒绝原因"""
+    try:
+        return await admit_upload(upload, policy)
+    except AdmissionError as e:
+        logger.warning(f"拒绝上传文件 {upload.original_name}: {e}")
+        await run_in(DISK_IO, upload.path.unlink, missing_ok=True)
+        return RejectedUpload(upload.original_name, str(e))
@@ -0,0 +1,162 @@
+"""
+上游熔断器
+按端点（提交 / 状态查询 / 结果下载）统计滑动窗口内的错误率，超过阈值即熔断：
+熔断期间新请求直接快速失败，冷却后放行少量试探请求（半开），试探成功则恢复
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Tuple
+
+from services.errors import TranslationError
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(TranslationError):
+    """上游熔断中，请求被快速拒绝"""
+    pass
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    状态:
+        closed    正常放行，统计错误率
+        open      熔断，直接拒绝，open_seconds 后进入半开
+        half_open 放行最多 half_open_max_calls 个试探请求，全部成功则关闭，任一失败重新熔断
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_rate_threshold: float = 0.5, min_requests: int = 10,
+                 window_seconds: float = 60.0, open_seconds: float = 30.0, half_open_max_calls: int = 2):
+        """
+        初始化熔断器
+
+        Args:
+            name: 端点名称
+            failure_rate_threshold: 触发熔断的错误率
+            min_requests: 窗口内至少多少个请求才计算错误率
+            window_seconds: 滑动窗口长度（秒）
+            open_seconds: 熔断持续时间（秒）
+            half_open_max_calls: 半开状态放行的试探请求数
+        """
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_requests = min_requests
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._results: Deque[Tuple[float, bool]] = deque()
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._half_open_successes = 0
+
+        # 统计
+        self.rejected = 0
+        self.trips = 0
+
+    def _update_state(self, now: float) -> None:
+        if self._state == self.OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+            self._half_open_successes = 0
+            logger.info(f"[熔断:{self.name}] 冷却结束，进入半开状态，放行试探请求")
+
+    def _trip(self, now: float, reason: str) -> None:
+        self._state = self.OPEN
+        self._opened_at = now
+        self._results.clear()
+        self.trips += 1
+        logger.error(f"[熔断:{self.name}] 已熔断 {self.open_seconds:.0f}秒: {reason}")
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._update_state(time.monotonic())
+            return self._state
+
+    def is_open(self) -> bool:
+        """是否处于熔断状态（不消耗半开试探名额）"""
+        return self.state == self.OPEN
+
+    def before_request(self) -> None:
+        """
+        请求前检查
+
+        Raises:
+            CircuitOpenError: 熔断中，或半开状态的试探名额已用完
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._update_state(now)
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return
+            self.rejected += 1
+            retry_in = max(0.0, self.open_seconds - (now - self._opened_at))
+        raise CircuitOpenError(f"上游服务异常，{self.name} 已熔断，约 {retry_in:.0f} 秒后重试")
+
+    def record_success(self) -> None:
+        """记录一次成功请求"""
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.HALF_OPEN:
+                self._half_open_successes += 1
+                if self._half_open_successes >= self.half_open_max_calls:
+                    self._state = self.CLOSED
+                    self._results.clear()
+                    logger.info(f"[熔断:{self.name}] 试探请求成功，恢复正常")
+                return
+            self._record(now, True)
+
+    def record_failure(self, reason: str = "") -> None:
+        """记录一次失败请求（网络异常 / 429 / 5xx）"""
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.HALF_OPEN:
+                self._trip(now, f"试探请求失败 {reason}")
+                return
+            if self._state == self.OPEN:
+                return
+            self._record(now, False)
+            total = len(self._results)
+            failures = sum(1 for _, ok in self._results if not ok)
+            if total >= self.min_requests and failures / total >= self.failure_rate_threshold:
+                self._trip(now, f"错误率 {failures}/{total}，最近错误: {reason}")
+
+    def _record(self, now: float, ok: bool) -> None:
+        self._results.append((now, ok))
+        while self._results and now - self._results[0][0] > self.window_seconds:
+            self._results.popleft()
+
+    def stats(self) -> Dict[str, object]:
+        """熔断器统计信息"""
+        with self._lock:
+            now = time.monotonic()
+            self._update_state(now)
+            total = len(self._results)
+            failures = sum(1 for _, ok in self._results if not ok)
+            return {
+                "state": self._state,
+                "window_requests": total,
+                "window_failure_rate": round(failures / total, 3) if total else 0.0,
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "open_remaining_seconds": (
+                    round(max(0.0, self.open_seconds - (now - self._opened_at)), 1)
+                    if self._state == self.OPEN else 0.0
+                ),
+            }
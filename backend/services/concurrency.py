@@ -0,0 +1,99 @@
+"""
+并发限制
+可动态调整上限的 FIFO 并发限制器，用于分别约束本地预处理、上游提交、上游在途任务等阶段
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict
+
+
+class ConcurrencyLimiter:
+    """
+    并发限制器（类似 asyncio.Semaphore，但上限可在运行时调整，并记录统计信息）
+
+    用法:
+        async with limiter:
+            ...
+    """
+
+    def __init__(self, limit: int, name: str = ""):
+        """
+        初始化限制器
+
+        Args:
+            limit: 并发上限
+            name: 名称（用于日志与指标）
+        """
+        self.limit = max(1, limit)
+        self.name = name
+        self.in_use = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        # 统计
+        self.acquired = 0
+        self.peak_in_use = 0
+        self.total_wait = 0.0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        """获取一个名额，已满时按先到先得排队"""
+        start = time.monotonic()
+        if self.in_use < self.limit and not self._waiters:
+            self.in_use += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # 名额已分配但调用方被取消，归还名额
+                    self.release()
+                elif future in self._waiters:
+                    # 已被取消的排队者可能在恢复执行前就被 _wake 跳过并移出队列
+                    self._waiters.remove(future)
+                raise
+
+        self.acquired += 1
+        self.total_wait += time.monotonic() - start
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def release(self) -> None:
+        """归还名额"""
+        self.in_use -= 1
+        self._wake()
+
+    def set_limit(self, limit: int) -> None:
+        """调整并发上限（调小时不打断已在执行的任务）"""
+        self.limit = max(1, limit)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_use < self.limit:
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_use += 1
+                future.set_result(None)
+
+    async def __aenter__(self) -> "ConcurrencyLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+    def stats(self) -> Dict[str, float]:
+        """限制器统计信息"""
+        return {
+            "limit": self.limit,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "peak_in_use": self.peak_in_use,
+            "acquired": self.acquired,
+            "avg_wait_seconds": round(self.total_wait / self.acquired, 3) if self.acquired else 0.0,
+        }
@@ -0,0 +1,32 @@
+"""
+用户积分
+扣除和增加都在数据库中用单条 UPDATE 完成（扣除时附带余额条件），
+并发请求不会透支积分，也不会用过期的余额互相覆盖
+
+函数只执行语句不提交，调用方在同一事务中提交（如入队图片与预扣积分一起提交）
+"""
+
+from sqlalchemy import update
+from sqlmodel import Session
+
+from models.db_models import User
+
+
+def charge_credits(session: Session, user_id: int, amount: int) -> bool:
+    """
+    扣除积分：余额不足时不扣
+
+    Returns:
+        是否扣除成功
+    """
+    result = session.exec(
+        update(User)
+        .where(User.id == user_id, User.credits >= amount)
+        .values(credits=User.credits - amount)
+    )
+    return result.rowcount == 1
+
+
+def add_credits(session: Session, user_id: int, amount: int) -> None:
+    """增加积分（充值、退还预扣的积分）"""
+    session.exec(update(User).where(User.id == user_id).values(credits=User.credits + amount))
@@ -1,11 +1,14 @@
 from pathlib import Path
-from typing import Generator
+from typing import Callable, Generator, TypeVar
 
 from sqlmodel import Session, SQLModel, create_engine
-from sqlalchemy import text
+from sqlalchemy import event, text
 
 from config import settings
 from models import db_models  # noqa: F401
+from services.executors import DISK_IO, run_in
+
+T = TypeVar("T")
 
 
 def _ensure_db_dir():
@@ -20,6 +23,16 @@ engine = create_engine(
 )
 
 
+if settings.DB_URL.startswith("sqlite"):
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, _record) -> None:
+        # WAL：翻译任务队列的频繁写入不阻塞读取；写锁冲突时等待而不是立即报错
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={settings.DB_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+
 def _ensure_user_columns() -> None:
     if not settings.DB_URL.startswith("sqlite"):
         return
@@ -40,3 +53,15 @@ def init_db() -> None:
 def get_session() -> Generator[Session, None, None]:
     with Session(engine) as session:
         yield session
+
+
+async def run_db(fn: Callable[..., T], *args, **kwargs) -> T:
+    """
+    在磁盘 I/O 线程池中用独立的 Session 执行同步数据库操作
+
+    异步接口中的写操作（如任务队列入队）可能要等待 SQLite 写锁，不能直接在事件循环中执行
+    """
+    def call() -> T:
+        with Session(engine) as session:
+            return fn(session, *args, **kwargs)
+    return await run_in(DISK_IO, call)
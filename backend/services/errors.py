@@ -0,0 +1,8 @@
+"""
+翻译服务异常定义
+"""
+
+
+class TranslationError(Exception):
+    """翻译服务异常"""
+    pass
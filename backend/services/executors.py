@@ -0,0 +1,173 @@
+"""
+按负载类型划分的线程池
+阻塞的文件读写、PIL 处理、哈希/编码原先都挤在事件循环的默认线程池里，
+一批大图的 LANCZOS 缩放就会让无关请求排队。这里按负载类型各自使用固定大小的线程池：
+
+- image_cpu: PIL 解码 / 缩放 / 编码（进程池未启用时的兜底、派生图片渲染等）
+- disk_io:   文件读写、结果缓存读写
+- encoding:  内容哈希等纯 CPU 的字节处理
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, TypeVar
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+IMAGE_CPU = "image_cpu"
+DISK_IO = "disk_io"
+ENCODING = "encoding"
+
+T = TypeVar("T")
+
+
+class BoundedExecutor:
+    """
+    固定大小的命名线程池
+
+    记录执行中 / 排队中的任务数、饱和度（执行中 / 线程数）、排队等待和执行耗时
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        """
+        初始化线程池
+
+        Args:
+            name: 名称（线程名前缀，用于日志与指标）
+            max_workers: 线程数
+        """
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+
+        # 统计（事件循环与工作线程都会更新）
+        self._lock = threading.Lock()
+        self.active = 0
+        self.queued = 0
+        self.peak_queued = 0
+        self.submitted = 0
+        self.completed = 0
+        self.saturated = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+    def _call(self, submitted_at: float, fn: Callable[[], T]) -> T:
+        started_at = time.monotonic()
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.total_wait += started_at - submitted_at
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+                self.total_run += time.monotonic() - started_at
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """在线程池中执行阻塞函数"""
+        call = functools.partial(fn, *args, **kwargs)
+        with self._lock:
+            self.submitted += 1
+            # 所有线程都在忙：本次提交需要排队
+            if self.active + self.queued >= self.max_workers:
+                self.saturated += 1
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+        try:
+            future = self._executor.submit(self._call, time.monotonic(), call)
+        except RuntimeError:
+            # 线程池已关闭，任务没有提交
+            self._dequeue_cancelled(None)
+            raise
+        future.add_done_callback(self._dequeue_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _dequeue_cancelled(self, future: Optional[Future]) -> None:
+        """任务在排队中被取消（或未能提交）时从排队计数中移除"""
+        if future is None or future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭线程池"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self) -> Dict[str, float]:
+        """线程池统计信息"""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "active": self.active,
+                "queued": self.queued,
+                "saturation": round(self.active / self.max_workers, 2),
+                "peak_queued": self.peak_queued,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "saturated_submits": self.saturated,
+                "avg_wait_ms": round(self.total_wait / self.completed * 1000, 1) if self.completed else 0.0,
+                "avg_run_ms": round(self.total_run / self.completed * 1000, 1) if self.completed else 0.0,
+            }
+
+
+# 进程内共享的线程池（首次使用时按配置创建）
+_executors: Dict[str, BoundedExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _configured_sizes() -> Dict[str, int]:
+    from config import settings
+
+    return {
+        IMAGE_CPU: settings.EXECUTOR_IMAGE_CPU_WORKERS,
+        DISK_IO: settings.EXECUTOR_DISK_IO_WORKERS,
+        ENCODING: settings.EXECUTOR_ENCODING_WORKERS,
+    }
+
+
+def get_executor(name: str) -> BoundedExecutor:
+    """
+    获取命名线程池
+
+    Raises:
+        KeyError: 未知的线程池名称
+    """
+    executor = _executors.get(name)
+    if executor is not None:
+        return executor
+    with _executors_lock:
+        if name not in _executors:
+            sizes = _configured_sizes()
+            if name not in sizes:
+                raise KeyError(f"未知的线程池: {name}")
+            workers = sizes[name] if sizes[name] > 0 else (os.cpu_count() or 2)
+            _executors[name] = BoundedExecutor(name, workers)
+            logger.info(f"线程池 {name} 已创建: {workers} 个线程")
+        return _executors[name]
+
+
+async def run_in(name: str, fn: Callable[..., T], *args, **kwargs) -> T:
+    """在指定的命名线程池中执行阻塞函数"""
+    return await get_executor(name).run(fn, *args, **kwargs)
+
+
+def executor_stats() -> Dict[str, Optional[Dict[str, float]]]:
+    """各线程池统计信息（尚未使用的线程池为 None）"""
+    return {name: (_executors[name].stats() if name in _executors else None)
+            for name in (IMAGE_CPU, DISK_IO, ENCODING)}
+
+
+def shutdown_executors() -> None:
+    """关闭全部线程池（应用关闭时调用）"""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown()
@@ -3,21 +3,44 @@
 负责临时目录管理、文件保存、ZIP打包和清理
 """
 
+import asyncio
+import hashlib
+import os
 import uuid
 import shutil
 import zipfile
 import logging
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
-import aiofiles
+from typing import BinaryIO, List, Optional, Tuple
 from fastapi import UploadFile
 
+from services.executors import DISK_IO, run_in
+from services.image_pipeline import probe_image
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
 # 临时文件根目录
 TEMP_ROOT = Path("./temp")
 
+# 上传文件按块写入磁盘，单块大小
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# 识别图片格式和尺寸时保留的文件头字节数
+HEADER_SNIFF_BYTES = 64 * 1024
+
+
+@dataclass
+class SavedUpload:
+    """已保存的上传文件及写入时顺带得到的元数据（后续流程直接复用，不再重新读取文件）"""
+    path: Path
+    original_name: str
+    size: int                                 # 字节数
+    content_hash: str                         # 内容 SHA-256
+    format: Optional[str] = None              # 文件头识别出的图片格式（无法识别时为 None）
+    dimensions: Optional[Tuple[int, int]] = None  # 文件头中的图片尺寸
+
 
 def get_temp_dir(request_id: str) -> tuple[Path, Path]:
     """
@@ -46,19 +69,25 @@ def generate_request_id() -> str:
     return str(uuid.uuid4())[:8]
 
 
-async def save_upload_file(file: UploadFile, dest_dir: Path) -> Path:
-    """
-    异步保存上传的文件到指定目录
-    
-    Args:
-        file: 上传的文件对象
-        dest_dir: 目标目录
-        
-    Returns:
-        保存后的文件路径
-    """
+def _write_chunk(f: BinaryIO, hasher, chunk: bytes) -> None:
+    """写入一块数据并更新哈希（在磁盘 I/O 线程池中执行，hashlib 计算时释放 GIL）"""
+    hasher.update(chunk)
+    f.write(chunk)
+
+
+def _sniff_header(header: bytes) -> Tuple[Optional[str], Optional[Tuple[int, int]]]:
+    """从文件头识别图片格式和尺寸（不解码像素），无法识别时返回 (None, None)"""
+    try:
+        info = probe_image(header)
+    except Exception:
+        return None, None
+    return info.format, info.size
+
+
+def _unique_upload_path(dest_dir: Path, filename: Optional[str]) -> Tuple[Path, str]:
+    """生成上传文件的保存路径，返回 (保存路径, 清理后的原始文件名)"""
     # 确保文件名安全，并添加 UUID 前缀防止同名文件冲突
-    original_filename = file.filename or "unnamed"
+    original_filename = filename or "unnamed"
     # 移除路径中可能的恶意字符
     safe_filename = Path(original_filename).name
     
@@ -68,38 +97,147 @@ async def save_upload_file(file: UploadFile, dest_dir: Path) -> Path:
     
     # 添加 UUID 前缀确保唯一性
     unique_filename = f"{uuid.uuid4().hex[:8]}_{stem}{suffix}"
-    dest_path = dest_dir / unique_filename
-    
-    # 异步写入文件
-    async with aiofiles.open(dest_path, 'wb') as f:
-        content = await file.read()
-        await f.write(content)
+    return dest_dir / unique_filename, safe_filename
+
+
+class UploadWriter:
+    """
+    上传文件写入器
+    按块写入磁盘（攒够 UPLOAD_CHUNK_SIZE 再落盘），同时计算内容哈希、保留文件头用于识别格式
+    """
+
+    def __init__(self, dest_path: Path, original_name: str, f: BinaryIO):
+        self.dest_path = dest_path
+        self.original_name = original_name
+        self._file = f
+        self._hasher = hashlib.sha256()
+        self._buffer = bytearray()
+        self._header = bytearray()
+        self.size = 0
+
+    @classmethod
+    async def open(cls, dest_dir: Path, filename: Optional[str]) -> "UploadWriter":
+        """在目标目录中创建上传文件"""
+        dest_path, original_name = _unique_upload_path(dest_dir, filename)
+        f = await run_in(DISK_IO, open, dest_path, "wb")
+        return cls(dest_path, original_name, f)
+
+    async def write(self, chunk: bytes) -> None:
+        """追加数据（缓冲满一块时写入磁盘）"""
+        if len(self._header) < HEADER_SNIFF_BYTES:
+            self._header += chunk[:HEADER_SNIFF_BYTES - len(self._header)]
+        self.size += len(chunk)
+        self._buffer += chunk
+        if len(self._buffer) >= UPLOAD_CHUNK_SIZE:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        if self._buffer:
+            chunk, self._buffer = bytes(self._buffer), bytearray()
+            await run_in(DISK_IO, _write_chunk, self._file, self._hasher, chunk)
+
+    async def finish(self) -> SavedUpload:
+        """写入剩余数据并关闭文件，返回文件及其元数据"""
+        try:
+            await self._flush()
+        except BaseException:
+            await self.abort()
+            raise
+        await run_in(DISK_IO, self._file.close)
+        
+        image_format, dimensions = _sniff_header(bytes(self._header))
+        logger.info(
+            f"已保存文件: {self.dest_path} ({self.size / 1024:.0f}KB, {image_format or '未知格式'}"
+            f"{f' {dimensions[0]}x{dimensions[1]}' if dimensions else ''})"
+        )
+        return SavedUpload(
+            path=self.dest_path,
+            original_name=self.original_name,
+            size=self.size,
+            content_hash=self._hasher.hexdigest(),
+            format=image_format,
+            dimensions=dimensions,
+        )
+
+    async def abort(self) -> None:
+        """放弃写入：关闭并删除未写完的文件"""
+        await run_in(DISK_IO, self._file.close)
+        self.dest_path.unlink(missing_ok=True)
+
+
+async def save_upload_file(file: UploadFile, dest_dir: Path) -> SavedUpload:
+    """
+    按块流式保存上传的文件到指定目录
+    写入的同时计算内容哈希、识别文件头，整个文件不会一次性读入内存
     
-    logger.info(f"已保存文件: {dest_path}")
-    return dest_path
+    Args:
+        file: 上传的文件对象
+        dest_dir: 目标目录
+        
+    Returns:
+        保存后的文件及其元数据
+    """
+    writer = await UploadWriter.open(dest_dir, file.filename)
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            await writer.write(chunk)
+    except BaseException:
+        await writer.abort()
+        raise
+    return await writer.finish()
 
 
-async def save_all_upload_files(files: List[UploadFile], dest_dir: Path) -> List[Path]:
+async def save_all_upload_files(files: List[UploadFile], dest_dir: Path,
+                                concurrency: int = 4) -> List[SavedUpload]:
     """
-    批量保存所有上传文件
+    并发保存所有上传文件（同时保存的文件数不超过 concurrency，结果保持上传顺序）
     
     Args:
         files: 上传文件列表
         dest_dir: 目标目录
+        concurrency: 同时保存的文件数上限
         
     Returns:
-        保存后的文件路径列表
+        保存成功的文件列表（失败的文件被跳过）
     """
-    saved_paths = []
-    for file in files:
-        try:
-            path = await save_upload_file(file, dest_dir)
-            saved_paths.append(path)
-        except Exception as e:
-            logger.error(f"保存文件失败 {file.filename}: {e}")
-            # 继续处理其他文件，不中断整个流程
-            continue
-    return saved_paths
+    slots = asyncio.Semaphore(max(1, concurrency))
+    
+    async def _save(file: UploadFile) -> Optional[SavedUpload]:
+        async with slots:
+            try:
+                return await save_upload_file(file, dest_dir)
+            except Exception as e:
+                logger.error(f"保存文件失败 {file.filename}: {e}")
+                # 继续处理其他文件，不中断整个流程
+                return None
+    
+    saved = await asyncio.gather(*(_save(file) for file in files))
+    return [upload for upload in saved if upload is not None]
+
+
+def write_bytes_atomic(dest_path: Path, data: bytes) -> Path:
+    """
+    原子写入文件：先写同目录临时文件再替换，读取方不会看到写了一半的文件
+    
+    Args:
+        dest_path: 目标路径
+        data: 文件内容
+        
+    Returns:
+        目标路径
+    """
+    tmp_path = dest_path.parent / f".{dest_path.name}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return dest_path
 
 
 def create_zip_from_directory(source_dir: Path, zip_path: Path) -> Path:
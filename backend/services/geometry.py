@@ -0,0 +1,146 @@
+"""
+几何规划
+在解码后一次性计算 "模式拉伸 + 比例填充 + 长边限制" 的组合变换：
+原图只做一次重采样（直接缩放到最终内容尺寸）再贴到白色画布上，
+同时记录内容在画布中的归一化裁剪框，结果图按该框裁剪即可恢复比例
+"""
+
+from dataclasses import dataclass
+from typing import Tuple
+
+from PIL import Image
+
+# API 支持的宽高比 (宽:高)
+# 文档: https://docs.apimart.ai/en/api-reference/images/gpt-4o/generation
+SUPPORTED_RATIOS = {
+    "1:1": 1.0,
+    "2:3": 2/3,
+    "3:2": 3/2,
+}
+
+# Ozon 主图比例 (宽:高 = 3:4)
+OZON_RATIO = 0.75
+
+# 缩小时先按整数倍快速降采样，再做 LANCZOS（画质几乎不变，大图明显更快）
+_REDUCING_GAP = 3.0
+
+Size = Tuple[int, int]
+
+
+def best_fit_ratio(width: int, height: int) -> str:
+    """
+    计算最适合的 API 支持比例 (1:1, 2:3, 3:2)
+    选择逻辑：填充面积最小的比例
+    """
+    aspect = width / height
+
+    best_ratio = "1:1"
+    min_padding_area = float("inf")
+
+    for ratio_str, ratio_val in SUPPORTED_RATIOS.items():
+        # 计算如果要适应这个比例，需要填充多少面积
+        if aspect > ratio_val:
+            # 原图更宽，宽度固定，需要增加高度
+            padding_area = width * (width / ratio_val - height)
+        else:
+            # 原图更高，高度固定，需要增加宽度
+            padding_area = height * (height * ratio_val - width)
+
+        if padding_area < min_padding_area:
+            min_padding_area = padding_area
+            best_ratio = ratio_str
+
+    return best_ratio
+
+
+def padded_size(width: int, height: int, target_ratio_str: str) -> Size:
+    """居中填充到指定宽高比后的画布尺寸"""
+    target_ratio = SUPPORTED_RATIOS[target_ratio_str]
+    # 当前比例 > 目标比例：太宽，补高；否则太高，补宽
+    if width / height > target_ratio:
+        return width, int(width / target_ratio)
+    return int(height * target_ratio), height
+
+
+@dataclass(frozen=True)
+class GeometryPlan:
+    """一张图片从原图到上传画布的完整几何变换"""
+    source_size: Size                       # 原图尺寸
+    reference_size: Size                    # 模式处理后的内容尺寸（原图，或拉伸到 3:4 后的尺寸）
+    size_ratio: str                         # API size 参数 (1:1, 2:3, 3:2)
+    canvas_size: Size                       # 原分辨率下填充后的画布尺寸
+    output_size: Size                       # 实际生成的画布尺寸（限制长边后）
+    content_box: Tuple[int, int, int, int]  # 内容在实际画布中的位置 (left, top, right, bottom)
+
+    @property
+    def content_size(self) -> Size:
+        left, top, right, bottom = self.content_box
+        return right - left, bottom - top
+
+    @property
+    def crop_box(self) -> Tuple[float, float, float, float]:
+        """归一化裁剪框（相对画布宽高的比例），与结果图分辨率无关"""
+        width, height = self.output_size
+        left, top, right, bottom = self.content_box
+        return left / width, top / height, right / width, bottom / height
+
+
+def plan_geometry(source_size: Size, target_mode: str = "original", max_long_edge: int = 0) -> GeometryPlan:
+    """
+    计算几何变换
+
+    Args:
+        source_size: 原图尺寸
+        target_mode: 输出模式 "original" | "ozon_3_4"
+        max_long_edge: 画布长边上限（<= 0 表示不限）
+    """
+    width, height = source_size
+
+    # 1. 模式：Ozon 主图模式保持高度，宽度 = 高度 * 0.75
+    if target_mode == "ozon_3_4":
+        reference_size = (max(1, int(height * OZON_RATIO)), height)
+    else:
+        reference_size = (width, height)
+
+    # 2. 比例填充
+    size_ratio = best_fit_ratio(*reference_size)
+    canvas_size = padded_size(*reference_size, size_ratio)
+
+    # 3. 长边限制：画布和内容按同一比例缩小
+    scale = 1.0
+    if max_long_edge > 0 and max(canvas_size) > max_long_edge:
+        scale = max_long_edge / max(canvas_size)
+    output_size = (max(1, round(canvas_size[0] * scale)), max(1, round(canvas_size[1] * scale)))
+    content_w = min(output_size[0], max(1, round(reference_size[0] * scale)))
+    content_h = min(output_size[1], max(1, round(reference_size[1] * scale)))
+
+    left = (output_size[0] - content_w) // 2
+    top = (output_size[1] - content_h) // 2
+    return GeometryPlan(
+        source_size=source_size,
+        reference_size=reference_size,
+        size_ratio=size_ratio,
+        canvas_size=canvas_size,
+        output_size=output_size,
+        content_box=(left, top, left + content_w, top + content_h),
+    )
+
+
+def apply_plan(img: Image.Image, plan: GeometryPlan) -> Image.Image:
+    """按规划生成上传画布：最多一次重采样 + 一次粘贴（输入需为 RGB）"""
+    content_size = plan.content_size
+    if img.size != content_size:
+        img = img.resize(content_size, Image.Resampling.LANCZOS, reducing_gap=_REDUCING_GAP)
+    if content_size == plan.output_size:
+        return img
+
+    canvas = Image.new("RGB", plan.output_size, (255, 255, 255))
+    canvas.paste(img, plan.content_box[:2])
+    return canvas
+
+
+def crop_box_for(crop_box: Tuple[float, float, float, float], size: Size) -> Tuple[int, int, int, int]:
+    """把归一化裁剪框换算为指定尺寸图片上的像素坐标"""
+    width, height = size
+    left, top, right, bottom = crop_box
+    return round(left * width), round(top * height), round(right * width), round(bottom * height)
@@ -0,0 +1,111 @@
+"""
+上游 HTTP 客户端
+进程内共享、长连接复用的 httpx 客户端：API 主机和结果图片 CDN 主机使用独立的连接池
+"""
+
+import importlib.util
+import logging
+from typing import Optional
+
+import httpx
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+def http2_available() -> bool:
+    """HTTP/2 依赖 h2 包（pip install httpx[http2]），未安装时回退到 HTTP/1.1"""
+    return importlib.util.find_spec("h2") is not None
+
+
+class UpstreamClients:
+    """
+    上游 HTTP 客户端组
+
+    - api: 访问 APIMart API（携带鉴权头）
+    - cdn: 下载结果图片（不携带 API Key，独立连接池，避免大文件下载占满 API 连接）
+    """
+
+    def __init__(self, api_key: str, api_endpoint: str,
+                 max_connections: int = 100, max_keepalive: int = 20,
+                 cdn_max_connections: int = 50, keepalive_expiry: float = 60.0,
+                 http2: bool = False, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        初始化客户端组
+
+        Args:
+            api_key: APIMart API 密钥
+            api_endpoint: API 端点地址
+            max_connections: API 连接池最大连接数
+            max_keepalive: 每个连接池保持的空闲长连接数
+            cdn_max_connections: CDN 连接池最大连接数
+            keepalive_expiry: 空闲长连接保留时间（秒）
+            http2: 是否启用 HTTP/2（需要安装 h2）
+            transport: 自定义传输层（测试用）
+        """
+        self.api_endpoint = api_endpoint
+
+        if http2 and not http2_available():
+            logger.warning("未安装 h2，HTTP/2 已禁用，回退到 HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+
+        timeout = httpx.Timeout(180.0, connect=60.0)
+        self.api = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            http2=http2,
+            transport=transport,
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json"
+            }
+        )
+        self.cdn = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=cdn_max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            http2=http2,
+            transport=transport,
+            follow_redirects=True,
+        )
+        logger.info(
+            f"上游 HTTP 客户端已创建: API 连接池 {max_connections}, CDN 连接池 {cdn_max_connections}, "
+            f"keep-alive {max_keepalive}/{keepalive_expiry:.0f}s, HTTP/2 {'开启' if http2 else '关闭'}"
+        )
+
+    async def warmup(self) -> None:
+        """预热：提前与 API 主机完成 TCP/TLS 握手，首个批次无需再等待建连"""
+        try:
+            await self.api.head(self.api_endpoint, timeout=10.0)
+            logger.info(f"上游连接已预热: {self.api_endpoint}")
+        except httpx.HTTPError as e:
+            logger.warning(f"上游连接预热失败（不影响服务）: {e}")
+
+    async def aclose(self) -> None:
+        """关闭所有连接池"""
+        await self.api.aclose()
+        await self.cdn.aclose()
+        logger.info("上游 HTTP 客户端已关闭")
+
+
+def create_upstream_clients() -> UpstreamClients:
+    """根据配置创建上游客户端组"""
+    from config import settings
+
+    return UpstreamClients(
+        api_key=settings.APIMART_API_KEY,
+        api_endpoint=settings.APIMART_API_ENDPOINT,
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive=settings.HTTP_MAX_KEEPALIVE,
+        cdn_max_connections=settings.HTTP_CDN_MAX_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        http2=settings.HTTP2_ENABLED,
+    )
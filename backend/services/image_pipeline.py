@@ -0,0 +1,250 @@
+"""
+图片预处理流水线
+每张上传图片只解码一次，按几何规划一次完成拉伸、缩放、比例填充，最后只编码一次作为上传数据
+"""
+
+import logging
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+from PIL import Image
+
+from services.geometry import (
+    SUPPORTED_RATIOS,
+    GeometryPlan,
+    apply_plan,
+    best_fit_ratio,
+    crop_box_for,
+    padded_size,
+    plan_geometry,
+)
+from services.output_profiles import OutputProfile, encode_output
+from services.payload_optimizer import PayloadOptimizer, to_srgb
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# PIL 格式 -> (保存格式, MIME 类型)
+_ENCODINGS = {
+    "PNG": ("PNG", "image/png"),
+    "WEBP": ("WEBP", "image/webp"),
+}
+_DEFAULT_ENCODING = ("JPEG", "image/jpeg")
+
+# 文件后缀 -> MIME 类型（无法解码时的兜底）
+_SUFFIX_MIME_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+}
+
+# MIME 类型 -> 文件后缀
+MIME_SUFFIXES = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+}
+
+
+@dataclass
+class PreparedImage:
+    """预处理完成、可直接提交给 API 的图片"""
+    payload: bytes                                # 编码后的上传数据（只编码一次）
+    mime_type: str                                # 上传数据的 MIME 类型
+    size_ratio: str                               # API size 参数 (1:1, 2:3, 3:2)
+    original_size: Optional[Tuple[int, int]]      # 原图尺寸
+    reference_size: Optional[Tuple[int, int]]     # 恢复比例时的参考尺寸（原图或拉伸后的尺寸）
+    canvas_size: Optional[Tuple[int, int]]        # 原分辨率下填充后的画布尺寸
+    source_bytes: int = 0                         # 原始上传文件字节数
+    upload_size: Optional[Tuple[int, int]] = None  # 实际上传的像素尺寸（限制长边后可能小于画布）
+    crop_box: Optional[Tuple[float, float, float, float]] = None  # 内容在画布中的归一化位置，恢复比例时按此裁剪
+
+    @property
+    def suffix(self) -> str:
+        """上传数据对应的文件后缀"""
+        return MIME_SUFFIXES.get(self.mime_type, ".jpg")
+
+
+@dataclass(frozen=True)
+class ImageInfo:
+    """只读取文件头得到的图片信息"""
+    format: Optional[str]
+    size: Tuple[int, int]
+
+
+def probe_image(source: Union[Path, bytes]) -> ImageInfo:
+    """只解析文件头获取格式和尺寸，不解码像素"""
+    with Image.open(source if isinstance(source, Path) else BytesIO(source)) as img:
+        return ImageInfo(format=img.format, size=img.size)
+
+
+def draft_decode(img: Image.Image, target_size: Tuple[int, int]) -> Tuple[int, int]:
+    """
+    JPEG 按目标尺寸缩小解码（DCT 域 1/2、1/4、1/8 缩放），需在解码前调用
+    解码结果的宽高都不小于目标尺寸，后续仍需缩放到精确尺寸；非 JPEG 不做处理
+
+    Returns:
+        实际解码尺寸
+    """
+    if img.format == "JPEG" and (target_size[0] < img.width or target_size[1] < img.height):
+        img.draft("RGB", target_size)
+    return img.size
+
+
+def to_rgb(img: Image.Image) -> Image.Image:
+    """转换为 RGB，透明区域铺白底，避免白色背景变黑"""
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.split()[3])
+        return background
+    if img.mode != "RGB":
+        return img.convert("RGB")
+    return img
+
+
+def pad_to_ratio(img: Image.Image, target_ratio_str: str) -> Image.Image:
+    """将图片居中填充到指定的宽高比（加白边）"""
+    width, height = img.size
+    new_width, new_height = padded_size(width, height, target_ratio_str)
+    if (new_width, new_height) == (width, height):
+        return img
+
+    new_img = Image.new("RGB", (new_width, new_height), (255, 255, 255))
+    x_offset = (new_width - width) // 2
+    y_offset = (new_height - height) // 2
+    new_img.paste(img, (x_offset, y_offset))
+    return new_img
+
+
+def encode_image(img: Image.Image, source_format: Optional[str]) -> Tuple[bytes, str]:
+    """
+    编码图片（整条流水线唯一的一次编码）
+    PNG/WEBP 源图保持原格式，其余统一为 JPEG
+
+    Returns:
+        (编码后的数据, MIME 类型)
+    """
+    save_format, mime_type = _ENCODINGS.get(source_format or "", _DEFAULT_ENCODING)
+    buffer = BytesIO()
+    img.save(buffer, format=save_format, quality=95)
+    return buffer.getvalue(), mime_type
+
+
+def prepare_decoded(img: Image.Image, plan: GeometryPlan, source_format: Optional[str] = None,
+                    optimizer: Optional[PayloadOptimizer] = None, source_bytes: int = 0) -> PreparedImage:
+    """
+    按几何规划处理已解码的 RGB 图片，并编码为上传数据（只编码一次）
+
+    Args:
+        img: 已解码的 RGB 图片（尺寸为 plan.source_size，或缩小解码后的尺寸）
+        plan: 几何规划
+        source_format: 原图格式（未使用优化器时决定上传格式）
+        optimizer: 上传数据优化器
+        source_bytes: 原始数据字节数（用于统计）
+    """
+    img = apply_plan(img, plan)
+
+    # 优化器只在超出字节预算时才会进一步缩小，不改变宽高比
+    if optimizer is not None:
+        optimized = optimizer.optimize(img, source_bytes=source_bytes)
+        payload, mime_type, upload_size = optimized.payload, optimized.mime_type, optimized.size
+    else:
+        payload, mime_type = encode_image(img, source_format)
+        upload_size = img.size
+
+    return PreparedImage(
+        payload=payload,
+        mime_type=mime_type,
+        size_ratio=plan.size_ratio,
+        original_size=plan.source_size,
+        reference_size=plan.reference_size,
+        canvas_size=plan.canvas_size,
+        source_bytes=source_bytes,
+        upload_size=upload_size,
+        crop_box=plan.crop_box,
+    )
+
+
+def prepare_image(data: bytes, target_mode: str = "original",
+                  optimizer: Optional[PayloadOptimizer] = None) -> PreparedImage:
+    """
+    解码一次并完成全部预处理
+
+    Args:
+        data: 上传图片的原始字节
+        target_mode: 输出模式 "original" | "ozon_3_4"
+        optimizer: 上传数据优化器（None 表示按原格式、原分辨率编码）
+
+    Returns:
+        预处理结果
+    """
+    with Image.open(BytesIO(data)) as src:
+        source_format = src.format
+        original_size = src.size
+
+        # 1. 几何规划：Ozon 模式拉伸到 3:4、填充到 API 比例、限制长边，合并为一次重采样
+        plan = plan_geometry(
+            original_size, target_mode, max_long_edge=optimizer.max_long_edge if optimizer is not None else 0
+        )
+
+        # 2. 已知内容尺寸：大尺寸 JPEG 直接缩小解码，不再解码全部像素
+        decoded_size = draft_decode(src, plan.content_size)
+        img = to_rgb(src)
+        if optimizer is not None:
+            # 上传数据不携带 ICC，先按嵌入的配置文件转换到 sRGB
+            img = to_srgb(img, src.info.get("icc_profile"))
+
+        # 3. 一次重采样 + 一次编码
+        prepared = prepare_decoded(img, plan, source_format, optimizer, source_bytes=len(data))
+
+    upload_size = prepared.upload_size
+    draft_note = f" (按 {decoded_size[0]}x{decoded_size[1]} 解码)" if decoded_size != original_size else ""
+    logger.info(
+        f"图片预处理完成: {original_size[0]}x{original_size[1]}{draft_note} -> "
+        f"{upload_size[0]}x{upload_size[1]} ({plan.size_ratio}, {target_mode}), "
+        f"上传数据 {len(prepared.payload) / (1024 * 1024):.2f}MB (原图 {len(data) / (1024 * 1024):.2f}MB)"
+    )
+    return prepared
+
+
+def restore_result(data: bytes, crop_box: Optional[Tuple[float, float, float, float]],
+                   profile: OutputProfile) -> Tuple[bytes, bool]:
+    """
+    在内存中按裁剪框恢复翻译结果的比例，并按输出配置编码
+
+    Args:
+        data: 下载的结果图片字节
+        crop_box: 几何规划记录的归一化裁剪框（None 表示不裁剪）
+        profile: 输出编码配置
+
+    Returns:
+        (输出数据, 是否重新编码)；无需裁剪且已是目标格式时原样返回下载数据
+    """
+    with Image.open(BytesIO(data)) as img:
+        # 只读取文件头即可判断是否需要裁剪、转码
+        box = crop_box_for(crop_box, img.size) if crop_box is not None else None
+        needs_crop = box is not None and box != (0, 0, img.width, img.height)
+        if not needs_crop and img.format == profile.format:
+            return data, False
+
+        output = img.crop(box) if needs_crop else img
+        if not (profile.supports_alpha and output.mode in ("RGB", "RGBA", "L")):
+            output = to_rgb(output)
+        return encode_output(output, profile), True
+
+
+def passthrough_image(data: bytes, suffix: str) -> PreparedImage:
+    """预处理失败时的兜底：原样提交原图，不做比例恢复"""
+    return PreparedImage(
+        payload=data,
+        mime_type=_SUFFIX_MIME_TYPES.get(suffix.lower(), "image/jpeg"),
+        size_ratio="1:1",
+        original_size=None,
+        reference_size=None,
+        canvas_size=None,
+        source_bytes=len(data),
+    )
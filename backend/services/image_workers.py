@@ -0,0 +1,282 @@
+"""
+图片处理进程池
+PIL 的解码、重采样、编码都是 CPU 密集型工作，在单个 gunicorn worker 的线程池里会被 GIL 串行化。
+预处理和结果恢复改在独立的工作进程中执行：图片数据通过共享内存传递（不经过 pickle 和管道），
+进程间只传递共享内存名称和少量元数据
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+from services.image_pipeline import PreparedImage, prepare_image, restore_result
+from services.output_profiles import OutputProfile, get_output_profile
+from services.payload_optimizer import PayloadOptimizer
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 共享内存引用：(名称, 数据长度)
+SharedRef = Tuple[str, int]
+
+# 工作进程启动前预先导入的模块（forkserver 中导入一次，之后每个工作进程直接继承）
+_PRELOAD_MODULES = ["services.image_workers"]
+
+
+def _mp_context():
+    """
+    工作进程启动方式
+    forkserver 不继承父进程的线程、事件循环和连接，比 fork 安全，比 spawn 启动快
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(_PRELOAD_MODULES)
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _write_shared(data: bytes) -> Optional[SharedRef]:
+    """把数据写入新建的共享内存块（空数据返回 None），由读取方负责释放"""
+    if not data:
+        return None
+    shm = shared_memory.SharedMemory(create=True, size=len(data))
+    try:
+        shm.buf[:len(data)] = data
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    shm.close()
+    return shm.name, len(data)
+
+
+def _read_shared(ref: Optional[SharedRef], release: bool = False) -> bytes:
+    """读取共享内存块中的数据（release=True 时读取后释放）"""
+    if ref is None:
+        return b""
+    name, size = ref
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return bytes(shm.buf[:size])
+    finally:
+        shm.close()
+        if release:
+            shm.unlink()
+
+
+def _release_shared(ref: Optional[SharedRef]) -> None:
+    """释放共享内存块（已释放时忽略）"""
+    if ref is None:
+        return
+    try:
+        shm = shared_memory.SharedMemory(name=ref[0])
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+# ---- 以下函数在工作进程中执行 ----
+
+@lru_cache(maxsize=8)
+def _worker_optimizer(options: Tuple[Tuple[str, object], ...]) -> PayloadOptimizer:
+    """工作进程内按参数复用优化器（统计由主进程记录）"""
+    return PayloadOptimizer(**dict(options))
+
+
+def _ping() -> int:
+    """预热：确认工作进程已启动"""
+    return os.getpid()
+
+
+def _prepare_in_worker(input_ref: SharedRef, target_mode: str,
+                       optimizer_options: Optional[Tuple[Tuple[str, object], ...]]):
+    started_at = time.time()
+    data = _read_shared(input_ref)
+    optimizer = _worker_optimizer(optimizer_options) if optimizer_options is not None else None
+    prepared = prepare_image(data, target_mode, optimizer=optimizer)
+    # 上传数据走共享内存，只有元数据经过 pickle
+    output_ref = _write_shared(prepared.payload)
+    prepared.payload = b""
+    return started_at, prepared, output_ref
+
+
+def _restore_in_worker(input_ref: SharedRef, crop_box: Optional[Tuple[float, float, float, float]],
+                       profile_name: str):
+    started_at = time.time()
+    data = _read_shared(input_ref)
+    output, reencoded = restore_result(data, crop_box, get_output_profile(profile_name))
+    # 未重新编码时主进程直接使用原数据，不再回传
+    return started_at, reencoded, _write_shared(output) if reencoded else None
+
+
+def _discard_output(future: Future) -> None:
+    """调用方已取消：工作进程完成后释放其写出的共享内存"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    _release_shared(future.result()[2])
+
+
+class ImageProcessPool:
+    """
+    图片处理进程池
+
+    - 预处理（解码 / 几何变换 / 编码）和结果恢复（裁剪 / 转码）在工作进程中执行
+    - 输入输出数据通过共享内存传递，读取方负责释放
+    - 统计排队深度、排队等待时间和处理耗时
+    - 工作进程异常退出（如内存不足被杀）时自动重建进程池
+    """
+
+    def __init__(self, max_workers: int = 0, name: str = "image"):
+        """
+        初始化进程池（工作进程在首次使用或预热时启动）
+
+        Args:
+            max_workers: 工作进程数（<= 0 表示 CPU 核数）
+            name: 名称（用于日志和指标）
+        """
+        self.name = name
+        self.max_workers = max_workers if max_workers > 0 else (os.cpu_count() or 1)
+        self._context = _mp_context()
+        self._executor = self._create_executor()
+
+        # 统计（在事件循环和回调线程中更新）
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.peak_pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+        self.queue_wait_total = 0.0
+        self.run_total = 0.0
+        self.shared_bytes = 0
+        logger.info(
+            f"图片处理进程池 {name} 已初始化: {self.max_workers} 个工作进程 ({self._context.get_start_method()})"
+        )
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._context)
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        """重建已损坏的进程池（多个请求同时发现时只重建一次）"""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = self._create_executor()
+            self.restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+        logger.warning(f"图片处理进程池 {self.name} 的工作进程异常退出，已重建")
+
+    def _submit(self, fn, *args) -> Future:
+        executor = self._executor
+        try:
+            return executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._restart(executor)
+            return self._executor.submit(fn, *args)
+
+    async def _run(self, fn, data: bytes, *args):
+        """
+        在工作进程中执行 fn(input_ref, *args)
+
+        Returns:
+            (元数据, 输出数据的共享内存引用)
+        """
+        input_ref = _write_shared(data)
+        if input_ref is None:
+            raise ValueError("图片数据为空")
+        submitted_at = time.time()
+        with self._lock:
+            self.pending += 1
+            self.submitted += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+            self.shared_bytes += len(data)
+
+        executor = self._executor
+        try:
+            future = self._submit(fn, input_ref, *args)
+            try:
+                started_at, meta, output_ref = await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                future.add_done_callback(_discard_output)
+                raise
+        except BrokenProcessPool:
+            self._restart(executor)
+            with self._lock:
+                self.failed += 1
+            raise
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.pending -= 1
+            _release_shared(input_ref)
+
+        finished_at = time.time()
+        with self._lock:
+            self.completed += 1
+            self.queue_wait_total += max(0.0, started_at - submitted_at)
+            self.run_total += max(0.0, finished_at - started_at)
+            if output_ref is not None:
+                self.shared_bytes += output_ref[1]
+        return meta, output_ref
+
+    async def prepare(self, data: bytes, target_mode: str = "original",
+                      optimizer: Optional[PayloadOptimizer] = None) -> PreparedImage:
+        """在工作进程中执行 prepare_image（优化器统计记录在主进程的实例上）"""
+        options = tuple(sorted(optimizer.options().items())) if optimizer is not None else None
+        prepared, output_ref = await self._run(_prepare_in_worker, data, target_mode, options)
+        prepared.payload = _read_shared(output_ref, release=True)
+        if optimizer is not None:
+            optimizer.record_image(len(data), len(prepared.payload))
+        return prepared
+
+    async def restore(self, data: bytes, crop_box: Optional[Tuple[float, float, float, float]],
+                      profile: OutputProfile) -> Tuple[bytes, bool]:
+        """在工作进程中执行 restore_result"""
+        reencoded, output_ref = await self._run(_restore_in_worker, data, crop_box, profile.name)
+        if not reencoded:
+            return data, False
+        return _read_shared(output_ref, release=True), True
+
+    async def warmup(self) -> None:
+        """启动全部工作进程，避免第一批图片承担进程启动开销"""
+        futures = [asyncio.wrap_future(self._submit(_ping)) for _ in range(self.max_workers)]
+        pids = await asyncio.gather(*futures)
+        logger.info(f"图片处理进程池 {self.name} 已预热: {len(set(pids))} 个工作进程")
+
+    def shutdown(self) -> None:
+        """关闭进程池（取消排队中的任务，等待执行中的任务结束）"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, object]:
+        """进程池统计信息"""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "start_method": self._context.get_start_method(),
+                "pending": self.pending,
+                "running": min(self.pending, self.max_workers),
+                "queue_depth": max(0, self.pending - self.max_workers),
+                "peak_pending": self.peak_pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "restarts": self.restarts,
+                "avg_queue_wait_ms": (
+                    round(self.queue_wait_total / self.completed * 1000, 1) if self.completed else 0.0
+                ),
+                "avg_run_ms": round(self.run_total / self.completed * 1000, 1) if self.completed else 0.0,
+                "shared_mb": round(self.shared_bytes / (1024 * 1024), 2),
+            }
@@ -0,0 +1,560 @@
+"""
+翻译任务队列
+批次（TranslationBatch）和其中的每张图片（TranslationJob）持久化在数据库中，
+工作循环按租约认领图片执行：租约到期未续约（进程退出、部署重启）的图片会被重新认领，
+批次不再随 Web 进程的内存丢失
+
+状态流转：
+    批次  [held ->] uploading -> processing -> completed，上传失败时 -> cancelled
+          （文件先于表单字段到达时批次先处于 held：参数未确定，其中的图片暂不认领）
+    图片  queued -> running -> succeeded / failed（可重试的失败回到 queued），
+          未通过准入校验的直接记为 rejected，批次取消时排队中的图片记为 cancelled
+
+所有函数都是同步的，调用方负责提供 Session
+（工作循环和异步接口都在磁盘 I/O 线程池中调用，不在事件循环中等待 SQLite 写锁，见 services.db.run_db）
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, delete, func, or_, update
+from sqlmodel import Session, select
+
+from models.db_models import TranslationBatch, TranslationJob, WorkerHeartbeat
+from services.admission import RejectedUpload
+from services.credits import add_credits, charge_credits
+from services.file_handler import SavedUpload
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 批次状态
+BATCH_HELD = "held"
+BATCH_UPLOADING = "uploading"
+BATCH_PROCESSING = "processing"
+BATCH_COMPLETED = "completed"
+BATCH_CANCELLED = "cancelled"
+
+# 图片状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_REJECTED = "rejected"
+JOB_CANCELLED = "cancelled"
+
+_FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED, JOB_REJECTED, JOB_CANCELLED)
+
+
+@dataclass
+class ClaimedJob:
+    """已认领的图片及其所属批次的参数"""
+    id: int
+    batch_id: str
+    attempts: int
+    upload: SavedUpload
+    target_mode: str
+    output_profile: Optional[str]
+
+
+def create_batch(session: Session, batch_id: str, user_id: Optional[int] = None,
+                 target_mode: str = "original", output_profile: Optional[str] = None,
+                 held: bool = False) -> TranslationBatch:
+    """
+    创建上传中的批次（其中的图片在上传过程中即可被认领）
+
+    Args:
+        held: 参数尚未确定（表单字段可能在文件之后），图片在 open_batch 之前不会被认领
+    """
+    batch = TranslationBatch(id=batch_id, user_id=user_id, target_mode=target_mode, output_profile=output_profile,
+                             status=BATCH_HELD if held else BATCH_UPLOADING)
+    session.add(batch)
+    session.commit()
+    return batch
+
+
+def open_batch(session: Session, batch_id: str, target_mode: str, output_profile: Optional[str]) -> None:
+    """参数已确定：更新批次参数，其中的图片开始可被认领"""
+    session.exec(
+        update(TranslationBatch)
+        .where(TranslationBatch.id == batch_id, TranslationBatch.status == BATCH_HELD)
+        .values(status=BATCH_UPLOADING, target_mode=target_mode, output_profile=output_profile)
+    )
+    session.commit()
+
+
+def enqueue_upload(session: Session, batch_id: str, position: int, upload: SavedUpload) -> Optional[TranslationJob]:
+    """
+    已保存并通过校验的图片入队，并在同一事务中预扣批次所属用户的 1 个积分
+
+    Returns:
+        入队的图片；积分不足时不入队，返回 None
+    """
+    batch = session.get(TranslationBatch, batch_id)
+    if batch is not None and batch.user_id is not None and not charge_credits(session, batch.user_id, 1):
+        session.rollback()
+        return None
+    width, height = upload.dimensions or (None, None)
+    job = TranslationJob(
+        batch_id=batch_id,
+        position=position,
+        original_name=upload.original_name,
+        input_path=str(upload.path),
+        content_hash=upload.content_hash,
+        size=upload.size,
+        image_format=upload.format,
+        width=width,
+        height=height,
+    )
+    session.add(job)
+    session.commit()
+    return job
+
+
+def record_rejected(session: Session, batch_id: str, position: int, rejected: RejectedUpload) -> None:
+    """记录未通过校验（或积分不足）的文件，结果列表中显示为失败"""
+    session.add(TranslationJob(
+        batch_id=batch_id,
+        position=position,
+        status=JOB_REJECTED,
+        original_name=rejected.original_name,
+        error=rejected.reason,
+        finished_at=datetime.utcnow(),
+    ))
+    session.commit()
+
+
+def seal_batch(session: Session, batch_id: str, retention_seconds: int) -> Optional[int]:
+    """
+    上传完成：批次转为 processing（积分已在入队时预扣）
+    （上传期间图片可能已全部完成，提交后再检查一次批次是否完成）
+
+    Returns:
+        扣除的积分（入队的图片数）；批次已不在上传中（如上传超时已被取消）时返回 None
+    """
+    batch = session.get(TranslationBatch, batch_id)
+    if batch is None or batch.status not in (BATCH_HELD, BATCH_UPLOADING):
+        return None
+    counts = dict(session.exec(
+        select(TranslationJob.status, func.count(TranslationJob.id))
+        .where(TranslationJob.batch_id == batch_id)
+        .group_by(TranslationJob.status)
+    ).all())
+    batch.status = BATCH_PROCESSING
+    batch.total = sum(counts.values())
+    charged = batch.total - counts.get(JOB_REJECTED, 0)
+    session.add(batch)
+    session.commit()
+    refresh_batch(session, batch_id, retention_seconds)
+    return charged
+
+
+def cancel_batch(session: Session, batch_id: str, retention_seconds: int) -> int:
+    """
+    上传未完成：取消批次，排队中的图片不再执行
+
+    已开始执行的图片已占用上游配额：按执行过的张数扣积分（排队中的图片退还预扣的积分），结果照常保留；
+    仍在执行的图片结束后（见 refresh_batch）才登记到期清理，执行期间不会删除上传目录
+
+    Returns:
+        扣除的积分（批次已结束上传时不做处理，返回 0）
+    """
+    now = datetime.utcnow()
+    batch = session.get(TranslationBatch, batch_id)
+    if batch is None or batch.status not in (BATCH_HELD, BATCH_UPLOADING):
+        return 0
+    result = session.exec(
+        update(TranslationJob)
+        .where(TranslationJob.batch_id == batch_id, TranslationJob.status == JOB_QUEUED)
+        .values(status=JOB_CANCELLED, finished_at=now)
+    )
+    if batch.user_id is not None and result.rowcount:
+        add_credits(session, batch.user_id, result.rowcount)
+    counts = dict(session.exec(
+        select(TranslationJob.status, func.count(TranslationJob.id))
+        .where(TranslationJob.batch_id == batch_id)
+        .group_by(TranslationJob.status)
+    ).all())
+    charged = sum(counts.get(state, 0) for state in (JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED))
+
+    batch.status = BATCH_CANCELLED
+    batch.total = sum(counts.values())
+    batch.completed_at = now
+    if counts.get(JOB_RUNNING):
+        batch.expires_at = None
+    elif charged:
+        batch.expires_at = now + timedelta(seconds=retention_seconds)
+    else:
+        batch.expires_at = now
+    session.add(batch)
+    session.commit()
+    logger.info(f"[{batch_id}] 批次已取消（已执行 {charged} 张，仍在执行 {counts.get(JOB_RUNNING, 0)} 张）")
+    return charged
+
+
+def cancel_stale_uploads(session: Session, upload_timeout: float, retention_seconds: int,
+                         now: Optional[datetime] = None) -> List[str]:
+    """
+    取消上传超时的批次：接收上传的 Web 进程中途退出时 seal_batch 不会执行，
+    按上传中断处理（只按已开始执行的图片扣积分），之后照常到期清理
+
+    Returns:
+        被取消的批次 ID
+    """
+    now = now or datetime.utcnow()
+    batch_ids = session.exec(
+        select(TranslationBatch.id)
+        .where(TranslationBatch.status.in_((BATCH_HELD, BATCH_UPLOADING)),
+               TranslationBatch.created_at < now - timedelta(seconds=upload_timeout))
+    ).all()
+    for batch_id in batch_ids:
+        logger.warning(f"[{batch_id}] 上传超过 {upload_timeout:.0f} 秒未完成，批次已取消")
+        cancel_batch(session, batch_id, retention_seconds)
+    return list(batch_ids)
+
+
+def schedule_cleanup(session: Session, batch_id: str, retention_seconds: int,
+                     user_id: Optional[int] = None) -> None:
+    """登记一个已完成的批次（同步接口），到期后由工作循环清理临时目录"""
+    now = datetime.utcnow()
+    session.add(TranslationBatch(
+        id=batch_id,
+        user_id=user_id,
+        status=BATCH_COMPLETED,
+        completed_at=now,
+        expires_at=now + timedelta(seconds=retention_seconds),
+    ))
+    session.commit()
+
+
+def refresh_batch(session: Session, batch_id: str, retention_seconds: int) -> bool:
+    """
+    批次中的图片全部结束时把批次标记为完成
+    （已取消的批次在最后一张执行中的图片结束后登记到期清理）
+
+    Returns:
+        批次是否（在本次调用中）完成
+    """
+    batch = session.get(TranslationBatch, batch_id)
+    if batch is None or batch.status not in (BATCH_PROCESSING, BATCH_CANCELLED):
+        return False
+    if batch.status == BATCH_CANCELLED and batch.expires_at is not None:
+        return False
+    pending = session.exec(
+        select(func.count(TranslationJob.id))
+        .where(TranslationJob.batch_id == batch_id, TranslationJob.status.in_((JOB_QUEUED, JOB_RUNNING)))
+    ).one()
+    if pending:
+        return False
+    now = datetime.utcnow()
+    if batch.status == BATCH_CANCELLED:
+        batch.expires_at = now + timedelta(seconds=retention_seconds)
+        session.add(batch)
+        session.commit()
+        return False
+    batch.status = BATCH_COMPLETED
+    batch.completed_at = now
+    batch.expires_at = now + timedelta(seconds=retention_seconds)
+    session.add(batch)
+    session.commit()
+    logger.info(f"[{batch_id}] 批次已完成")
+    return True
+
+
+def fail_exhausted_jobs(session: Session, max_attempts: int, now: Optional[datetime] = None) -> List[str]:
+    """
+    租约已过期且已达到最多执行次数的图片记为失败（避免反复拖垮工作进程的图片无限重试）
+
+    Returns:
+        受影响的批次 ID（调用方用 refresh_batch 检查批次是否完成）
+    """
+    now = now or datetime.utcnow()
+    batch_ids = session.exec(
+        update(TranslationJob)
+        .where(TranslationJob.status == JOB_RUNNING, TranslationJob.lease_expires_at < now,
+               TranslationJob.attempts >= max_attempts)
+        .values(status=JOB_FAILED, error="多次执行均未完成（工作进程退出或超时）",
+                lease_owner=None, lease_expires_at=None, finished_at=now)
+        .returning(TranslationJob.batch_id)
+    ).scalars().all()
+    session.commit()
+    for batch_id in set(batch_ids):
+        logger.warning(f"[{batch_id}] 有图片多次执行均未完成，已记为失败")
+    return sorted(set(batch_ids))
+
+
+def fail_orphaned_jobs(session: Session, now: Optional[datetime] = None) -> List[str]:
+    """
+    已取消批次中租约过期的图片记为失败（取消的批次不再重新认领，执行者退出后这些图片不会再结束）
+
+    Returns:
+        受影响的批次 ID（调用方用 refresh_batch 登记到期清理）
+    """
+    now = now or datetime.utcnow()
+    cancelled = select(TranslationBatch.id).where(TranslationBatch.status == BATCH_CANCELLED)
+    batch_ids = session.exec(
+        update(TranslationJob)
+        .where(TranslationJob.status == JOB_RUNNING, TranslationJob.lease_expires_at < now,
+               TranslationJob.batch_id.in_(cancelled.scalar_subquery()))
+        .values(status=JOB_FAILED, error="批次已取消，执行未完成",
+                lease_owner=None, lease_expires_at=None, finished_at=now)
+        .returning(TranslationJob.batch_id)
+    ).scalars().all()
+    session.commit()
+    return sorted(set(batch_ids))
+
+
+def claim_jobs(session: Session, owner: str, limit: int, lease_seconds: float,
+               now: Optional[datetime] = None) -> List[ClaimedJob]:
+    """
+    认领最多 limit 张可执行的图片：排队中且已过退避时间的，或租约已过期的（原执行者已退出）
+
+    认领是单条 UPDATE ... RETURNING，多个工作进程同时认领也不会拿到同一张图片：
+    SQLite 的写操作串行执行；其他数据库上子查询跳过已被锁定的行，外层条件在更新时重新检查
+    """
+    now = now or datetime.utcnow()
+    if limit <= 0:
+        return []
+    available = or_(
+        and_(TranslationJob.status == JOB_QUEUED, TranslationJob.available_at <= now),
+        and_(TranslationJob.status == JOB_RUNNING, TranslationJob.lease_expires_at < now),
+    )
+    claimable = (
+        select(TranslationJob.id)
+        .join(TranslationBatch, TranslationBatch.id == TranslationJob.batch_id)
+        .where(TranslationBatch.status.in_((BATCH_UPLOADING, BATCH_PROCESSING)))
+        .where(available)
+        .order_by(TranslationJob.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True, of=TranslationJob)
+    )
+    claimed_ids = session.exec(
+        update(TranslationJob)
+        .where(TranslationJob.id.in_(claimable.scalar_subquery()), available)
+        .values(status=JOB_RUNNING, lease_owner=owner,
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+                attempts=TranslationJob.attempts + 1, started_at=now)
+        .returning(TranslationJob.id)
+    ).scalars().all()
+    session.commit()
+    if not claimed_ids:
+        return []
+
+    rows = session.exec(
+        select(TranslationJob, TranslationBatch)
+        .join(TranslationBatch, TranslationBatch.id == TranslationJob.batch_id)
+        .where(TranslationJob.id.in_(claimed_ids))
+        .order_by(TranslationJob.id)
+    ).all()
+    return [
+        ClaimedJob(
+            id=job.id,
+            batch_id=job.batch_id,
+            attempts=job.attempts,
+            upload=SavedUpload(
+                path=Path(job.input_path),
+                original_name=job.original_name,
+                size=job.size,
+                content_hash=job.content_hash,
+                format=job.image_format,
+                dimensions=(job.width, job.height) if job.width and job.height else None,
+            ),
+            target_mode=batch.target_mode,
+            output_profile=batch.output_profile,
+        )
+        for job, batch in rows
+    ]
+
+
+def renew_leases(session: Session, owner: str, job_ids: List[int], lease_seconds: float) -> int:
+    """续约执行中的图片，返回续约成功的数量（租约已被他人接管的不会续约）"""
+    if not job_ids:
+        return 0
+    result = session.exec(
+        update(TranslationJob)
+        .where(TranslationJob.id.in_(job_ids), TranslationJob.lease_owner == owner,
+               TranslationJob.status == JOB_RUNNING)
+        .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds))
+    )
+    session.commit()
+    return result.rowcount
+
+
+def release_jobs(session: Session, owner: str, job_ids: List[int]) -> None:
+    """放弃执行中的图片（正常关闭时），立即退回队列且不计执行次数"""
+    if not job_ids:
+        return
+    session.exec(
+        update(TranslationJob)
+        .where(TranslationJob.id.in_(job_ids), TranslationJob.lease_owner == owner,
+               TranslationJob.status == JOB_RUNNING)
+        .values(status=JOB_QUEUED, attempts=TranslationJob.attempts - 1,
+                lease_owner=None, lease_expires_at=None)
+    )
+    session.commit()
+
+
+def finish_job(session: Session, job_id: int, owner: str, output_name: Optional[str] = None,
+               error: Optional[str] = None, retry_delay: Optional[float] = None) -> Optional[str]:
+    """
+    记录图片执行结果（只有仍持有租约的执行者能写入）
+
+    Args:
+        output_name: 成功时的输出文件名
+        error: 失败原因
+        retry_delay: 失败后可重试时的退避秒数（None 表示不再重试）
+
+    Returns:
+        所属批次 ID；租约已失效（已被其他执行者接管）时返回 None
+    """
+    now = datetime.utcnow()
+    if error is None:
+        values = dict(status=JOB_SUCCEEDED, output_name=output_name, error=None, finished_at=now)
+    elif retry_delay is not None:
+        values = dict(status=JOB_QUEUED, error=error, available_at=now + timedelta(seconds=retry_delay))
+    else:
+        values = dict(status=JOB_FAILED, error=error, finished_at=now)
+    batch_id = session.exec(
+        update(TranslationJob)
+        .where(TranslationJob.id == job_id, TranslationJob.lease_owner == owner,
+               TranslationJob.status == JOB_RUNNING)
+        .values(lease_owner=None, lease_expires_at=None, **values)
+        .returning(TranslationJob.batch_id)
+    ).scalar_one_or_none()
+    session.commit()
+    return batch_id
+
+
+def batch_status(session: Session, batch_id: str) -> Optional[Dict]:
+    """批次进度和已结束图片的结果（按上传顺序）"""
+    batch = session.get(TranslationBatch, batch_id)
+    if batch is None:
+        return None
+    jobs = session.exec(
+        select(TranslationJob).where(TranslationJob.batch_id == batch_id).order_by(TranslationJob.position)
+    ).all()
+
+    images = []
+    success = failed = 0
+    for job in jobs:
+        if job.status == JOB_SUCCEEDED:
+            success += 1
+            images.append({
+                "original_name": job.original_name,
+                "translated_name": job.output_name,
+                "file_path": f"{batch_id}/output/{job.output_name}",
+                "status": "success",
+            })
+        elif job.status in _FINISHED_STATES:
+            failed += 1
+            images.append({
+                "original_name": job.original_name,
+                "translated_name": "",
+                "file_path": "",
+                "status": "failed",
+                "error": job.error or ("已取消" if job.status == JOB_CANCELLED else "未知错误"),
+            })
+
+    if batch.status == BATCH_COMPLETED:
+        status = "completed"
+    elif batch.status == BATCH_CANCELLED:
+        status = "failed"
+    elif any(job.status == JOB_RUNNING or job.attempts for job in jobs):
+        status = "processing"
+    else:
+        status = "pending"
+    return {
+        "task_id": batch_id,
+        "status": status,
+        "total": batch.total or len(jobs),
+        "processed": success + failed,
+        "success": success,
+        "failed": failed,
+        "images": images,
+        "error": "上传未完成，批次已取消" if batch.status == BATCH_CANCELLED else None,
+    }
+
+
+def pop_expired_batches(session: Session, now: Optional[datetime] = None) -> List[str]:
+    """删除已到期批次的记录，返回其 ID（调用方清理临时目录）"""
+    now = now or datetime.utcnow()
+    batch_ids = session.exec(
+        select(TranslationBatch.id).where(TranslationBatch.expires_at <= now)
+    ).all()
+    if batch_ids:
+        session.exec(delete(TranslationJob).where(TranslationJob.batch_id.in_(batch_ids)))
+        session.exec(delete(TranslationBatch).where(TranslationBatch.id.in_(batch_ids)))
+        session.commit()
+    return list(batch_ids)
+
+
+def queue_stats(session: Session) -> Dict[str, object]:
+    """队列统计：各状态的图片数、最早排队时间"""
+    counts = dict(session.exec(
+        select(TranslationJob.status, func.count(TranslationJob.id)).group_by(TranslationJob.status)
+    ).all())
+    oldest = session.exec(
+        select(func.min(TranslationJob.created_at)).where(TranslationJob.status == JOB_QUEUED)
+    ).one()
+    return {
+        "jobs": {state: counts.get(state, 0) for state in
+                 (JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED, JOB_REJECTED, JOB_CANCELLED)},
+        "oldest_queued_seconds": round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else 0.0,
+        "batches_in_progress": session.exec(
+            select(func.count(TranslationBatch.id))
+            .where(TranslationBatch.status.in_((BATCH_HELD, BATCH_UPLOADING, BATCH_PROCESSING)))
+        ).one(),
+    }
+
+
+def record_heartbeat(session: Session, worker_id: str, hostname: str, pid: int, concurrency: int,
+                     running: int = 0, succeeded: int = 0, failed: int = 0) -> None:
+    """登记 / 更新工作循环的心跳"""
+    heartbeat = session.get(WorkerHeartbeat, worker_id)
+    if heartbeat is None:
+        heartbeat = WorkerHeartbeat(worker_id=worker_id, hostname=hostname, pid=pid, concurrency=concurrency)
+    heartbeat.running = running
+    heartbeat.succeeded = succeeded
+    heartbeat.failed = failed
+    heartbeat.last_seen_at = datetime.utcnow()
+    session.add(heartbeat)
+    session.commit()
+
+
+def remove_worker(session: Session, worker_id: str) -> None:
+    """工作循环正常退出时注销"""
+    session.exec(delete(WorkerHeartbeat).where(WorkerHeartbeat.worker_id == worker_id))
+    session.commit()
+
+
+def active_workers(session: Session, stale_seconds: float) -> List[Dict[str, object]]:
+    """最近 stale_seconds 秒内有心跳的工作循环"""
+    since = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    heartbeats = session.exec(
+        select(WorkerHeartbeat).where(WorkerHeartbeat.last_seen_at >= since).order_by(WorkerHeartbeat.started_at)
+    ).all()
+    return [
+        {
+            "worker_id": heartbeat.worker_id,
+            "hostname": heartbeat.hostname,
+            "pid": heartbeat.pid,
+            "concurrency": heartbeat.concurrency,
+            "running": heartbeat.running,
+            "succeeded": heartbeat.succeeded,
+            "failed": heartbeat.failed,
+            "started_at": heartbeat.started_at.isoformat(),
+            "last_seen_seconds": round((datetime.utcnow() - heartbeat.last_seen_at).total_seconds(), 1),
+        }
+        for heartbeat in heartbeats
+    ]
+
+
+def prune_workers(session: Session, stale_seconds: float) -> int:
+    """删除长时间没有心跳的工作循环记录（进程被强制结束，未能注销）"""
+    since = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    result = session.exec(delete(WorkerHeartbeat).where(WorkerHeartbeat.last_seen_at < since))
+    session.commit()
+    return result.rowcount
@@ -0,0 +1,334 @@
+"""
+翻译任务工作循环
+从数据库队列按租约认领图片并调用翻译服务执行：
+
+- 同时执行的图片数跟随翻译服务当前的容量（在途上限由 AIMD 调整），不超过 concurrency；
+  上游熔断时暂停认领，队列按可控速率消化
+- 执行中每 1/3 租约续约一次；进程退出未续约的图片在租约过期后被重新认领
+- 正常关闭时把执行中的图片退回队列（不计执行次数）
+- 定期清理到期批次的临时目录和记录（替代原来在后台协程中 sleep 1800 秒），
+  并取消上传超时的批次（接收上传的 Web 进程中途退出）
+- 定期登记心跳（WorkerHeartbeat），管理后台可以看到所有进程中的工作循环
+
+工作循环可以内嵌在 Web 进程中，也可以作为独立进程运行（见 worker.py），多个进程共用同一个数据库队列
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from services import job_queue
+from services.circuit_breaker import CircuitOpenError
+from services.executors import DISK_IO, run_in
+from services.file_handler import TEMP_ROOT, cleanup_temp_dir
+from services.job_queue import ClaimedJob
+from services.translation import TranslationService, get_translation_service
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 清理到期批次的间隔（秒）
+_SWEEP_INTERVAL = 60.0
+
+# 超过该时间没有心跳的工作循环记录会被清理（进程被强制结束、未能注销）
+_STALE_WORKER_SECONDS = 3600.0
+
+
+def default_worker_id() -> str:
+    """工作循环标识：主机名 + 进程号 + 随机后缀（同一主机多个进程、进程重启后都不重复）"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class JobWorker:
+    """数据库队列的工作循环"""
+
+    def __init__(
+        self,
+        engine: Optional[Engine] = None,
+        service_factory: Callable[[], TranslationService] = get_translation_service,
+        worker_id: Optional[str] = None,
+        concurrency: int = 200,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 120.0,
+        max_attempts: int = 3,
+        retry_delay: float = 30.0,
+        retention_seconds: int = 1800,
+        upload_timeout: float = 3600.0,
+    ):
+        """
+        初始化工作循环
+
+        Args:
+            engine: 数据库引擎（默认使用应用的引擎）
+            service_factory: 获取翻译服务的函数
+            worker_id: 租约持有者标识
+            concurrency: 同时执行的图片数上限（翻译服务报告的容量更小时按容量认领）
+            poll_interval: 队列为空时的轮询间隔（秒）
+            lease_seconds: 租约时长（秒）
+            max_attempts: 单张图片最多执行次数
+            retry_delay: 上游熔断导致失败时的重试间隔（秒）
+            retention_seconds: 批次完成后保留结果的时间（秒）
+            upload_timeout: 批次创建后超过该时间仍未上传完成则取消（秒）
+        """
+        if engine is None:
+            from services.db import engine
+        self.engine = engine
+        self.service_factory = service_factory
+        self.worker_id = worker_id or default_worker_id()
+        self.concurrency = max(1, concurrency)
+        self.capacity = self.concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.retention_seconds = retention_seconds
+        self.upload_timeout = upload_timeout
+
+        self._running: Dict[int, asyncio.Task] = {}
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._loop_task: Optional[asyncio.Task] = None
+        self._registered = False
+
+        # 统计
+        self.claimed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self.lost_leases = 0
+        self.swept_batches = 0
+
+    async def _db(self, fn, *args, **kwargs):
+        """在磁盘 I/O 线程池中用独立的 Session 执行队列操作"""
+        def call():
+            with Session(self.engine) as session:
+                return fn(session, *args, **kwargs)
+        return await run_in(DISK_IO, call)
+
+    def notify(self) -> None:
+        """有新图片入队：立即认领，不等轮询间隔"""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """在当前事件循环中启动工作循环"""
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self.run())
+
+    async def run(self) -> None:
+        """工作循环：认领、续约、清理，直到 stop()"""
+        logger.info(f"翻译任务工作循环已启动: {self.worker_id}（并发 {self.concurrency}）")
+        last_heartbeat = last_sweep = 0.0
+        while not self._stopping:
+            try:
+                now = time.monotonic()
+                if now - last_heartbeat >= self.lease_seconds / 3:
+                    await self._heartbeat()
+                    last_heartbeat = now
+                if now - last_sweep >= _SWEEP_INTERVAL:
+                    await self._sweep()
+                    last_sweep = now
+                claimed = await self._claim()
+            except Exception as e:
+                logger.error(f"翻译任务工作循环出错: {e}", exc_info=True)
+                claimed = 0
+
+            # 本轮认领满了说明队列里可能还有，继续认领；否则等待新图片入队、图片完成或轮询间隔
+            if claimed == 0 or len(self._running) >= self.capacity:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _current_capacity(self, service: TranslationService) -> int:
+        """本轮可同时执行的图片数：翻译服务报告的容量（随在途上限变化），不超过 concurrency"""
+        capacity = service.capacity()
+        if capacity is None:
+            return self.concurrency
+        return max(1, min(self.concurrency, capacity))
+
+    async def _claim(self) -> int:
+        service = self.service_factory()
+        self.capacity = self._current_capacity(service)
+        free = self.capacity - len(self._running)
+        if free <= 0:
+            return 0
+        # 上游熔断中：暂停认领，图片留在队列里
+        if not service.is_available():
+            return 0
+
+        for batch_id in await self._db(job_queue.fail_exhausted_jobs, self.max_attempts):
+            await self._db(job_queue.refresh_batch, batch_id, self.retention_seconds)
+
+        jobs = await self._db(job_queue.claim_jobs, self.worker_id, free, self.lease_seconds)
+        for job in jobs:
+            task = asyncio.create_task(self._execute(job))
+            self._running[job.id] = task
+            task.add_done_callback(lambda _, job_id=job.id: self._job_done(job_id))
+        self.claimed += len(jobs)
+        return len(jobs)
+
+    def _job_done(self, job_id: int) -> None:
+        self._running.pop(job_id, None)
+        self._wakeup.set()
+
+    async def _execute(self, job: ClaimedJob) -> None:
+        """执行一张图片并记录结果"""
+        output_dir = TEMP_ROOT / job.batch_id / "output"
+        service = self.service_factory()
+        error: Optional[str] = None
+        retry_delay: Optional[float] = None
+        output_name: Optional[str] = None
+        try:
+            await run_in(DISK_IO, output_dir.mkdir, parents=True, exist_ok=True)
+            result = await service.translate(
+                job.upload.path, output_dir, target_mode=job.target_mode,
+                output_profile=job.output_profile, upload=job.upload
+            )
+            output_name = result.name
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[{job.batch_id}] 翻译失败 {job.upload.path.name}（第 {job.attempts} 次）: {e}")
+            error = str(e) or type(e).__name__
+            # 上游熔断是暂时的，退回队列稍后重试；其余错误翻译服务内部已重试过
+            if isinstance(e, CircuitOpenError) and job.attempts < self.max_attempts:
+                retry_delay = self.retry_delay
+
+        batch_id = await self._db(
+            job_queue.finish_job, job.id, self.worker_id,
+            output_name=output_name, error=error, retry_delay=retry_delay
+        )
+        if batch_id is None:
+            # 租约已被其他工作循环接管（续约不及时），结果以接管者为准
+            self.lost_leases += 1
+            logger.warning(f"[{job.batch_id}] 图片 {job.id} 的租约已失效，结果未记录")
+            return
+        if error is None:
+            self.succeeded += 1
+        elif retry_delay is not None:
+            self.retried += 1
+        else:
+            self.failed += 1
+        await self._db(job_queue.refresh_batch, batch_id, self.retention_seconds)
+
+    async def _heartbeat(self) -> None:
+        """登记心跳并续约执行中的图片"""
+        await self._db(
+            job_queue.record_heartbeat, self.worker_id, socket.gethostname(), os.getpid(), self.concurrency,
+            running=len(self._running), succeeded=self.succeeded, failed=self.failed
+        )
+        self._registered = True
+
+        job_ids = list(self._running)
+        if not job_ids:
+            return
+        renewed = await self._db(job_queue.renew_leases, self.worker_id, job_ids, self.lease_seconds)
+        if renewed < len(job_ids):
+            logger.warning(f"续约 {len(job_ids)} 张图片，仅 {renewed} 张成功（其余租约已失效）")
+
+    async def _sweep(self) -> None:
+        """取消上传超时的批次，清理到期批次的临时目录和记录"""
+        await self._db(job_queue.cancel_stale_uploads, self.upload_timeout, self.retention_seconds)
+        for batch_id in await self._db(job_queue.fail_orphaned_jobs):
+            await self._db(job_queue.refresh_batch, batch_id, self.retention_seconds)
+
+        batch_ids = await self._db(job_queue.pop_expired_batches)
+        for batch_id in batch_ids:
+            await run_in(DISK_IO, cleanup_temp_dir, batch_id)
+        if batch_ids:
+            self.swept_batches += len(batch_ids)
+            logger.info(f"已清理 {len(batch_ids)} 个到期批次")
+        await self._db(job_queue.prune_workers, _STALE_WORKER_SECONDS)
+
+    async def stop(self) -> None:
+        """停止认领，取消执行中的图片并退回队列"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._loop_task is not None:
+            await self._loop_task
+            self._loop_task = None
+
+        job_ids = list(self._running)
+        tasks = list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if job_ids:
+            await self._db(job_queue.release_jobs, self.worker_id, job_ids)
+            logger.info(f"已将 {len(job_ids)} 张执行中的图片退回队列")
+        if self._registered:
+            await self._db(job_queue.remove_worker, self.worker_id)
+            self._registered = False
+        logger.info(f"翻译任务工作循环已停止: {self.worker_id}")
+
+    def stats(self) -> Dict[str, object]:
+        """工作循环统计"""
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "capacity": self.capacity,
+            "running": len(self._running),
+            "claimed": self.claimed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+            "lost_leases": self.lost_leases,
+            "swept_batches": self.swept_batches,
+        }
+
+
+# 进程内的工作循环（应用启动时创建）
+_job_worker: Optional[JobWorker] = None
+
+
+def create_job_worker(**overrides) -> JobWorker:
+    """按配置创建工作循环"""
+    from config import settings
+
+    options = dict(
+        concurrency=settings.JOB_WORKER_CONCURRENCY,
+        poll_interval=settings.JOB_POLL_INTERVAL,
+        lease_seconds=settings.JOB_LEASE_SECONDS,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        retry_delay=settings.JOB_RETRY_DELAY,
+        retention_seconds=settings.JOB_RETENTION_SECONDS,
+        upload_timeout=settings.JOB_UPLOAD_TIMEOUT,
+    )
+    options.update(overrides)
+    return JobWorker(**options)
+
+
+def start_job_worker() -> JobWorker:
+    """启动进程内的工作循环（应用启动时调用）"""
+    global _job_worker
+    if _job_worker is None:
+        _job_worker = create_job_worker()
+        _job_worker.start()
+    return _job_worker
+
+
+def get_job_worker() -> Optional[JobWorker]:
+    """进程内的工作循环（未启动时为 None）"""
+    return _job_worker
+
+
+def notify_job_worker() -> None:
+    """通知进程内的工作循环有新图片入队（未启动时忽略，由其他进程的工作循环轮询认领）"""
+    if _job_worker is not None:
+        _job_worker.notify()
+
+
+async def stop_job_worker() -> None:
+    """停止进程内的工作循环（应用关闭时调用）"""
+    global _job_worker
+    if _job_worker is not None:
+        await _job_worker.stop()
+        _job_worker = None
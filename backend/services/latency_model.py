@@ -0,0 +1,121 @@
+"""
+上游任务耗时模型
+按 (size 比例, 输出模式) 记录任务完成耗时分布，预测完成时间，
+让轮询器把首次及后续查询安排在预计完成前后，减少无效的 "processing" 查询
+"""
+
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+def _quantile(sorted_values, q: float) -> float:
+    """线性插值分位数（输入已排序）"""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    pos = (len(sorted_values) - 1) * q
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (pos - lower)
+
+
+class LatencyModel:
+    """
+    完成耗时模型
+
+    - 首次查询：安排在该类任务历史耗时的低分位（默认 P10）附近
+    - 后续查询：取 "按 progress 外推的剩余时间" 与 "距离历史中位数的剩余时间" 中较小者，
+      限制在 [min_interval, max_interval] 之间；超过预测范围后退回最小间隔
+    """
+
+    def __init__(self, min_interval: float = 3.0, max_interval: float = 15.0,
+                 default_first_delay: float = 15.0, window: int = 200, min_samples: int = 5):
+        """
+        初始化模型
+
+        Args:
+            min_interval: 最小查询间隔（秒）
+            max_interval: 最大查询间隔（秒）
+            default_first_delay: 样本不足时的首次查询延迟（秒）
+            window: 每类任务保留的最近样本数
+            min_samples: 启用预测所需的最少样本数
+        """
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.default_first_delay = default_first_delay
+        self.window = window
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+
+        # 每个完成任务消耗的查询次数
+        self.completed_tasks = 0
+        self.completed_polls = 0
+        self.max_polls_per_task = 0
+
+    def _clamp(self, delay: float) -> float:
+        return min(self.max_interval, max(self.min_interval, delay))
+
+    def record(self, key: str, duration: float, polls: int) -> None:
+        """记录一个完成任务的耗时与查询次数"""
+        with self._lock:
+            samples = self._samples.setdefault(key, deque(maxlen=self.window))
+            samples.append(duration)
+            self.completed_tasks += 1
+            self.completed_polls += polls
+            self.max_polls_per_task = max(self.max_polls_per_task, polls)
+
+    def quantile(self, key: str, q: float) -> Optional[float]:
+        """某类任务完成耗时的分位数（样本不足时返回 None）"""
+        with self._lock:
+            samples = self._samples.get(key)
+            if not samples or len(samples) < self.min_samples:
+                return None
+            return _quantile(sorted(samples), q)
+
+    def first_delay(self, key: str) -> float:
+        """提交后首次查询的延迟"""
+        p10 = self.quantile(key, 0.1)
+        if p10 is None:
+            return self.default_first_delay
+        return max(self.min_interval, p10)
+
+    def next_delay(self, key: str, elapsed: float, progress: float) -> float:
+        """
+        根据已耗时和上游报告的进度，计算下一次查询的延迟
+
+        Args:
+            key: 任务类别
+            elapsed: 提交至今的耗时（秒）
+            progress: 上游报告的进度 (0-100)
+        """
+        estimates = []
+        if 0 < progress < 100:
+            estimates.append(elapsed * (100 - progress) / progress)
+        p50 = self.quantile(key, 0.5)
+        if p50 is not None and p50 > elapsed:
+            estimates.append(p50 - elapsed)
+        if not estimates:
+            return self.min_interval
+        return self._clamp(min(estimates))
+
+    def stats(self) -> Dict[str, object]:
+        """模型统计信息"""
+        with self._lock:
+            per_key = {}
+            for key, samples in self._samples.items():
+                ordered = sorted(samples)
+                per_key[key] = {
+                    "samples": len(ordered),
+                    "p10_seconds": round(_quantile(ordered, 0.1), 1),
+                    "p50_seconds": round(_quantile(ordered, 0.5), 1),
+                    "p90_seconds": round(_quantile(ordered, 0.9), 1),
+                }
+            return {
+                "completed_tasks": self.completed_tasks,
+                "avg_polls_per_completed_task": (
+                    round(self.completed_polls / self.completed_tasks, 2) if self.completed_tasks else 0.0
+                ),
+                "max_polls_per_task": self.max_polls_per_task,
+                "completion_times": per_key,
+            }
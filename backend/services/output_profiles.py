@@ -0,0 +1,113 @@
+"""
+输出编码配置
+翻译结果按批次选择的配置编码：Ozon 上传用渐进式 JPEG、体积优先的 WebP、无损 PNG，
+以及 Pillow 支持时的 AVIF。结果已是目标格式且无需裁剪时直接保存下载数据，不重新编码
+"""
+
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Dict, Optional
+
+from PIL import Image, features
+
+
+@dataclass(frozen=True)
+class OutputProfile:
+    """输出编码配置"""
+    name: str
+    format: str                       # PIL 保存格式
+    suffix: str                       # 输出文件后缀
+    media_type: str                   # 下载时的 Content-Type
+    description: str
+    save_options: Dict[str, object] = field(default_factory=dict)
+    supports_alpha: bool = True
+
+
+_PROFILES = [
+    OutputProfile(
+        name="ozon_jpeg",
+        format="JPEG",
+        suffix=".jpg",
+        media_type="image/jpeg",
+        description="Ozon 上传用 JPEG（渐进式，质量 90）",
+        # optimize 为哈夫曼表做一次额外扫描，体积约小 5-10%，耗时增加很少
+        save_options={"quality": 90, "progressive": True, "optimize": True, "subsampling": "4:2:0"},
+        supports_alpha=False,
+    ),
+    OutputProfile(
+        name="webp",
+        format="WEBP",
+        suffix=".webp",
+        media_type="image/webp",
+        description="体积优先的 WebP（质量 80）",
+        # method 4：压缩率与速度的折中（6 最小但慢数倍）
+        save_options={"quality": 80, "method": 4},
+    ),
+    OutputProfile(
+        name="png",
+        format="PNG",
+        suffix=".png",
+        media_type="image/png",
+        description="无损 PNG",
+        # 不用 optimize（会尝试全部压缩级别，非常慢）
+        save_options={"compress_level": 6},
+    ),
+    OutputProfile(
+        name="avif",
+        format="AVIF",
+        suffix=".avif",
+        media_type="image/avif",
+        description="AVIF（质量 60，体积最小，需 Pillow 支持）",
+        save_options={"quality": 60, "speed": 8},
+    ),
+]
+
+DEFAULT_PROFILE = "ozon_jpeg"
+
+# 文件后缀 -> Content-Type（下载接口使用）
+MEDIA_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+    ".avif": "image/avif",
+}
+
+
+def _is_supported(profile: OutputProfile) -> bool:
+    Image.init()
+    if profile.format == "AVIF" and not features.check("avif"):
+        return False
+    return profile.format in Image.SAVE
+
+
+def available_profiles() -> Dict[str, OutputProfile]:
+    """当前环境可用的输出配置"""
+    return {profile.name: profile for profile in _PROFILES if _is_supported(profile)}
+
+
+def get_output_profile(name: Optional[str] = None) -> OutputProfile:
+    """
+    按名称获取输出配置（None 时取默认配置）
+
+    Raises:
+        ValueError: 未知或当前环境不支持的配置
+    """
+    name = name or DEFAULT_PROFILE
+    profiles = available_profiles()
+    if name not in profiles:
+        raise ValueError(f"不支持的输出格式: {name}，可选: {', '.join(profiles)}")
+    return profiles[name]
+
+
+def media_type_for(filename: str) -> str:
+    """按文件后缀推断 Content-Type"""
+    suffix = filename[filename.rfind("."):].lower() if "." in filename else ""
+    return MEDIA_TYPES.get(suffix, "application/octet-stream")
+
+
+def encode_output(img: Image.Image, profile: OutputProfile) -> bytes:
+    """按输出配置编码图片（不支持透明的格式需传入 RGB 图片）"""
+    buffer = BytesIO()
+    img.save(buffer, format=profile.format, **profile.save_options)
+    return buffer.getvalue()
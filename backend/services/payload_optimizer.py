@@ -0,0 +1,200 @@
+"""
+上传数据优化
+API 输出最大约 1536px，上传全分辨率原图（常见 10MB+ 的 PNG 截图）只会拖慢提交。
+在编码前限制长边、转为高效格式、去除 EXIF/ICC（先转换到 sRGB），并把上传数据压到字节预算以内
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+try:
+    from PIL import ImageCms
+except ImportError:  # Pillow 未编译 LittleCMS 时跳过色彩空间转换
+    ImageCms = None
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 输出格式 -> (PIL 保存格式, MIME 类型, 是否有损)
+_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg", True),
+    "webp": ("WEBP", "image/webp", True),
+    "png": ("PNG", "image/png", False),
+}
+
+# 有损格式每次降低的质量
+_QUALITY_STEP = 10
+
+# 降质后仍超预算时的最多缩小次数
+_MAX_DOWNSCALES = 4
+
+
+@dataclass
+class OptimizedPayload:
+    """优化后的上传数据"""
+    payload: bytes
+    mime_type: str
+    size: Tuple[int, int]   # 实际上传的像素尺寸
+    quality: Optional[int]  # 有损格式的最终质量
+
+
+def to_srgb(img: Image.Image, icc_profile: Optional[bytes]) -> Image.Image:
+    """按嵌入的 ICC 配置文件转换到 sRGB（转换后才能安全去掉 ICC），失败时原样返回"""
+    if not icc_profile or ImageCms is None:
+        return img
+    try:
+        source = ImageCms.ImageCmsProfile(BytesIO(icc_profile))
+        return ImageCms.profileToProfile(img, source, ImageCms.createProfile("sRGB"), outputMode="RGB")
+    except Exception as e:
+        logger.warning(f"ICC 色彩空间转换失败，按 sRGB 处理: {e}")
+        return img
+
+
+class PayloadOptimizer:
+    """
+    上传数据优化器
+
+    - 长边超过 max_long_edge 时等比缩小（保持宽高比，比例恢复不受影响）
+    - 统一编码为 output_format，不写入 EXIF/ICC
+    - 超过 target_bytes 时先逐步降低质量（不低于 min_quality），仍超出再按比例缩小
+    """
+
+    def __init__(self, max_long_edge: int = 1536, output_format: str = "jpeg",
+                 quality: int = 90, min_quality: int = 60, target_bytes: int = 1024 * 1024):
+        """
+        初始化优化器
+
+        Args:
+            max_long_edge: 上传图片长边上限（像素，<= 0 表示不限）
+            output_format: 上传格式 jpeg / webp / png
+            quality: 有损格式的初始质量
+            min_quality: 有损格式的最低质量
+            target_bytes: 上传数据字节预算（<= 0 表示不限）
+        """
+        if output_format not in _FORMATS:
+            raise ValueError(f"不支持的上传格式: {output_format}")
+        self.max_long_edge = max_long_edge
+        self.output_format = output_format
+        self.quality = quality
+        self.min_quality = min(min_quality, quality)
+        self.target_bytes = target_bytes
+
+        # 统计：原图字节、上传字节、提交耗时
+        self._lock = threading.Lock()
+        self.images = 0
+        self.source_bytes = 0
+        self.payload_bytes = 0
+        self.submits = 0
+        self.submit_seconds = 0.0
+        self.submit_payload_bytes = 0
+
+    def _limit_long_edge(self, img: Image.Image, max_edge: int) -> Image.Image:
+        width, height = img.size
+        long_edge = max(width, height)
+        if max_edge <= 0 or long_edge <= max_edge:
+            return img
+        scale = max_edge / long_edge
+        new_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return img.resize(new_size, Image.Resampling.LANCZOS)
+
+    def _encode(self, img: Image.Image, quality: Optional[int]) -> bytes:
+        save_format, _, lossy = _FORMATS[self.output_format]
+        buffer = BytesIO()
+        if lossy:
+            # 不传 exif / icc_profile，上传数据不携带元数据
+            img.save(buffer, format=save_format, quality=quality, optimize=True)
+        else:
+            img.save(buffer, format=save_format, optimize=True)
+        return buffer.getvalue()
+
+    def optimize(self, img: Image.Image, source_bytes: int = 0) -> OptimizedPayload:
+        """
+        缩放并编码上传数据（同步，在线程池中执行）
+
+        Args:
+            img: 预处理完成的 RGB 图片（已填充到 API 比例）
+            source_bytes: 原始上传文件的字节数（用于统计）
+        """
+        _, mime_type, lossy = _FORMATS[self.output_format]
+        img = self._limit_long_edge(img, self.max_long_edge)
+        img.info.clear()
+
+        quality = self.quality if lossy else None
+        payload = self._encode(img, quality)
+
+        # 1. 有损格式：逐步降低质量
+        while lossy and self.target_bytes > 0 and len(payload) > self.target_bytes and quality > self.min_quality:
+            quality = max(self.min_quality, quality - _QUALITY_STEP)
+            payload = self._encode(img, quality)
+
+        # 2. 仍超预算：按面积比例缩小（字节数大致与像素数成正比）
+        for _ in range(_MAX_DOWNSCALES):
+            if self.target_bytes <= 0 or len(payload) <= self.target_bytes:
+                break
+            scale = (self.target_bytes / len(payload)) ** 0.5 * 0.95
+            img = self._limit_long_edge(img, int(max(img.size) * scale))
+            payload = self._encode(img, quality)
+
+        self.record_image(source_bytes, len(payload))
+        return OptimizedPayload(payload=payload, mime_type=mime_type, size=img.size, quality=quality)
+
+    def options(self) -> Dict[str, object]:
+        """构造参数（在图片处理进程中按相同参数重建优化器）"""
+        return {
+            "max_long_edge": self.max_long_edge,
+            "output_format": self.output_format,
+            "quality": self.quality,
+            "min_quality": self.min_quality,
+            "target_bytes": self.target_bytes,
+        }
+
+    def record_image(self, source_bytes: int, payload_bytes: int) -> None:
+        """记录一张图片的优化结果"""
+        with self._lock:
+            self.images += 1
+            self.source_bytes += source_bytes
+            self.payload_bytes += payload_bytes
+
+    def record_submit(self, payload_bytes: int, source_bytes: int, seconds: float) -> Dict[str, float]:
+        """
+        记录一次提交的耗时，返回本张图片的节省情况
+
+        Returns:
+            saved_bytes: 节省的上传字节
+            estimated_saved_seconds: 按当前实测上传速率估算的节省时间
+        """
+        with self._lock:
+            self.submits += 1
+            self.submit_seconds += seconds
+            self.submit_payload_bytes += payload_bytes
+            throughput = self.submit_payload_bytes / self.submit_seconds if self.submit_seconds > 0 else 0.0
+        saved_bytes = max(0, source_bytes - payload_bytes)
+        return {
+            "saved_bytes": saved_bytes,
+            "estimated_saved_seconds": saved_bytes / throughput if throughput > 0 else 0.0,
+        }
+
+    def stats(self) -> Dict[str, object]:
+        """优化器统计信息"""
+        with self._lock:
+            return {
+                "max_long_edge": self.max_long_edge,
+                "format": self.output_format,
+                "target_bytes": self.target_bytes,
+                "images": self.images,
+                "source_mb": round(self.source_bytes / (1024 * 1024), 2),
+                "payload_mb": round(self.payload_bytes / (1024 * 1024), 2),
+                "saved_ratio": (
+                    round(1 - self.payload_bytes / self.source_bytes, 3) if self.source_bytes else 0.0
+                ),
+                "avg_submit_seconds": round(self.submit_seconds / self.submits, 3) if self.submits else 0.0,
+                "submit_throughput_mbps": (
+                    round(self.submit_payload_bytes / self.submit_seconds / (1024 * 1024), 2)
+                    if self.submit_seconds > 0 else 0.0
+                ),
+            }
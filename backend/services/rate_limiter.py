@@ -0,0 +1,98 @@
+"""
+令牌桶限流器
+进程内所有批次共享，控制向上游提交请求的速率：小批次立即开始，大批次按上游允许的速率匀速提交
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    令牌桶
+
+    以 rate 个/秒的速度补充令牌，最多积累 burst 个。
+    等待者按 FIFO 顺序获取令牌，rate <= 0 表示不限流。
+    """
+
+    def __init__(self, rate: float, burst: int, name: str = "upstream"):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数
+            burst: 桶容量（允许的突发请求数）
+            name: 名称（用于日志）
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.name = name
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+        # 统计
+        self.acquired = 0
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> float:
+        """
+        获取一个令牌，令牌不足时等待
+
+        Returns:
+            实际等待时间（秒）
+        """
+        if self.rate <= 0:
+            self.acquired += 1
+            return 0.0
+
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            # 持锁等待，保证先到先得
+            async with self._lock:
+                self._refill()
+                if self._tokens < 1:
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+                    self._refill()
+                self._tokens -= 1
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - start
+        self.acquired += 1
+        self.total_wait += waited
+        self.last_wait = waited
+        self.max_wait = max(self.max_wait, waited)
+        if waited >= 1:
+            logger.info(f"[限流:{self.name}] 等待 {waited:.1f}秒 后获得令牌 (排队 {self.waiting})")
+        return waited
+
+    def stats(self) -> Dict[str, float]:
+        """限流器统计信息"""
+        if self.rate > 0:
+            self._refill()
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self._tokens, 2),
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "total_wait_seconds": round(self.total_wait, 2),
+            "avg_wait_seconds": round(self.total_wait / self.acquired, 3) if self.acquired else 0.0,
+            "max_wait_seconds": round(self.max_wait, 2),
+            "last_wait_seconds": round(self.last_wait, 2),
+        }
@@ -0,0 +1,184 @@
+"""
+翻译结果缓存
+按 输入内容哈希 + 提示词 + 输出模式 做内容寻址，命中时直接复用已翻译的结果，
+跳过 APIMart 的提交与轮询。缓存落盘持久化，超出磁盘预算时按 LRU 淘汰。
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+def hash_content(data: bytes) -> str:
+    """计算输入内容的 SHA-256 哈希"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_cache_key(content_hash: str, *parts: str) -> str:
+    """
+    生成缓存键
+
+    Args:
+        content_hash: 输入图片内容的 SHA-256
+        parts: 其他会影响输出的参数（提示词、输出模式等）
+    """
+    digest = hashlib.sha256(content_hash.encode("utf-8"))
+    for part in parts:
+        digest.update(b"\0")
+        digest.update(part.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    磁盘持久化的 LRU 结果缓存
+
+    每个条目是 cache_dir/<key[:2]>/<key> 一个文件，文件 mtime 记录最近访问时间，
+    启动时扫描目录按 mtime 重建 LRU 顺序。
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 磁盘预算（字节），超出后淘汰最久未访问的条目
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> 文件大小
+        self._total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def _load_index(self) -> None:
+        """扫描缓存目录，按访问时间重建 LRU 索引"""
+        found = []
+        for path in self.cache_dir.glob("??/*"):
+            if not path.is_file() or path.name.endswith(".tmp"):
+                continue
+            stat = path.stat()
+            found.append((stat.st_mtime, path.name, stat.st_size))
+
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+
+        logger.info(f"结果缓存已加载: {len(self._entries)} 条, {self._total_bytes / (1024 * 1024):.1f}MB")
+        self._evict()
+
+    def get(self, key: str, dest_path: Path) -> bool:
+        """
+        查询缓存，命中时把结果复制到 dest_path
+
+        Returns:
+            是否命中
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return False
+            self._entries.move_to_end(key)
+
+        entry_path = self._entry_path(key)
+        try:
+            shutil.copyfile(entry_path, dest_path)
+            os.utime(entry_path)
+        except FileNotFoundError:
+            # 文件被外部删除，修正索引
+            with self._lock:
+                size = self._entries.pop(key, None)
+                if size is not None:
+                    self._total_bytes -= size
+                self.misses += 1
+            return False
+
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def put(self, key: str, source_path: Path) -> None:
+        """将翻译结果写入缓存（先写临时文件再原子替换）"""
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry_path.with_name(f"{key}.{uuid.uuid4().hex[:8]}.tmp")
+        shutil.copyfile(source_path, tmp_path)
+        os.replace(tmp_path, entry_path)
+        size = entry_path.stat().st_size
+
+        with self._lock:
+            old_size = self._entries.pop(key, None)
+            if old_size is not None:
+                self._total_bytes -= old_size
+            self._entries[key] = size
+            self._total_bytes += size
+            self.stores += 1
+        self._evict()
+
+    def _evict(self) -> None:
+        """超出磁盘预算时淘汰最久未访问的条目"""
+        while True:
+            with self._lock:
+                if self._total_bytes <= self.max_bytes or not self._entries:
+                    return
+                key, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                self.evictions += 1
+            try:
+                self._entry_path(key).unlink()
+            except FileNotFoundError:
+                pass
+            logger.info(f"结果缓存淘汰: {key[:12]}... ({size / 1024:.0f}KB)")
+
+    def stats(self) -> Dict[str, float]:
+        """缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+
+_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """获取进程内共享的结果缓存（未启用时返回 None）"""
+    global _result_cache
+    from config import settings
+
+    if not settings.RESULT_CACHE_ENABLED:
+        return None
+    if _result_cache is None:
+        _result_cache = ResultCache(
+            Path(settings.RESULT_CACHE_DIR),
+            max_bytes=settings.RESULT_CACHE_MAX_MB * 1024 * 1024,
+        )
+    return _result_cache
@@ -0,0 +1,113 @@
+"""
+上游请求重试策略
+提交、状态查询、结果下载共用：按幂等性和错误类型决定是否重试，
+指数退避 + 全抖动（避免同步重试风暴），优先遵循 Retry-After，并限制每张图片的重试总次数
+"""
+
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import FrozenSet, Optional
+
+import httpx
+
+# 幂等请求（GET 状态查询、下载）可重试的状态码
+IDEMPOTENT_RETRY_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# 非幂等请求（POST 提交）只在上游明确表示"未处理"时重试，避免重复创建任务、重复计费
+NON_IDEMPOTENT_RETRY_STATUSES = frozenset({429, 503})
+
+# 请求尚未送达上游的传输错误：对非幂等请求也可以安全重试
+_NOT_DELIVERED_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class RetryBudget:
+    """单张图片的重试预算：提交、轮询、下载共用，耗尽后不再重试"""
+
+    def __init__(self, max_retries: int = 8):
+        self.max_retries = max_retries
+        self.used = 0
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.max_retries - self.used)
+
+    def consume(self) -> bool:
+        """消耗一次重试机会，预算已耗尽时返回 False"""
+        if self.used >= self.max_retries:
+            return False
+        self.used += 1
+        return True
+
+
+class RetryPolicy:
+    """
+    重试策略
+
+    - 幂等请求：所有传输错误及 408/425/429/5xx 重试
+    - 非幂等请求：仅连接阶段错误（请求未送达）及 429/503 重试
+    - 退避：random(0, min(max_delay, base_delay * 2^attempt))；响应带 Retry-After 时以其为准
+    """
+
+    def __init__(self, idempotent: bool = True, max_attempts: int = 4,
+                 base_delay: float = 0.5, max_delay: float = 20.0, max_retry_after: float = 60.0,
+                 retry_statuses: Optional[FrozenSet[int]] = None):
+        """
+        初始化重试策略
+
+        Args:
+            idempotent: 请求是否幂等
+            max_attempts: 单次调用最多尝试次数（含首次）
+            base_delay: 退避基准时间（秒）
+            max_delay: 单次退避上限（秒）
+            max_retry_after: Retry-After 的上限（秒）
+            retry_statuses: 可重试的状态码（默认按幂等性选择）
+        """
+        self.idempotent = idempotent
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        if retry_statuses is None:
+            retry_statuses = IDEMPOTENT_RETRY_STATUSES if idempotent else NON_IDEMPOTENT_RETRY_STATUSES
+        self.retry_statuses = retry_statuses
+
+    def is_retryable_error(self, error: Exception) -> bool:
+        """传输错误是否可重试"""
+        if self.idempotent:
+            return isinstance(error, httpx.TransportError)
+        return isinstance(error, _NOT_DELIVERED_ERRORS)
+
+    def is_retryable_status(self, status_code: int) -> bool:
+        """响应状态码是否可重试"""
+        return status_code in self.retry_statuses
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次重试（从 0 开始）的退避时间：指数退避 + 全抖动"""
+        cap = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    def delay_for_response(self, response: httpx.Response, attempt: int) -> float:
+        """可重试响应的等待时间：优先 Retry-After，否则指数退避"""
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        return self.backoff(attempt)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头（秒数或 HTTP 日期），无法解析时返回 None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
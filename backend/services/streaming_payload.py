@@ -0,0 +1,71 @@
+"""
+流式提交请求体
+local 存储模式下图片以 base64 data URL 内嵌在 JSON 中。这里不拼接完整的 base64 字符串，
+而是按 "JSON 前缀 + 分块 base64 + JSON 后缀" 逐块发送，内存中只保留原始图片字节和一个分块
+"""
+
+import base64
+import json
+import uuid
+from typing import AsyncIterator, Dict, Iterator
+
+# 每块原始字节数：必须是 3 的倍数，保证分块编码结果拼接后与整体编码一致
+DEFAULT_CHUNK_SIZE = 3 * 64 * 1024
+
+# payload 中图片 data URL 的占位符
+DATA_URL_PLACEHOLDER = f"__image_data_url_{uuid.uuid4().hex}__"
+
+
+def base64_length(size: int) -> int:
+    """size 字节的数据 base64 编码后的长度（含填充）"""
+    return (size + 2) // 3 * 4
+
+
+class StreamingJSONBody:
+    """
+    JSON 请求体，其中的图片 data URL 在发送时分块生成
+
+    可重复迭代（每次重试重新生成），长度预先计算，请求带精确的 Content-Length 而不是 chunked 编码
+    """
+
+    def __init__(self, payload: dict, data: bytes, mime_type: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        初始化请求体
+
+        Args:
+            payload: 请求 JSON，图片 data URL 的位置填 DATA_URL_PLACEHOLDER（只能出现一次）
+            data: 图片原始字节
+            mime_type: 图片 MIME 类型
+            chunk_size: 每块编码的原始字节数（会向下取整到 3 的倍数）
+        """
+        text = json.dumps(payload, ensure_ascii=False)
+        parts = text.split(json.dumps(DATA_URL_PLACEHOLDER))
+        if len(parts) != 2:
+            raise ValueError("payload 中必须恰好包含一个图片占位符")
+        self.prefix = (parts[0] + f'"data:{mime_type};base64,').encode("utf-8")
+        self.suffix = ('"' + parts[1]).encode("utf-8")
+        self.data = memoryview(data)
+        self.chunk_size = max(3, chunk_size - chunk_size % 3)
+
+    @property
+    def content_length(self) -> int:
+        return len(self.prefix) + base64_length(len(self.data)) + len(self.suffix)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            "Content-Length": str(self.content_length),
+        }
+
+    def chunks(self) -> Iterator[bytes]:
+        """按顺序生成请求体的各个分块"""
+        yield self.prefix
+        for start in range(0, len(self.data), self.chunk_size):
+            yield base64.b64encode(self.data[start:start + self.chunk_size])
+        yield self.suffix
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        # 只提供异步迭代：httpx 对同时可同步迭代的对象会按同步请求体处理
+        for chunk in self.chunks():
+            yield chunk
@@ -0,0 +1,236 @@
+"""
+上游任务集中轮询器
+所有在途的 APIMart task_id 由同一个调度循环管理：按下一次检查时间排成最小堆，
+在全局请求预算内发出状态查询，任务完成或失败时唤醒对应图片的 Future
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services.circuit_breaker import CircuitOpenError
+from services.errors import TranslationError
+from services.latency_model import LatencyModel
+from services.rate_limiter import TokenBucket
+from services.retry_policy import RetryBudget
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 状态查询函数：参数为 task_id 和所属图片的重试预算，返回任务 data（包含 status / progress），
+# 任务失败时抛出 TranslationError
+StatusFetcher = Callable[[str, Optional[RetryBudget]], Awaitable[dict]]
+
+
+@dataclass
+class PolledTask:
+    """轮询中的任务"""
+    task_id: str
+    future: asyncio.Future
+    key: str = ""
+    submitted_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+    retry_budget: Optional[RetryBudget] = None
+
+
+class TaskPoller:
+    """
+    集中轮询器
+
+    - 单个调度协程 + 最小堆（下一次检查时间），无论多少在途任务都只有一个定时器
+    - 所有状态查询共享一个令牌桶，限制每秒请求总数
+    - 配置了耗时模型时，按预测完成时间安排查询，否则固定间隔
+    """
+
+    def __init__(self, fetch_status: StatusFetcher, poll_interval: float = 3.0,
+                 max_attempts: int = 100, request_rate: float = 10.0, request_burst: int = 20,
+                 latency_model: Optional[LatencyModel] = None):
+        """
+        初始化轮询器
+
+        Args:
+            fetch_status: 查询单个任务状态的协程函数
+            poll_interval: 同一任务两次查询的间隔（秒，耗时模型的最小间隔）
+            max_attempts: 单个任务最大查询次数（等待上限为 poll_interval * max_attempts 秒）
+            request_rate: 全局状态查询速率上限（次/秒）
+            request_burst: 全局状态查询允许的突发数
+            latency_model: 完成耗时模型（None 表示固定间隔轮询）
+        """
+        self.fetch_status = fetch_status
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.max_wait = poll_interval * max_attempts
+        self.latency_model = latency_model
+        self.request_budget = TokenBucket(request_rate, request_burst, name="poll")
+
+        self._tasks: Dict[str, PolledTask] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._checks: set = set()
+
+        # 统计
+        self.polls = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.deferred = 0
+
+    def _ensure_running(self) -> None:
+        """在当前事件循环中启动调度协程（首次使用或事件循环更换后）"""
+        loop = asyncio.get_running_loop()
+        if self._runner is not None and not self._runner.done() and self._runner.get_loop() is loop:
+            return
+        self._tasks.clear()
+        self._heap.clear()
+        self._checks.clear()
+        self._wakeup = asyncio.Event()
+        self.request_budget = TokenBucket(self.request_budget.rate, self.request_budget.burst, name="poll")
+        self._runner = loop.create_task(self._run())
+
+    def _schedule(self, task_id: str, delay: float) -> None:
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), task_id))
+        self._wakeup.set()
+
+    async def wait(self, task_id: str, key: str = "", retry_budget: Optional[RetryBudget] = None) -> dict:
+        """
+        登记任务并等待其完成
+
+        Args:
+            task_id: 上游任务ID
+            key: 任务类别（size 比例 + 输出模式），用于耗时预测
+            retry_budget: 所属图片的重试预算（状态查询的重试从中扣除）
+
+        Returns:
+            完成的任务 data
+
+        Raises:
+            TranslationError: 任务失败或超时
+        """
+        self._ensure_running()
+        future = asyncio.get_running_loop().create_future()
+        self._tasks[task_id] = PolledTask(
+            task_id=task_id, future=future, key=key, retry_budget=retry_budget
+        )
+        if self.latency_model is not None:
+            first_delay = self.latency_model.first_delay(key)
+        else:
+            first_delay = self.poll_interval
+        self._schedule(task_id, first_delay)
+        try:
+            return await future
+        finally:
+            # 调用方取消时不再继续查询
+            self._tasks.pop(task_id, None)
+
+    async def _run(self) -> None:
+        """调度循环：休眠到最早的检查时间，依次在请求预算内发出到期的查询"""
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            due_at, _, task_id = self._heap[0]
+            delay = due_at - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    # 有新任务加入时提前醒来，重新检查堆顶
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            task = self._tasks.get(task_id)
+            if task is None or task.future.done():
+                continue
+
+            await self.request_budget.acquire()
+            check = asyncio.create_task(self._check(task))
+            self._checks.add(check)
+            check.add_done_callback(self._checks.discard)
+
+    async def _check(self, task: PolledTask) -> None:
+        """查询一次任务状态，并决定唤醒等待者或重新排期"""
+        try:
+            data = await self.fetch_status(task.task_id, task.retry_budget)
+        except CircuitOpenError:
+            # 状态查询端点熔断中：任务可能仍在上游处理，推迟查询而不是判定失败
+            self.deferred += 1
+            self._reschedule(task, progress=0)
+            return
+        except Exception as e:
+            task.attempts += 1
+            self.polls += 1
+            self.failed += 1
+            if not task.future.done():
+                task.future.set_exception(e)
+            return
+
+        task.attempts += 1
+        self.polls += 1
+        if task.future.done():
+            return
+
+        status = data.get("status", "")
+        logger.info(
+            f"任务 {task.task_id} 状态: {status}, 进度: {data.get('progress', 0)}% "
+            f"(第 {task.attempts} 次查询)"
+        )
+
+        if status == "completed":
+            self.completed += 1
+            if self.latency_model is not None:
+                self.latency_model.record(task.key, time.monotonic() - task.submitted_at, task.attempts)
+            task.future.set_result(data)
+        else:
+            # 其他状态继续轮询 (pending, processing)
+            self._reschedule(task, progress=float(data.get("progress") or 0))
+
+    def _reschedule(self, task: PolledTask, progress: float) -> None:
+        """安排下一次查询；超过最大查询次数或等待上限时判定超时"""
+        if task.future.done():
+            return
+        elapsed = time.monotonic() - task.submitted_at
+        if task.attempts >= self.max_attempts or (self.max_wait > 0 and elapsed >= self.max_wait):
+            self.timed_out += 1
+            task.future.set_exception(TranslationError(f"任务超时: {task.task_id}"))
+            return
+        if self.latency_model is not None:
+            delay = self.latency_model.next_delay(task.key, elapsed, progress)
+        else:
+            delay = self.poll_interval
+        self._schedule(task.task_id, delay)
+
+    async def close(self) -> None:
+        """停止调度循环，未完成的等待者收到异常"""
+        if self._runner is not None and not self._runner.done():
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+        for check in list(self._checks):
+            check.cancel()
+        for task in self._tasks.values():
+            if not task.future.done():
+                task.future.set_exception(TranslationError("轮询器已关闭"))
+        self._runner = None
+
+    def stats(self) -> Dict[str, float]:
+        """轮询器统计信息"""
+        return {
+            "tracked_tasks": len(self._tasks),
+            "scheduled_checks": len(self._heap),
+            "polls": self.polls,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "deferred_by_circuit_breaker": self.deferred,
+            "request_budget": self.request_budget.stats(),
+            "latency_model": self.latency_model.stats() if self.latency_model is not None else None,
+        }
@@ -0,0 +1,165 @@
+"""
+分块翻译
+Ozon 详情页长图（如 1000x6000）整张填充到 2:3 后大部分是白边，API 输出时再整体缩小，文字无法辨认。
+长宽比超过阈值的图片沿长边切成若干张恰好为 2:3（或 3:2）的重叠分块，各分块并发翻译，
+结果按原位置拼接，重叠区域线性渐变融合以消除接缝
+"""
+
+import logging
+import math
+from dataclasses import dataclass
+from io import BytesIO
+from typing import List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from services.geometry import crop_box_for, plan_geometry
+from services.image_pipeline import PreparedImage, prepare_decoded, to_rgb
+from services.output_profiles import OutputProfile, encode_output
+from services.payload_optimizer import PayloadOptimizer, to_srgb
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+Size = Tuple[int, int]
+Box = Tuple[int, int, int, int]
+
+# 分块的长边 / 短边（2:3 或 3:2）
+_TILE_ASPECT = 1.5
+
+
+@dataclass(frozen=True)
+class TilePlan:
+    """一张长图的分块方案"""
+    source_size: Size
+    vertical: bool               # True: 竖长图，分块上下排列；False: 横长图，左右排列
+    boxes: Tuple[Box, ...]       # 各分块在原图上的位置 (left, top, right, bottom)
+
+    @property
+    def size_ratio(self) -> str:
+        return "2:3" if self.vertical else "3:2"
+
+    @property
+    def count(self) -> int:
+        return len(self.boxes)
+
+
+def plan_tiles(size: Size, min_aspect: float = 2.0, overlap_ratio: float = 0.1,
+               max_tiles: int = 8) -> Optional[TilePlan]:
+    """
+    计算分块方案
+
+    Args:
+        size: 原图尺寸
+        min_aspect: 长边 / 短边达到该值才分块
+        overlap_ratio: 相邻分块的最小重叠（占分块长边的比例）
+        max_tiles: 分块数上限，超过时不分块（按整图填充处理）
+
+    Returns:
+        分块方案；无需分块时返回 None
+    """
+    width, height = size
+    vertical = height >= width
+    long_edge, short_edge = (height, width) if vertical else (width, height)
+    if short_edge <= 0 or long_edge / short_edge < min_aspect:
+        return None
+
+    tile_long = round(short_edge * _TILE_ASPECT)
+    if tile_long >= long_edge:
+        return None
+    overlap = round(tile_long * overlap_ratio)
+    count = max(2, math.ceil((long_edge - overlap) / (tile_long - overlap)))
+    if count > max_tiles:
+        logger.info(f"长图 {width}x{height} 需要 {count} 个分块，超过上限 {max_tiles}，按整图处理")
+        return None
+
+    # 分块均匀分布：首尾对齐原图边缘，实际重叠不小于 overlap
+    step = (long_edge - tile_long) / (count - 1)
+    starts = [round(i * step) for i in range(count)]
+    if vertical:
+        boxes = tuple((0, start, width, start + tile_long) for start in starts)
+    else:
+        boxes = tuple((start, 0, start + tile_long, height) for start in starts)
+    return TilePlan(source_size=size, vertical=vertical, boxes=boxes)
+
+
+def prepare_tiles(data: bytes, plan: TilePlan,
+                  optimizer: Optional[PayloadOptimizer] = None) -> List[PreparedImage]:
+    """
+    解码一次，按分块方案裁剪并编码各分块的上传数据（同步，在线程池中执行）
+    分块本身就是 API 支持的比例，不需要填充白边
+    """
+    max_long_edge = optimizer.max_long_edge if optimizer is not None else 0
+    tiles = []
+    with Image.open(BytesIO(data)) as src:
+        source_format = src.format
+        img = to_rgb(src)
+        if optimizer is not None:
+            img = to_srgb(img, src.info.get("icc_profile"))
+
+        for box in plan.boxes:
+            tile = img.crop(box)
+            tile_plan = plan_geometry(tile.size, max_long_edge=max_long_edge)
+            tiles.append(prepare_decoded(
+                tile, tile_plan, source_format, optimizer, source_bytes=len(data) // plan.count
+            ))
+
+    payload_bytes = sum(len(tile.payload) for tile in tiles)
+    logger.info(
+        f"长图分块完成: {plan.source_size[0]}x{plan.source_size[1]} -> {plan.count} 个 {plan.size_ratio} 分块，"
+        f"上传数据 {payload_bytes / (1024 * 1024):.2f}MB"
+    )
+    return tiles
+
+
+def _blend_mask(size: Size, overlap: int, vertical: bool) -> Optional[Image.Image]:
+    """重叠区域从 0 渐变到 255 的粘贴蒙版（无重叠时返回 None）"""
+    if overlap <= 0:
+        return None
+    mask = Image.new("L", size, 255)
+    gradient = Image.linear_gradient("L")
+    if vertical:
+        gradient = gradient.resize((size[0], overlap))
+    else:
+        # linear_gradient 自上而下渐变，逆时针旋转后变为自左向右
+        gradient = gradient.transpose(Image.Transpose.ROTATE_90).resize((overlap, size[1]))
+    mask.paste(gradient, (0, 0))
+    return mask
+
+
+def stitch_tiles(results: Sequence[bytes], tiles: Sequence[PreparedImage], plan: TilePlan,
+                 profile: OutputProfile) -> bytes:
+    """
+    拼接各分块的翻译结果并按输出配置编码（同步，在线程池中执行）
+
+    输出分辨率跟随翻译结果：按第一个分块结果相对原图的缩放比例放大/缩小整张图
+    """
+    width, height = plan.source_size
+    canvas = None
+    scale = 1.0
+    previous_end = 0
+    for index, (data, tile, box) in enumerate(zip(results, tiles, plan.boxes)):
+        with Image.open(BytesIO(data)) as opened:
+            # 按分块预处理记录的裁剪框去掉可能的白边
+            crop = crop_box_for(tile.crop_box, opened.size) if tile.crop_box is not None else None
+            if crop is not None and crop != (0, 0, opened.width, opened.height):
+                result = opened.crop(crop)
+            else:
+                result = opened.copy()
+        result = to_rgb(result)
+
+        if canvas is None:
+            # 短边对齐第一个分块结果的宽（竖图）或高（横图）
+            scale = result.width / width if plan.vertical else result.height / height
+            canvas = Image.new("RGB", (max(1, round(width * scale)), max(1, round(height * scale))), (255, 255, 255))
+
+        left, top, right, bottom = (round(value * scale) for value in box)
+        right, bottom = min(right, canvas.width), min(bottom, canvas.height)
+        tile_img = result.resize((right - left, bottom - top), Image.Resampling.LANCZOS)
+
+        start = top if plan.vertical else left
+        overlap = max(0, previous_end - start) if index > 0 else 0
+        canvas.paste(tile_img, (left, top), _blend_mask(tile_img.size, overlap, plan.vertical))
+        previous_end = bottom if plan.vertical else right
+
+    return encode_output(canvas, profile)
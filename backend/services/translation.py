@@ -11,10 +11,40 @@ import logging
 import time
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Tuple
+from typing import Awaitable, Callable, Optional, Tuple
 import httpx
 from PIL import Image
 
+from services.image_pipeline import (
+    SUPPORTED_RATIOS,
+    PreparedImage,
+    best_fit_ratio,
+    pad_to_ratio,
+    passthrough_image,
+    prepare_image,
+    probe_image,
+    restore_result,
+    to_rgb,
+)
+from services.adaptive_concurrency import AIMDController
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from services.concurrency import ConcurrencyLimiter
+from services.errors import TranslationError
+from services.executors import DISK_IO, ENCODING, IMAGE_CPU, run_in
+from services.file_handler import SavedUpload, write_bytes_atomic
+from services.geometry import crop_box_for
+from services.http_client import UpstreamClients, create_upstream_clients
+from services.image_workers import ImageProcessPool
+from services.latency_model import LatencyModel
+from services.output_profiles import DEFAULT_PROFILE, OutputProfile, get_output_profile
+from services.payload_optimizer import PayloadOptimizer
+from services.rate_limiter import TokenBucket
+from services.result_cache import ResultCache, get_result_cache, hash_content, make_cache_key
+from services.retry_policy import RetryBudget, RetryPolicy
+from services.streaming_payload import DATA_URL_PLACEHOLDER, StreamingJSONBody
+from services.task_poller import TaskPoller
+from services.tiling import TilePlan, plan_tiles, prepare_tiles, stitch_tiles
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
@@ -23,13 +53,17 @@ class TranslationService(ABC):
     """翻译服务抽象基类"""
     
     @abstractmethod
-    async def translate(self, input_path: Path, output_dir: Path) -> Path:
+    async def translate(self, input_path: Path, output_dir: Path, target_mode: str = "original",
+                        output_profile: Optional[str] = None, upload: Optional[SavedUpload] = None) -> Path:
         """
         翻译单张图片
         
         Args:
             input_path: 输入图片路径
             output_dir: 输出目录
+            target_mode: 输出模式 "original" | "ozon_3_4"
+            output_profile: 输出编码配置名称（None 使用服务默认配置）
+            upload: 保存上传文件时得到的元数据（内容哈希、尺寸），有则不再重新计算
             
         Returns:
             翻译后的图片路径
@@ -39,10 +73,25 @@ class TranslationService(ABC):
         """
         pass
 
+    async def warmup(self) -> None:
+        """启动时预热（默认无操作）"""
+        pass
+    
+    async def close(self) -> None:
+        """释放资源（默认无操作）"""
+        pass
+
+    def is_available(self) -> bool:
+        """上游是否可接收新任务（默认可用）"""
+        return True
 
-class TranslationError(Exception):
-    """翻译服务异常"""
-    pass
+    def capacity(self) -> Optional[int]:
+        """建议同时执行的图片数，任务队列按此认领（默认 None：不限制，按工作循环自身配置）"""
+        return None
+
+    def metrics(self) -> dict:
+        """运行指标（默认为空）"""
+        return {}
 
 
 class MockTranslationService(TranslationService):
@@ -63,7 +112,8 @@ class MockTranslationService(TranslationService):
         self.max_delay = max_delay
         logger.info("MockTranslationService 已初始化")
     
-    async def translate(self, input_path: Path, output_dir: Path) -> Path:
+    async def translate(self, input_path: Path, output_dir: Path, target_mode: str = "original",
+                        output_profile: Optional[str] = None, upload: Optional[SavedUpload] = None) -> Path:
         """
         模拟翻译图片
         
@@ -95,16 +145,25 @@ class RealTranslationService(TranslationService):
     """
     
     # API 支持的宽高比 (宽:高)
-    # 文档: https://docs.apimart.ai/en/api-reference/images/gpt-4o/generation
-    SUPPORTED_RATIOS = {
-        "1:1": 1.0,
-        "2:3": 2/3,
-        "3:2": 3/2,
-    }
+    SUPPORTED_RATIOS = SUPPORTED_RATIOS
     
     def __init__(self, api_key: str, api_endpoint: str, prompt: str,
                  poll_interval: float = 2.0, poll_max_attempts: int = 60,
-                 storage_mode: str = "local", base_url: str = "http://localhost:8000"):
+                 storage_mode: str = "local", base_url: str = "http://localhost:8000",
+                 result_cache: Optional[ResultCache] = None,
+                 http_clients: Optional[UpstreamClients] = None,
+                 submit_rate: float = 2.0, submit_burst: int = 5,
+                 preprocess_concurrency: int = 4, submit_concurrency: int = 5,
+                 max_inflight_tasks: int = 200,
+                 poll_request_rate: float = 10.0, poll_request_burst: int = 20,
+                 latency_model: Optional[LatencyModel] = None,
+                 adaptive_concurrency: Optional[dict] = None,
+                 circuit_breaker: Optional[dict] = None,
+                 retry_policy: Optional[dict] = None, retry_budget: int = 8,
+                 payload_optimizer: Optional[PayloadOptimizer] = None,
+                 output_profile: str = DEFAULT_PROFILE,
+                 image_pool: Optional[ImageProcessPool] = None,
+                 tiling: Optional[dict] = None):
         """
         初始化真实翻译服务
         
@@ -116,6 +175,24 @@ class RealTranslationService(TranslationService):
             poll_max_attempts: 最大轮询次数
             storage_mode: 存储模式 (local: Base64, cloud: URL)
             base_url: 服务器公网地址（cloud 模式使用）
+            result_cache: 翻译结果缓存（None 表示不启用）
+            http_clients: 共享的上游 HTTP 客户端组（None 时自行创建并在 close 时关闭）
+            submit_rate: 提交任务速率上限（个/秒，<= 0 表示不限）
+            submit_burst: 允许的突发提交数
+            preprocess_concurrency: 本地预处理（解码/缩放/编码）并发上限
+            submit_concurrency: 同时上传提交请求的上限
+            max_inflight_tasks: 上游在途任务（已提交、未完成）上限
+            poll_request_rate: 全局状态查询速率上限（次/秒）
+            poll_request_burst: 全局状态查询允许的突发数
+            latency_model: 完成耗时模型（None 表示固定间隔轮询）
+            adaptive_concurrency: AIMD 控制器参数（None 表示在途上限固定为 max_inflight_tasks）
+            circuit_breaker: 熔断器参数，提交/状态查询/下载各一个（None 表示不启用）
+            retry_policy: 重试参数（max_attempts / base_delay / max_delay，None 使用默认值）
+            retry_budget: 每张图片在提交、轮询、下载中累计允许的重试次数
+            payload_optimizer: 上传数据优化器（None 表示按原格式、原分辨率上传）
+            output_profile: 默认输出编码配置名称
+            image_pool: 图片处理进程池（None 表示在线程池中处理，关闭服务时一并关闭）
+            tiling: 长图分块参数（min_aspect / overlap_ratio / max_tiles，None 表示不分块）
         """
         self.api_key = api_key
         self.api_endpoint = api_endpoint
@@ -124,232 +201,286 @@ class RealTranslationService(TranslationService):
         self.poll_max_attempts = poll_max_attempts
         self.storage_mode = storage_mode
         self.base_url = base_url
+        self.result_cache = result_cache
+        self.payload_optimizer = payload_optimizer
+        self.output_profile = get_output_profile(output_profile)
+        self.image_pool = image_pool
+        self.tiling = tiling
+        self.tiled_images = 0
+        self.tiles_submitted = 0
+        
+        # HTTP 客户端：API 与结果图片 CDN 使用独立连接池
+        self._owns_clients = http_clients is None
+        self.http_clients = http_clients or UpstreamClients(api_key, api_endpoint)
+        self.client = self.http_clients.api
+        self.download_client = self.http_clients.cdn
+        
+        # 提交限流：实例在进程内共享，所有批次共用同一个令牌桶
+        self.submit_rate_limiter = TokenBucket(submit_rate, submit_burst, name="submit")
         
-        # 创建 HTTP 客户端
-        self.client = httpx.AsyncClient(
-            timeout=httpx.Timeout(180.0, connect=60.0),
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
+        # 分阶段并发限制：本地 CPU 预处理、上传提交、上游在途任务互不占用名额
+        self.preprocess_slots = ConcurrencyLimiter(preprocess_concurrency, name="preprocess")
+        self.submit_slots = ConcurrencyLimiter(submit_concurrency, name="submit")
+        self.inflight_slots = ConcurrencyLimiter(max_inflight_tasks, name="inflight")
+        
+        # 在途上限由 AIMD 控制器根据上游健康状况自动调整（上界为 max_inflight_tasks）
+        self.concurrency_controller = None
+        if adaptive_concurrency is not None:
+            self.concurrency_controller = AIMDController(
+                self.inflight_slots, max_limit=max_inflight_tasks, **adaptive_concurrency
+            )
+        
+        # 按端点熔断：上游故障时快速失败，不再逐张图片重试、轮询
+        self.breakers: dict[str, CircuitBreaker] = {}
+        if circuit_breaker is not None:
+            self.breakers = {
+                endpoint: CircuitBreaker(endpoint, **circuit_breaker)
+                for endpoint in ("submit", "status", "download")
             }
+        
+        # 重试策略：提交非幂等，只在请求未送达或上游明确拒绝时重试；状态查询和下载幂等
+        retry_options = retry_policy or {}
+        self.retry_policies = {
+            "submit": RetryPolicy(idempotent=False, **retry_options),
+            "status": RetryPolicy(idempotent=True, **retry_options),
+            "download": RetryPolicy(idempotent=True, **retry_options),
+        }
+        self.retry_budget_per_image = retry_budget
+        self.retries = {endpoint: 0 for endpoint in self.retry_policies}
+        self.retry_budget_exhausted = 0
+        
+        # 集中轮询器：所有在途任务共享一个调度循环和请求预算
+        self.poller = TaskPoller(
+            self._fetch_task_status,
+            poll_interval=poll_interval,
+            max_attempts=poll_max_attempts,
+            request_rate=poll_request_rate,
+            request_burst=poll_request_burst,
+            latency_model=latency_model,
         )
         logger.info("RealTranslationService 已初始化")
     
-    async def _request_with_retry(self, method: str, url: str, **kwargs) -> httpx.Response:
+    async def _request_with_retry(self, method: str, url: str, endpoint: str = "submit",
+                                  retry_budget: Optional[RetryBudget] = None, **kwargs) -> httpx.Response:
         """
-        带重试机制的通用请求方法
-        防止因网络波动导致的 RemoteProtocolError 或 Timeout
+        带重试机制的 API 请求方法
+        
+        Args:
+            endpoint: 端点名称（submit / status），决定重试策略并用于熔断统计
+            retry_budget: 所属图片的重试预算（None 表示只受单次调用的尝试次数限制）
         """
-        max_retries = 3
-        for attempt in range(max_retries):
+        return await self._call_with_retry(
+            endpoint,
+            lambda: self.client.request(method, url, **kwargs),
+            retry_budget=retry_budget,
+            description=f"{method} {url}",
+        )
+    
+    async def _call_with_retry(self, endpoint: str, send: Callable[[], Awaitable[httpx.Response]],
+                               retry_budget: Optional[RetryBudget] = None, description: str = "") -> httpx.Response:
+        """
+        按端点的重试策略发送请求
+        可重试的网络异常和状态码（429/5xx 等）按指数退避 + 抖动重试，响应带 Retry-After 时以其为准；
+        不可重试或重试机会用完时，异常原样抛出、响应原样返回
+        
+        Args:
+            endpoint: 端点名称（submit / status / download）
+            send: 发送一次请求的协程函数（每次重试重新调用）
+            retry_budget: 所属图片的重试预算
+            description: 日志中的请求描述
+        """
+        policy = self.retry_policies[endpoint]
+        attempt = 0
+        while True:
+            # 熔断中直接快速失败（重试过程中熔断也会立即停止重试）
+            self._before_upstream(endpoint)
+            request_start = time.monotonic()
             try:
-                # 每次请求前短暂延迟，避免过于频繁
-                if attempt > 0:
-                    await asyncio.sleep(1)
-                
-                response = await self.client.request(method, url, **kwargs)
-                return response
-            except (httpx.RequestError, httpx.TimeoutException) as e:
-                if attempt == max_retries - 1:
-                    logger.error(f"请求失败 (重试{max_retries}次): {method} {url} - {e}")
-                    raise e
-                logger.warning(f"请求异常，正在重试 ({attempt+1}/{max_retries}): {method} {url} - {e}")
-        
-        # 理论上不会走到这里
-        raise httpx.RequestError("未知请求错误")
-    
-    async def _image_to_base64_url(self, image_path: Path) -> str:
-        """
-        将图片转换为 base64 数据 URL（异步版本）
-        使用异步 I/O 和线程池避免阻塞事件循环
-        """
-        # 使用 asyncio.to_thread 在线程池中执行同步读取和编码
-        def _sync_encode():
-            with open(image_path, "rb") as f:
-                image_data = f.read()
-            
-            # 检测图片类型
-            suffix = image_path.suffix.lower()
-            mime_types = {
-                ".jpg": "image/jpeg",
-                ".jpeg": "image/jpeg",
-                ".png": "image/png",
-                ".webp": "image/webp"
-            }
-            mime_type = mime_types.get(suffix, "image/jpeg")
-            
-            # 转换为 base64
-            base64_data = base64.b64encode(image_data).decode("utf-8")
-            
-            # 记录数据大小
-            original_size = len(image_data) / (1024 * 1024)  # MB
-            encoded_size = len(base64_data) / (1024 * 1024)  # MB
-            logger.info(f"图片编码: {image_path.name}, 原始: {original_size:.2f}MB, Base64: {encoded_size:.2f}MB")
+                response = await send()
+            except httpx.RequestError as e:
+                self._observe_upstream(endpoint, None, time.monotonic() - request_start, type(e).__name__)
+                if not self._may_retry(policy, retry_budget, attempt, policy.is_retryable_error(e)):
+                    logger.error(f"请求失败 (第{attempt + 1}次尝试): {description} - {type(e).__name__}: {e}")
+                    raise
+                delay = policy.backoff(attempt)
+                reason = f"{type(e).__name__}: {e}"
+            else:
+                self._observe_upstream(endpoint, response.status_code, time.monotonic() - request_start)
+                retryable = policy.is_retryable_status(response.status_code)
+                if not self._may_retry(policy, retry_budget, attempt, retryable):
+                    return response
+                delay = policy.delay_for_response(response, attempt)
+                reason = f"HTTP {response.status_code}"
             
-            return f"data:{mime_type};base64,{base64_data}"
+            self.retries[endpoint] += 1
+            logger.warning(
+                f"请求异常，{delay:.2f}秒后重试 ({attempt + 1}/{policy.max_attempts - 1}): {description} - {reason}"
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+    
+    def _may_retry(self, policy: RetryPolicy, retry_budget: Optional[RetryBudget],
+                   attempt: int, retryable: bool) -> bool:
+        """是否还能再重试一次（会消耗图片的重试预算）"""
+        if not retryable or attempt + 1 >= policy.max_attempts:
+            return False
+        if retry_budget is not None and not retry_budget.consume():
+            self.retry_budget_exhausted += 1
+            logger.warning("本图片的重试预算已用完，不再重试")
+            return False
+        return True
+    
+    def _before_upstream(self, endpoint: str) -> None:
+        """请求前检查熔断器，熔断中抛出 CircuitOpenError"""
+        breaker = self.breakers.get(endpoint)
+        if breaker is not None:
+            breaker.before_request()
+    
+    def _observe_upstream(self, endpoint: str, status_code: Optional[int], latency: float, error: str = "") -> None:
+        """
+        把上游响应反馈给熔断器和 AIMD 控制器
+        429 / 5xx / 网络异常视为失败（过载），其余视为成功
+        """
+        if status_code is None:
+            reason = error or "request_error"
+        elif status_code == 429 or status_code >= 500:
+            reason = f"HTTP {status_code}"
+        else:
+            reason = ""
         
-        # 在线程池中执行，避免阻塞主事件循环
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, _sync_encode)
+        breaker = self.breakers.get(endpoint)
+        if breaker is not None:
+            if reason:
+                breaker.record_failure(reason)
+            else:
+                breaker.record_success()
+        
+        if self.concurrency_controller is not None:
+            if reason:
+                self.concurrency_controller.on_overload(reason)
+            else:
+                self.concurrency_controller.on_success(latency)
     
-    async def _pad_image_to_ratio(self, image_path: Path, target_ratio_str: str) -> Path:
+    def is_available(self) -> bool:
+        """提交端点未熔断时可接收新任务"""
+        breaker = self.breakers.get("submit")
+        return breaker is None or not breaker.is_open()
+    
+    def capacity(self) -> Optional[int]:
         """
-        将图片填充到指定的宽高比（加白边）
+        当前在途上限（随 AIMD 调整）加上预处理并发：
+        在途名额全部占满时还有一批图片在预处理，名额释放后立即提交
         """
-        def _process():
-            with Image.open(image_path) as img:
-                # 转换由 RGBA 为 RGB（如果是 PNG），避免白色背景变黑
-                if img.mode == 'RGBA':
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    background.paste(img, mask=img.split()[3])
-                    img = background
-                elif img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                width, height = img.size
-                target_ratio = self.SUPPORTED_RATIOS[target_ratio_str]
-                
-                # 计算目标尺寸
-                # 如果当前比例 > 目标比例（比如 16:9 > 1:1），说明太宽，需要补高
-                # 如果当前比例 < 目标比例（比如 3:4 < 1:1），说明太高，需要补宽
-                current_ratio = width / height
-                
-                if current_ratio > target_ratio:
-                    # 图片太宽，保持宽度，增加高度
-                    new_width = width
-                    new_height = int(width / target_ratio)
-                else:
-                    # 图片太高，保持高度，增加宽度
-                    new_height = height
-                    new_width = int(height * target_ratio)
-                
-                # 创建白色背景新图
-                new_img = Image.new('RGB', (new_width, new_height), (255, 255, 255))
-                
-                # 将原图居中粘贴
-                x_offset = (new_width - width) // 2
-                y_offset = (new_height - height) // 2
-                new_img.paste(img, (x_offset, y_offset))
-                
-                # 保存处理后的图片
-                # 使用 padded_ 前缀，保存到同一目录
-                output_path = image_path.parent / f"padded_{image_path.name}"
-                new_img.save(output_path, quality=95)
-                return output_path
-
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, _process)
-
-    async def _stretch_to_3_4(self, image_path: Path) -> Path:
+        return self.inflight_slots.limit + self.preprocess_slots.limit
+    
+    def _prepare_image(self, data: bytes, input_path: Path, target_mode: str) -> PreparedImage:
+        """
+        预处理图片（同步，在线程池中执行）
+        整个流程只解码一次、只编码一次，中间结果不落盘
+        """
+        try:
+            return prepare_image(data, target_mode, optimizer=self.payload_optimizer)
+        except Exception as e:
+            logger.error(f"图片预处理失败，将尝试使用原图: {input_path.name} - {e}")
+            return passthrough_image(data, input_path.suffix)
+    
+    async def _run_prepare(self, data: bytes, input_path: Path, target_mode: str) -> PreparedImage:
+        """预处理图片：配置了进程池时在工作进程中执行，否则在线程池中执行"""
+        if self.image_pool is None:
+            return await run_in(IMAGE_CPU, self._prepare_image, data, input_path, target_mode)
+        try:
+            return await self.image_pool.prepare(data, target_mode, optimizer=self.payload_optimizer)
+        except Exception as e:
+            logger.error(f"图片预处理失败，将尝试使用原图: {input_path.name} - {e}")
+            return passthrough_image(data, input_path.suffix)
+    
+    def _cache_key(self, content_hash: str, target_mode: str, profile: OutputProfile) -> str:
+        """结果缓存键：输入内容哈希 + 提示词 + 输出模式 + 输出编码配置"""
+        return make_cache_key(content_hash, self.prompt, target_mode, profile.name)
+    
+    async def _read_input(self, input_path: Path, final_path: Path, cache_mode: str, profile: OutputProfile,
+                          upload: Optional[SavedUpload] = None) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        读取输入图片并查询结果缓存（相同图片 + 提示词 + 模式直接复用，跳过 API 调用）
+        上传时已计算内容哈希的文件先查缓存，命中时不再读取文件
+        
+        Returns:
+            (输入数据, 缓存键)；缓存命中时输入数据为 None（结果已写入 final_path），未启用缓存时缓存键为 None
+        """
+        cache_key = None
+        if self.result_cache is not None and upload is not None:
+            cache_key = self._cache_key(upload.content_hash, cache_mode, profile)
+            if await run_in(DISK_IO, self.result_cache.get, cache_key, final_path):
+                logger.info(f"结果缓存命中: {input_path.name}")
+                return None, cache_key
+        
+        data = await run_in(DISK_IO, input_path.read_bytes)
+        if self.result_cache is not None and cache_key is None:
+            cache_key = self._cache_key(await run_in(ENCODING, hash_content, data), cache_mode, profile)
+            if await run_in(DISK_IO, self.result_cache.get, cache_key, final_path):
+                logger.info(f"结果缓存命中: {input_path.name}")
+                return None, cache_key
+        return data, cache_key
+    
+    async def _pad_image_to_ratio(self, image_path: Path, target_ratio_str: str) -> Path:
         """
-        [NEW] 将图片强制拉伸/压缩到 3:4 比例
-        用于 Ozon 主图模式
+        将图片填充到指定的宽高比（加白边），保存为 padded_ 前缀的文件
+        仅供调试脚本使用，翻译流程使用内存中的 prepare_image
         """
         def _process():
             with Image.open(image_path) as img:
-                if img.mode == 'RGBA':
-                    img = img.convert('RGB')
-                
-                width, height = img.size
-                
-                # 目标：3:4 (0.75)
-                # 策略：保持高度，计算新宽度 (变瘦/变胖)
-                # 逻辑：New Width = Height * 0.75
-                target_height = height
-                target_width = int(height * 0.75)
-                
-                # 强制 resize
-                new_img = img.resize((target_width, target_height), Image.Resampling.LANCZOS)
-                
-                output_path = image_path.parent / f"stretched_3_4_{image_path.name}"
+                new_img = pad_to_ratio(to_rgb(img), target_ratio_str)
+                output_path = image_path.parent / f"padded_{image_path.name}"
                 new_img.save(output_path, quality=95)
                 return output_path
 
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, _process)
+        return await run_in(IMAGE_CPU, _process)
 
     async def _get_best_fit_ratio(self, image_path: Path) -> str:
         """
         计算最适合的 API 支持比例 (1:1, 2:3, 3:2)
-        选择逻辑：填充面积最小的比例
+        选择逻辑：填充面积最小的比例（只读取文件头，不解码像素）
         """
         def _compute() -> str:
             try:
-                with Image.open(image_path) as img:
-                    width, height = img.size
+                width, height = probe_image(image_path).size
             except Exception:
                 return "1:1"
             
-            aspect = width / height
-            
-            best_ratio = "1:1"
-            min_padding_area = float("inf")
-            
-            for ratio_str, ratio_val in self.SUPPORTED_RATIOS.items():
-                # 计算如果要适应这个比例，需要填充多少面积
-                if aspect > ratio_val:
-                    # 原图更宽，由于宽度固定，需要增加高度
-                    # new_height = width / ratio_val
-                    # padding_area = width * (new_height - height)
-                    padding_area = width * (width / ratio_val - height)
-                else:
-                    # 原图更高，由于高度固定，需要增加宽度
-                    # new_width = height * ratio_val
-                    # padding_area = height * (new_width - width)
-                    padding_area = height * (height * ratio_val - width)
-                
-                if padding_area < min_padding_area:
-                    min_padding_area = padding_area
-                    best_ratio = ratio_str
-            
-            logger.info(f"原图 {width}x{height} ({aspect:.2f}) -> 最佳适配 {best_ratio}")
-            return best_ratio
+            ratio = best_fit_ratio(width, height)
+            logger.info(f"原图 {width}x{height} ({width / height:.2f}) -> 最佳适配 {ratio}")
+            return ratio
         
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, _compute)
+        # 只读文件头，属于文件 I/O
+        return await run_in(DISK_IO, _compute)
     
-    async def _submit_task(self, image_path: Path, request_id: str) -> str:
+    async def _submit_task(self, prepared: PreparedImage, image_path: Path, request_id: str,
+                           retry_budget: Optional[RetryBudget] = None) -> str:
         """
         提交翻译任务
         
         Args:
+            prepared: 预处理后的图片（已填充到 API 支持的比例）
             image_path: 输入图片路径
             request_id: 请求ID（用于构建 URL）
+            retry_budget: 所属图片的重试预算
         
         Returns:
             task_id
         """
-        start_time = time.time()
-        
-        # 1. 计算最佳适配比例
-        size_ratio = await self._get_best_fit_ratio(image_path)
-        
-        # 2. 预处理图片：填充白边以完全匹配比例
-        # 这一步是关键，确保提交给 API 的图片已经是标准比例，防止 API 自动裁剪
-        try:
-            processed_image_path = await self._pad_image_to_ratio(image_path, size_ratio)
-            logger.info(f"图片已预处理(填充白边): {processed_image_path.name}, 目标比例: {size_ratio}")
-            
-            # 使用处理后的图片进行 Base64 / URL 生成
-            # 注意：如果是 Cloud 模式，我们需要确保 processed_image_path 也是可访问的
-            # 目前 Cloud 模式使用的是 input 目录下的文件，所以我们需要把 padded 图片放入正确的临时目录结构中
-            # 但 _pad_image_to_ratio 默认保存在同级目录，所以通常没问题
-            target_image_path = processed_image_path
-            
-        except Exception as e:
-            logger.error(f"图片预处理失败，将尝试使用原图: {e}")
-            target_image_path = image_path
+        size_ratio = prepared.size_ratio
         
         # 根据存储模式决定使用 Base64 还是 URL
         if self.storage_mode == "cloud":
-            # 云端模式
-            # 注意：padded_xxx 必须也能被 serve_temp_image 路由访问到
-            filename = target_image_path.name
+            # 云端模式：预处理结果写入 input 目录一次，供 serve_temp_image 路由访问
+            filename = f"padded_{image_path.stem}{prepared.suffix}"
+            padded_path = image_path.parent / filename
+            await run_in(DISK_IO, padded_path.write_bytes, prepared.payload)
             image_url = f"{self.base_url}/api/temp-images/{request_id}/{filename}"
             logger.info(f"使用 URL 模式: {image_url}")
         else:
-            # 本地模式
-            image_url = await self._image_to_base64_url(target_image_path)
+            # 本地模式：base64 data URL 在发送时分块生成，不在内存中拼出完整字符串
+            image_url = DATA_URL_PLACEHOLDER
         
         # 构建请求
         payload = {
@@ -359,20 +490,40 @@ class RealTranslationService(TranslationService):
             "n": 1,
             "image_urls": [image_url]
         }
+        if image_url == DATA_URL_PLACEHOLDER:
+            body = StreamingJSONBody(payload, prepared.payload, prepared.mime_type)
+            request_kwargs = {"content": body, "headers": body.headers}
+            logger.info(
+                f"图片编码: 原始: {len(prepared.payload) / (1024 * 1024):.2f}MB, "
+                f"请求体: {body.content_length / (1024 * 1024):.2f}MB (流式发送)"
+            )
+        else:
+            request_kwargs = {"json": payload}
         
         # 发送请求
         url = f"{self.api_endpoint}/v1/images/generations"
         logger.info(f"提交翻译任务: {image_path.name} (模式: {self.storage_mode})")
         logger.info(f"Prompt: {self.prompt}")
         
-        submit_start = time.time()
-        # response = await self.client.post(url, json=payload)
-        # 改用带重试的请求
-        response = await self._request_with_retry("POST", url, json=payload)
-        submit_time = time.time() - submit_start
+        async with self.submit_slots:
+            # 按上游允许的速率提交（替代固定的错峰延迟）
+            await self.submit_rate_limiter.acquire()
+            
+            submit_start = time.time()
+            response = await self._request_with_retry(
+                "POST", url, endpoint="submit", retry_budget=retry_budget, **request_kwargs
+            )
+            submit_time = time.time() - submit_start
         response.raise_for_status()
         
         logger.info(f"API 响应耗时: {submit_time:.2f}秒")
+        if self.payload_optimizer is not None:
+            saving = self.payload_optimizer.record_submit(len(prepared.payload), prepared.source_bytes, submit_time)
+            logger.info(
+                f"上传优化: {image_path.name} 原图 {prepared.source_bytes / 1024:.0f}KB -> "
+                f"上传 {len(prepared.payload) / 1024:.0f}KB，节省 {saving['saved_bytes'] / 1024:.0f}KB，"
+                f"提交耗时 {submit_time:.2f}秒（预计节省 {saving['estimated_saved_seconds']:.2f}秒）"
+            )
         
         result = response.json()
         logger.info(f"提交响应: {result}")
@@ -384,59 +535,225 @@ class RealTranslationService(TranslationService):
         logger.info(f"任务已提交: {image_path.name} -> task_id={task_id}")
         return task_id
     
-    async def _poll_task_status(self, task_id: str) -> dict:
+    async def _fetch_task_status(self, task_id: str, retry_budget: Optional[RetryBudget] = None) -> dict:
         """
-        轮询任务状态直到完成
+        查询一次任务状态（由集中轮询器调用）
         
         Returns:
-            完成的任务结果
+            任务 data（包含 status / progress 等字段）
+        
+        Raises:
+            TranslationError: API 返回错误或任务失败
         """
         # 根据 API 文档，正确的 URL 是 /v1/tasks/{task_id}
         url = f"{self.api_endpoint}/v1/tasks/{task_id}"
         
-        for attempt in range(self.poll_max_attempts):
-            await asyncio.sleep(self.poll_interval)
-            
-            # response = await self.client.get(url)
-            # 改用带重试的请求
-            response = await self._request_with_retry("GET", url)
-            response.raise_for_status()
-            
-            result = response.json()
-            
-            # API 响应结构: {"code": 200, "data": {"status": "...", "progress": ..., ...}}
-            if result.get("code") != 200:
-                raise TranslationError(f"API 返回错误代码: {result}")
-            
-            data = result.get("data", {})
-            status = data.get("status", "")
-            progress = data.get("progress", 0)
-            
-            logger.info(f"任务 {task_id} 状态: {status}, 进度: {progress}% (第 {attempt + 1} 次查询)")
-            
-            if status == "completed":
-                logger.info(f"任务完成: {task_id}")
-                return data  # 返回 data 而不是整个 result
-            elif status == "failed":
-                error_info = data.get("error", {})
-                error_msg = error_info.get("message", "未知错误")
-                raise TranslationError(f"任务失败: {error_msg}")
-            # 其他状态继续轮询 (pending, processing)
-        
-        raise TranslationError(f"任务超时: {task_id}")
-    
-    async def _download_image(self, image_url: str, output_path: Path) -> Path:
-        """下载图片到指定路径"""
-        response = await self.client.get(image_url)
+        response = await self._request_with_retry("GET", url, endpoint="status", retry_budget=retry_budget)
         response.raise_for_status()
         
-        with open(output_path, "wb") as f:
-            f.write(response.content)
+        result = response.json()
         
-        logger.info(f"图片已下载: {output_path}")
-        return output_path
+        # API 响应结构: {"code": 200, "data": {"status": "...", "progress": ..., ...}}
+        if result.get("code") != 200:
+            raise TranslationError(f"API 返回错误代码: {result}")
+        
+        data = result.get("data", {})
+        if data.get("status") == "failed":
+            error_info = data.get("error", {})
+            error_msg = error_info.get("message", "未知错误")
+            raise TranslationError(f"任务失败: {error_msg}")
+        return data
     
-    async def translate(self, input_path: Path, output_dir: Path, target_mode: str = "original") -> Path:
+    async def _poll_task_status(self, task_id: str, key: str = "",
+                                retry_budget: Optional[RetryBudget] = None) -> dict:
+        """
+        等待任务完成（由集中轮询器统一调度状态查询）
+        
+        Args:
+            task_id: 上游任务ID
+            key: 任务类别（size 比例 + 输出模式），用于预测完成时间
+            retry_budget: 所属图片的重试预算
+        
+        Returns:
+            完成的任务结果
+        """
+        data = await self.poller.wait(task_id, key=key, retry_budget=retry_budget)
+        logger.info(f"任务完成: {task_id}")
+        return data
+    
+    async def _download_result(self, image_url: str, retry_budget: Optional[RetryBudget] = None) -> bytes:
+        """
+        从结果 CDN 下载翻译结果到内存（按下载端点的重试策略重试）
+        
+        Raises:
+            TranslationError: 下载失败
+        """
+        try:
+            response = await self._call_with_retry(
+                "download",
+                lambda: self.download_client.get(image_url),
+                retry_budget=retry_budget,
+                description=f"GET {image_url}",
+            )
+        except httpx.RequestError as e:
+            raise TranslationError(f"下载图片失败: {type(e).__name__}: {e}")
+        if response.status_code != 200:
+            raise TranslationError(f"下载结果失败: {response.status_code}")
+        return response.content
+    
+    def _finalize_result(self, result_data: bytes, final_path: Path, prepared: PreparedImage,
+                         profile: OutputProfile) -> bool:
+        """
+        恢复比例、按输出配置编码并写出最终结果（同步，在线程池中执行）
+        在内存中按裁剪框裁剪，最多编码一次，最终文件只原子写入一次
+        
+        Returns:
+            是否按预处理记录完成了比例恢复
+        """
+        restored = prepared.crop_box is not None
+        try:
+            result_data, reencoded = restore_result(result_data, prepared.crop_box, profile)
+            self._log_result(final_path, profile, result_data, reencoded)
+        except Exception as e:
+            restored = False
+            logger.error(f"恢复原始比例失败: {e}，保留原结果")
+        write_bytes_atomic(final_path, result_data)
+        return restored
+    
+    async def _run_finalize(self, result_data: bytes, final_path: Path, prepared: PreparedImage,
+                            profile: OutputProfile) -> bool:
+        """恢复比例并写出结果：配置了进程池时裁剪和编码在工作进程中执行，否则整体在线程池中执行"""
+        if self.image_pool is None:
+            return await run_in(IMAGE_CPU, self._finalize_result, result_data, final_path, prepared, profile)
+        restored = prepared.crop_box is not None
+        try:
+            result_data, reencoded = await self.image_pool.restore(result_data, prepared.crop_box, profile)
+            self._log_result(final_path, profile, result_data, reencoded)
+        except Exception as e:
+            restored = False
+            logger.error(f"恢复原始比例失败: {e}，保留原结果")
+        await run_in(DISK_IO, write_bytes_atomic, final_path, result_data)
+        return restored
+    
+    @staticmethod
+    def _log_result(final_path: Path, profile: OutputProfile, data: bytes, reencoded: bool) -> None:
+        logger.info(
+            f"结果已{'编码' if reencoded else '直接保存'}({profile.name}): "
+            f"{final_path.name} {len(data) / 1024:.0f}KB"
+        )
+    
+    async def _submit_and_wait(self, prepared: PreparedImage, image_path: Path, request_id: str,
+                               target_mode: str, retry_budget: RetryBudget) -> dict:
+        """提交任务并等待上游完成（调用方需持有在途名额）"""
+        # 提交任务（受提交并发与令牌桶限制）
+        task_id = await self._submit_task(prepared, image_path, request_id, retry_budget=retry_budget)
+        prepared.payload = b""  # 提交完成即释放上传数据，轮询期间只保留元数据
+        
+        # 轮询等待完成（只占用在途名额，不占用预处理/提交名额）
+        return await self._poll_task_status(
+            task_id, key=f"{prepared.size_ratio}|{target_mode}", retry_budget=retry_budget
+        )
+    
+    async def _fetch_result_image(self, result: dict, retry_budget: RetryBudget) -> bytes:
+        """从完成的任务中取出结果图片 URL 并下载到内存"""
+        result_field = result.get("result", {})
+        images = result_field.get("images", [])
+        if not images:
+            raise TranslationError("API 未返回图片")
+        
+        first_image = images[0]
+        if isinstance(first_image, str):
+            image_url = first_image
+        elif isinstance(first_image, dict):
+            url_field = first_image.get("url")
+            image_url = url_field[0] if isinstance(url_field, list) else url_field
+        else:
+            raise TranslationError(f"未知的图片格式: {type(first_image)}")
+        
+        if not image_url:
+            raise TranslationError("API 返回的图片 URL 为空")
+        
+        logger.info(f"准备下载图片: {image_url}")
+        if "http" in image_url:
+            return await self._download_result(image_url, retry_budget=retry_budget)
+        header, encoded = image_url.split(",", 1)
+        return base64.b64decode(encoded)
+    
+    async def _plan_tiles(self, input_path: Path, target_mode: str,
+                          upload: Optional[SavedUpload] = None) -> Optional[TilePlan]:
+        """
+        长宽比超过阈值的图片返回分块方案（Ozon 模式会整体拉伸到 3:4，不分块）
+        优先使用上传时识别的尺寸，否则只读取文件头
+        """
+        if self.tiling is None or target_mode != "original":
+            return None
+        if upload is not None and upload.dimensions is not None:
+            return plan_tiles(upload.dimensions, **self.tiling)
+        try:
+            info = await run_in(DISK_IO, probe_image, input_path)
+        except Exception:
+            # 无法识别的文件交给常规流程处理（按原图提交）
+            return None
+        return plan_tiles(info.size, **self.tiling)
+    
+    async def _translate_tile(self, tile: PreparedImage, tile_path: Path, request_id: str,
+                              target_mode: str) -> bytes:
+        """翻译一个分块：每个分块单独占用在途名额，单独计算重试预算"""
+        retry_budget = RetryBudget(self.retry_budget_per_image)
+        async with self.inflight_slots:
+            result = await self._submit_and_wait(tile, tile_path, request_id, target_mode, retry_budget)
+        return await self._fetch_result_image(result, retry_budget)
+    
+    async def _translate_tiled(self, input_path: Path, final_path: Path, request_id: str, target_mode: str,
+                               profile: OutputProfile, plan: TilePlan, upload: Optional[SavedUpload] = None) -> Path:
+        """
+        分块翻译长图：切成重叠的 2:3 / 3:2 分块并发翻译，再拼接为整图
+        整体耗时约等于一个分块的耗时，且上传数据中没有大面积白边
+        """
+        cache_mode = f"{target_mode}|tiles"
+        async with self.preprocess_slots:
+            data, cache_key = await self._read_input(input_path, final_path, cache_mode, profile, upload)
+            if data is None:
+                return final_path
+            
+            tiles = await run_in(IMAGE_CPU, prepare_tiles, data, plan, self.payload_optimizer)
+            del data
+        
+        self.tiled_images += 1
+        self.tiles_submitted += plan.count
+        logger.info(f"分块翻译: {input_path.name} -> {plan.count} 个 {plan.size_ratio} 分块")
+        
+        tasks = [
+            asyncio.create_task(self._translate_tile(
+                tile,
+                input_path.with_name(f"{input_path.stem}_tile{index + 1}{input_path.suffix}"),
+                request_id,
+                target_mode,
+            ))
+            for index, tile in enumerate(tiles)
+        ]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            # 任一分块失败整张图片失败，其余分块不再等待
+            for task in tasks:
+                task.cancel()
+            raise
+        
+        output = await run_in(IMAGE_CPU, stitch_tiles, results, tiles, plan, profile)
+        del results
+        await run_in(DISK_IO, write_bytes_atomic, final_path, output)
+        logger.info(f"分块结果已拼接({profile.name}): {final_path.name} {len(output) / 1024:.0f}KB")
+        
+        if cache_key is not None:
+            try:
+                await run_in(DISK_IO, self.result_cache.put, cache_key, final_path)
+            except Exception as e:
+                logger.warning(f"写入结果缓存失败: {e}")
+        return final_path
+    
+    async def translate(self, input_path: Path, output_dir: Path, target_mode: str = "original",
+                        output_profile: Optional[str] = None, upload: Optional[SavedUpload] = None) -> Path:
         """
         翻译图片
         
@@ -444,106 +761,103 @@ class RealTranslationService(TranslationService):
             input_path: 输入图片路径
             output_dir: 输出目录
             target_mode: 输出模式 "original" | "ozon_3_4"
+            output_profile: 输出编码配置名称（None 使用服务默认配置）
+            upload: 保存上传文件时得到的元数据（内容哈希、尺寸），有则不再重新计算
         """
         try:
-            # 准备工作图片（默认是原图）
-            working_image_path = input_path
-            
-            # 1. 模式预处理
-            if target_mode == "ozon_3_4":
-                # Ozon 主图模式：强制拉伸到 3:4
-                try:
-                    working_image_path = await self._stretch_to_3_4(input_path)
-                    logger.info(f"Ozon 3:4 模式：图片已拉伸 -> {working_image_path.name}")
-                except Exception as e:
-                    logger.error(f"拉伸图片失败: {e}，将使用原图继续")
-            
             # 从路径提取 request_id (temp/request_id/input/filename)
             request_id = input_path.parent.parent.name
             
-            # 2. 提交任务 (使用 working_image_path)
-            task_id = await self._submit_task(working_image_path, request_id)
+            # 上游熔断中：不再预处理和排队，直接快速失败
+            if not self.is_available():
+                raise CircuitOpenError("上游翻译服务暂时不可用（已熔断），请稍后重试")
             
-            # 3. 轮询等待完成
-            result = await self._poll_task_status(task_id)
+            profile = get_output_profile(output_profile) if output_profile else self.output_profile
+            final_path = output_dir / f"translated_{input_path.stem}{profile.suffix}"
+            # 长图：按文件头判断是否分块翻译
+            tile_plan = await self._plan_tiles(input_path, target_mode, upload)
+            if tile_plan is not None:
+                return await self._translate_tiled(
+                    input_path, final_path, request_id, target_mode, profile, tile_plan, upload
+                )
             
-            # 4. 获取结果图片 URL
-            result_field = result.get("result", {})
-            images = result_field.get("images", [])
-            if not images:
-                raise TranslationError("API 未返回图片")
+            # 提交、轮询、下载共用一份重试预算，单张图片的重试总次数有上限
+            retry_budget = RetryBudget(self.retry_budget_per_image)
             
-            first_image = images[0]
-            if isinstance(first_image, str):
-                image_url = first_image
-            elif isinstance(first_image, dict):
-                url_field = first_image.get("url")
-                image_url = url_field[0] if isinstance(url_field, list) else url_field
-            else:
-                raise TranslationError(f"未知的图片格式: {type(first_image)}")
+            # 本地预处理期间不占用上游在途名额（解码和缩放不受在途上限收缩影响）；
+            # 预处理名额保留到拿到在途名额为止：已预处理、等待提交的上传数据不超过预处理并发，内存有上限
+            await self.preprocess_slots.acquire()
+            try:
+                # 0. 读取输入，结果缓存命中时直接返回
+                data, cache_key = await self._read_input(input_path, final_path, target_mode, profile, upload)
+                if data is None:
+                    return final_path
+                
+                # 1. 预处理：解码一次，完成模式拉伸 + 比例填充，编码一次
+                prepared = await self._run_prepare(data, input_path, target_mode)
+                del data
+                
+                await self.inflight_slots.acquire()
+            finally:
+                self.preprocess_slots.release()
             
-            if not image_url:
-                raise TranslationError("API 返回的图片 URL 为空")
+            # 2-3. 提交任务并等待完成：只在提交和轮询期间占用在途名额
+            try:
+                result = await self._submit_and_wait(prepared, input_path, request_id, target_mode, retry_budget)
+            finally:
+                self.inflight_slots.release()
             
-            logger.info(f"准备下载图片: {image_url}")
+            # 4-5. 下载结果到内存
+            result_data = await self._fetch_result_image(result, retry_budget)
             
-            # 5. 下载/保存结果
-            final_path = output_dir / f"translated_{input_path.name}"
+            # 6. 自动裁剪：按预处理记录的裁剪框恢复原始比例 (或强制拉伸后的比例)，写出最终文件
+            restored = await self._run_finalize(result_data, final_path, prepared, profile)
+            del result_data
             
-            if "http" in image_url:
-                # 增加重试机制，防止服务端断开连接 (RemoteProtocolError)
-                max_retries = 5
-                for attempt in range(max_retries):
-                    try:
-                        async with self.client.stream("GET", image_url) as response:
-                            if response.status_code != 200:
-                                raise TranslationError(f"下载结果失败: {response.status_code}")
-                            with open(final_path, "wb") as f:
-                                async for chunk in response.aiter_bytes():
-                                    f.write(chunk)
-                        break  # 如果下载成功，退出循环
-                    except (httpx.RequestError, httpx.TimeoutException) as e:
-                        if attempt == max_retries - 1:
-                            # 最后一次重试也失败，抛出异常
-                            raise TranslationError(f"下载图片失败 (重试{max_retries}次): {str(e)}")
-                        logger.warning(f"下载中断，正在重试 ({attempt+1}/{max_retries}): {e}")
-                        await asyncio.sleep(1) # 稍等一秒重试
-            else:
-                import base64
-                header, encoded = image_url.split(",", 1)
-                data = base64.b64decode(encoded)
-                with open(final_path, "wb") as f:
-                    f.write(data)
-                    
-            # 6. [NEW] 自动裁剪：恢复原始比例 (或强制拉伸后的比例)
-            try:
-                # 使用 working_image_path 作为"原图"参考
-                # 如果是 original 模式，working = input，恢复原图比例
-                # 如果是 ozon_3_4 模式，working = stretched(3:4)，恢复到 3:4 并切掉白边
-                loop = asyncio.get_running_loop()
-                await loop.run_in_executor(None, self._restore_ratio, working_image_path, final_path)
-                logger.info(f"已恢复比例({target_mode}): {final_path}")
-            except Exception as e:
-                logger.error(f"恢复原始比例失败: {e}，保留原结果")
+            # 7. 写入结果缓存（只缓存完整处理的结果，失败不影响本次结果）
+            if cache_key is not None and restored:
+                try:
+                    await run_in(DISK_IO, self.result_cache.put, cache_key, final_path)
+                except Exception as e:
+                    logger.warning(f"写入结果缓存失败: {e}")
                 
             return final_path
             
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP 错误: {e.response.status_code} - {e.response.text}")
             raise TranslationError(f"API 请求失败: {e.response.status_code}")
+        except TranslationError as e:
+            # 保留具体异常类型（如 CircuitOpenError），便于上层区分
+            logger.error(f"翻译失败 {input_path.name}: {e}")
+            raise
         except Exception as e:
             logger.error(f"翻译失败 {input_path.name}: {e}")
             raise TranslationError(str(e))
     
-    def _restore_ratio(self, original_path: Path, translated_path: Path) -> None:
+    def _restore_ratio(self, reference: Path | Tuple[int, int], translated_path: Path,
+                       crop_box: Optional[Tuple[float, float, float, float]] = None) -> None:
         """
-        根据原图比例，裁剪掉翻译图的白边 (Padding)
+        根据参考尺寸的比例，裁剪掉翻译图的白边 (Padding)
+        
+        Args:
+            reference: 参考尺寸 (宽, 高)，或原图路径（仅读取文件头获取尺寸）
+            translated_path: 翻译结果图片路径（原地覆盖）
+            crop_box: 几何规划记录的归一化裁剪框（有则直接按框裁剪，不再按比例推算）
         """
-        from PIL import Image
+        if crop_box is not None:
+            with Image.open(translated_path) as trans_img:
+                box = crop_box_for(crop_box, trans_img.size)
+                if box == (0, 0, trans_img.width, trans_img.height):
+                    return
+                trans_img.crop(box).save(translated_path, quality=95)
+            return
         
-        with Image.open(original_path) as orig_img:
-            orig_w, orig_h = orig_img.size
-            orig_ratio = orig_w / orig_h
+        if isinstance(reference, Path):
+            with Image.open(reference) as orig_img:
+                orig_w, orig_h = orig_img.size
+        else:
+            orig_w, orig_h = reference
+        orig_ratio = orig_w / orig_h
             
         with Image.open(translated_path) as trans_img:
             trans_w, trans_h = trans_img.size
@@ -573,31 +887,149 @@ class RealTranslationService(TranslationService):
             cropped_img = trans_img.crop(box)
             cropped_img.save(translated_path, quality=95)
 
-    async def close(self):
-        """关闭 HTTP 客户端"""
-        await self.client.aclose()
+    def metrics(self) -> dict:
+        """运行指标"""
+        return {
+            "submit_rate_limiter": self.submit_rate_limiter.stats(),
+            "preprocess_slots": self.preprocess_slots.stats(),
+            "submit_slots": self.submit_slots.stats(),
+            "inflight_slots": self.inflight_slots.stats(),
+            "adaptive_concurrency": (
+                self.concurrency_controller.stats() if self.concurrency_controller is not None else None
+            ),
+            "poller": self.poller.stats(),
+            "circuit_breakers": {name: breaker.stats() for name, breaker in self.breakers.items()},
+            "payload_optimizer": (
+                self.payload_optimizer.stats() if self.payload_optimizer is not None else None
+            ),
+            "image_pool": self.image_pool.stats() if self.image_pool is not None else None,
+            "tiling": {
+                "enabled": self.tiling is not None,
+                "tiled_images": self.tiled_images,
+                "tiles_submitted": self.tiles_submitted,
+            },
+            "retries": {
+                "by_endpoint": dict(self.retries),
+                "budget_per_image": self.retry_budget_per_image,
+                "budget_exhausted": self.retry_budget_exhausted,
+            },
+        }
     
+    async def warmup(self) -> None:
+        """预热上游连接和图片处理进程"""
+        await self.http_clients.warmup()
+        if self.image_pool is not None:
+            await self.image_pool.warmup()
     
+    async def close(self) -> None:
+        """停止轮询器、关闭图片处理进程池和 HTTP 客户端（共享客户端由创建方负责关闭）"""
+        await self.poller.close()
+        if self.image_pool is not None:
+            await run_in(IMAGE_CPU, self.image_pool.shutdown)
+        if self._owns_clients:
+            await self.http_clients.aclose()
+
+
+# 进程内共享的翻译服务实例（及其 HTTP 连接池）
+_translation_service: Optional[TranslationService] = None
+_shared_clients: Optional[UpstreamClients] = None
+
+
+def peek_translation_service() -> Optional[TranslationService]:
+    """已创建的翻译服务实例，尚未创建时返回 None（不会触发创建）"""
+    return _translation_service
+
+
 def get_translation_service() -> TranslationService:
     """
-    获取翻译服务实例
-    根据配置切换 Mock 或 Real 服务
+    获取进程内共享的翻译服务实例
+    根据配置切换 Mock 或 Real 服务，所有批次复用同一个实例和连接池
     """
+    global _translation_service, _shared_clients
     from config import settings
     
+    if _translation_service is not None:
+        return _translation_service
+    
     if settings.SERVICE_MODE == "real":
         if not settings.APIMART_API_KEY:
             logger.warning("未配置 API Key，回退到 Mock 服务")
-            return MockTranslationService()
+            _translation_service = MockTranslationService()
+            return _translation_service
         
-        return RealTranslationService(
+        _shared_clients = create_upstream_clients()
+        _translation_service = RealTranslationService(
             api_key=settings.APIMART_API_KEY,
             api_endpoint=settings.APIMART_API_ENDPOINT,
             prompt=settings.TRANSLATION_PROMPT,
             poll_interval=settings.POLL_INTERVAL,
             poll_max_attempts=settings.POLL_MAX_ATTEMPTS,
             storage_mode=settings.STORAGE_MODE,
-            base_url=settings.BASE_URL
+            base_url=settings.BASE_URL,
+            result_cache=get_result_cache(),
+            http_clients=_shared_clients,
+            submit_rate=settings.UPSTREAM_SUBMIT_RATE,
+            submit_burst=settings.UPSTREAM_SUBMIT_BURST,
+            preprocess_concurrency=settings.PREPROCESS_CONCURRENCY,
+            submit_concurrency=settings.TRANSLATION_CONCURRENCY,
+            max_inflight_tasks=settings.MAX_INFLIGHT_TASKS,
+            poll_request_rate=settings.POLL_REQUEST_RATE,
+            poll_request_burst=settings.POLL_REQUEST_BURST,
+            latency_model=LatencyModel(
+                min_interval=settings.POLL_INTERVAL,
+                max_interval=settings.POLL_MAX_INTERVAL,
+                default_first_delay=settings.POLL_FIRST_DELAY,
+            ) if settings.POLL_ADAPTIVE else None,
+            adaptive_concurrency={
+                "min_limit": settings.ADAPTIVE_MIN_INFLIGHT,
+                "initial_limit": settings.ADAPTIVE_INITIAL_INFLIGHT,
+                "decrease_factor": settings.ADAPTIVE_DECREASE_FACTOR,
+                "latency_target": settings.ADAPTIVE_LATENCY_TARGET,
+                "cooldown": settings.ADAPTIVE_COOLDOWN,
+            } if settings.ADAPTIVE_CONCURRENCY else None,
+            circuit_breaker={
+                "failure_rate_threshold": settings.CIRCUIT_FAILURE_RATE,
+                "min_requests": settings.CIRCUIT_MIN_REQUESTS,
+                "window_seconds": settings.CIRCUIT_WINDOW_SECONDS,
+                "open_seconds": settings.CIRCUIT_OPEN_SECONDS,
+                "half_open_max_calls": settings.CIRCUIT_HALF_OPEN_CALLS,
+            } if settings.CIRCUIT_BREAKER_ENABLED else None,
+            retry_policy={
+                "max_attempts": settings.RETRY_MAX_ATTEMPTS,
+                "base_delay": settings.RETRY_BASE_DELAY,
+                "max_delay": settings.RETRY_MAX_DELAY,
+            },
+            retry_budget=settings.RETRY_BUDGET_PER_IMAGE,
+            payload_optimizer=PayloadOptimizer(
+                max_long_edge=settings.PAYLOAD_MAX_EDGE,
+                output_format=settings.PAYLOAD_FORMAT,
+                quality=settings.PAYLOAD_QUALITY,
+                min_quality=settings.PAYLOAD_MIN_QUALITY,
+                target_bytes=settings.PAYLOAD_TARGET_KB * 1024,
+            ) if settings.PAYLOAD_OPTIMIZER_ENABLED else None,
+            output_profile=settings.OUTPUT_PROFILE,
+            image_pool=ImageProcessPool(
+                settings.IMAGE_PROCESS_WORKERS
+            ) if settings.IMAGE_PROCESS_POOL_ENABLED else None,
+            tiling={
+                "min_aspect": settings.TILE_MIN_ASPECT,
+                "overlap_ratio": settings.TILE_OVERLAP,
+                "max_tiles": settings.TILE_MAX_TILES,
+            } if settings.TILING_ENABLED else None,
         )
+        return _translation_service
+    
+    _translation_service = MockTranslationService()
+    return _translation_service
+
+
+async def close_translation_service() -> None:
+    """关闭共享的翻译服务及其连接池（应用关闭时调用）"""
+    global _translation_service, _shared_clients
     
-    return MockTranslationService()
+    if _translation_service is not None:
+        await _translation_service.close()
+        _translation_service = None
+    if _shared_clients is not None:
+        await _shared_clients.aclose()
+        _shared_clients = None
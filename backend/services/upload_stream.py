@@ -0,0 +1,175 @@
+"""
+流式解析 multipart 上传
+边接收请求体边解析：每个文件部分按块写入磁盘，写完立即交给调用方，
+不必等整个请求体（几十张图片、上百 MB）接收完毕才开始后续处理
+"""
+
+import logging
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple, Union
+
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+from services.admission import AdmissionPolicy, RejectedUpload
+from services.file_handler import SavedUpload, UploadWriter
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 普通表单字段的大小上限（字节），防止把文件内容当作字段整个读入内存
+MAX_FIELD_SIZE = 64 * 1024
+
+
+class MultipartError(ValueError):
+    """multipart 请求体格式错误"""
+
+
+class _PartCollector:
+    """
+    MultipartParser 的回调：把同步回调收集成事件列表，由异步代码在每次 write 之后处理
+
+    事件：
+        ("part", 字段名, 文件名或 None)  一个部分的头部解析完成
+        ("data", bytes)                 部分内容（同一次 write 内的连续数据已合并）
+        ("end",)                        部分结束
+    """
+
+    def __init__(self, charset: str):
+        self.charset = charset
+        self.events: List[tuple] = []
+        self.finished = False
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_end": self.on_end,
+        }
+
+    def on_part_begin(self) -> None:
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        if b"name" not in options:
+            raise MultipartError('Content-Disposition 缺少 "name"')
+        name = options[b"name"].decode(self.charset, errors="replace")
+        filename = options[b"filename"].decode(self.charset, errors="replace") if b"filename" in options else None
+        self.events.append(("part", name, filename))
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self.events and self.events[-1][0] == "data":
+            self.events[-1][1].extend(data[start:end])
+        else:
+            self.events.append(("data", bytearray(data[start:end])))
+
+    def on_part_end(self) -> None:
+        self.events.append(("end",))
+
+    def on_end(self) -> None:
+        self.finished = True
+
+    def drain(self) -> List[tuple]:
+        events, self.events = self.events, []
+        return events
+
+
+async def iter_multipart_uploads(
+    content_type: str,
+    stream: AsyncIterator[bytes],
+    dest_dir: Path,
+    admission: Optional[AdmissionPolicy] = None,
+) -> AsyncIterator[Tuple[str, Union[str, SavedUpload, RejectedUpload]]]:
+    """
+    边接收边解析 multipart 请求体，按请求体中的顺序逐个产出 (字段名, 值)
+
+    - 普通字段：值为字符串
+    - 文件：按块写入 dest_dir，写完后值为 SavedUpload（与 save_upload_file 的结果一致）
+    - 超过 admission 大小上限的文件：立即停止写盘并删除，其余数据直接丢弃，值为 RejectedUpload
+
+    调用方中途停止迭代（或出错）时，未写完的文件会被删除
+
+    Args:
+        content_type: 请求的 Content-Type（含 boundary）
+        stream: 请求体数据流（如 request.stream()）
+        dest_dir: 文件保存目录
+        admission: 准入规则（只在此检查文件大小，格式和像素数由调用方用 admit_upload 检查）
+
+    Raises:
+        MultipartError: 请求体格式错误或不完整
+    """
+    _, params = parse_options_header(content_type)
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise MultipartError("multipart 请求缺少 boundary")
+    charset = params.get(b"charset", b"utf-8").decode("latin-1")
+
+    collector = _PartCollector(charset)
+    parser = MultipartParser(boundary, collector.callbacks())
+
+    name: Optional[str] = None
+    writer: Optional[UploadWriter] = None
+    rejected: Optional[RejectedUpload] = None
+    field = bytearray()
+    try:
+        async for chunk in stream:
+            try:
+                parser.write(chunk)
+            except MultipartParseError as e:
+                raise MultipartError(f"multipart 请求体格式错误: {e}") from e
+
+            for event in collector.drain():
+                if event[0] == "part":
+                    name, filename = event[1], event[2]
+                    field = bytearray()
+                    if filename is not None:
+                        writer = await UploadWriter.open(dest_dir, filename)
+                elif event[0] == "data":
+                    if rejected is not None:
+                        continue
+                    if writer is not None:
+                        await writer.write(bytes(event[1]))
+                        size_error = admission.size_error(writer.size) if admission is not None else None
+                        if size_error:
+                            rejected = RejectedUpload(writer.original_name, size_error)
+                            await writer.abort()
+                            writer = None
+                    else:
+                        field += event[1]
+                        if len(field) > MAX_FIELD_SIZE:
+                            raise MultipartError(f"表单字段 {name} 超过 {MAX_FIELD_SIZE} 字节")
+                elif rejected is not None:
+                    item, rejected = rejected, None
+                    yield name, item
+                elif writer is not None:
+                    saved, writer = await writer.finish(), None
+                    yield name, saved
+                else:
+                    yield name, field.decode(charset, errors="replace")
+
+        if not collector.finished:
+            raise MultipartError("multipart 请求体不完整")
+    finally:
+        if writer is not None:
+            await writer.abort()
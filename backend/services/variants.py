@@ -0,0 +1,129 @@
+"""
+图片派生版本（缩略图 / 缩放 / 转格式）
+首次请求时渲染并缓存到 temp/{request_id}/variants，之后直接返回缓存文件，不再经过 PIL。
+参数只接受白名单中的取值，避免任意参数组合把磁盘和 CPU 耗尽
+"""
+
+import hashlib
+import logging
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+from services.file_handler import write_bytes_atomic
+from services.image_pipeline import to_rgb
+from services.output_profiles import MEDIA_TYPES, available_profiles
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 允许的尺寸（像素）与质量
+ALLOWED_SIZES = (80, 160, 240, 320, 480, 640, 960, 1280)
+ALLOWED_QUALITIES = (40, 50, 60, 70, 75, 80, 85, 90)
+DEFAULT_QUALITY = 75
+
+# 允许的格式 -> (PIL 保存格式, 文件后缀)
+_FORMATS = {
+    "webp": ("WEBP", ".webp"),
+    "jpeg": ("JPEG", ".jpg"),
+    "png": ("PNG", ".png"),
+    "avif": ("AVIF", ".avif"),
+}
+
+# 派生版本缓存目录名（位于请求目录下，随请求目录一起清理）
+VARIANTS_DIR = "variants"
+
+
+def allowed_formats() -> tuple:
+    """当前环境可输出的格式"""
+    profile_formats = {profile.format for profile in available_profiles().values()}
+    return tuple(name for name, (fmt, _) in _FORMATS.items() if fmt in profile_formats)
+
+
+@dataclass(frozen=True)
+class VariantSpec:
+    """派生版本参数（宽高为外接框，保持原图比例，不放大）"""
+    width: Optional[int]
+    height: Optional[int]
+    fmt: str
+    quality: int = DEFAULT_QUALITY
+
+    @property
+    def suffix(self) -> str:
+        return _FORMATS[self.fmt][1]
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES[self.suffix]
+
+    @property
+    def key(self) -> str:
+        return f"w{self.width or 0}_h{self.height or 0}_q{self.quality}{self.suffix}"
+
+
+def parse_variant_spec(width: Optional[int], height: Optional[int],
+                       fmt: str = "webp", quality: Optional[int] = None) -> VariantSpec:
+    """
+    校验派生版本参数
+
+    Raises:
+        ValueError: 参数不在白名单中
+    """
+    if width is None and height is None:
+        raise ValueError("至少需要指定 w 或 h")
+    for name, value in (("w", width), ("h", height)):
+        if value is not None and value not in ALLOWED_SIZES:
+            raise ValueError(f"{name} 只能是 {', '.join(map(str, ALLOWED_SIZES))}")
+    if fmt not in allowed_formats():
+        raise ValueError(f"fmt 只能是 {', '.join(allowed_formats())}")
+    quality = DEFAULT_QUALITY if quality is None else quality
+    if quality not in ALLOWED_QUALITIES:
+        raise ValueError(f"q 只能是 {', '.join(map(str, ALLOWED_QUALITIES))}")
+    return VariantSpec(width=width, height=height, fmt=fmt, quality=quality)
+
+
+def variant_path(source_path: Path, spec: VariantSpec) -> Path:
+    """派生版本缓存路径：temp/{request_id}/variants/{原文件名}__{参数}"""
+    request_dir = source_path.parent.parent
+    return request_dir / VARIANTS_DIR / f"{source_path.name}__{spec.key}"
+
+
+def variant_etag(source_path: Path, spec: VariantSpec) -> str:
+    """ETag：由源文件的大小、修改时间和参数决定，不需要读取图片内容"""
+    stat = source_path.stat()
+    digest = hashlib.sha1(f"{source_path.name}|{stat.st_size}|{stat.st_mtime_ns}|{spec.key}".encode())
+    return f'"{digest.hexdigest()[:20]}"'
+
+
+def render_variant(source_path: Path, spec: VariantSpec) -> Path:
+    """
+    渲染派生版本并写入缓存（同步，在线程池中执行）
+
+    Returns:
+        缓存文件路径
+    """
+    dest_path = variant_path(source_path, spec)
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(source_path) as img:
+        bound = (spec.width or img.width, spec.height or img.height)
+        # JPEG 按目标尺寸以 DCT 缩放解码，大图缩略图快很多
+        img.draft("RGB", bound)
+        output = img.copy()
+    output.thumbnail(bound, Image.Resampling.LANCZOS)
+
+    save_format = _FORMATS[spec.fmt][0]
+    if save_format == "JPEG" or output.mode not in ("RGB", "RGBA", "L"):
+        output = to_rgb(output)
+    buffer = BytesIO()
+    if save_format == "PNG":
+        output.save(buffer, format=save_format, compress_level=6)
+    else:
+        output.save(buffer, format=save_format, quality=spec.quality)
+
+    write_bytes_atomic(dest_path, buffer.getvalue())
+    logger.info(f"已生成派生图片: {dest_path.name} ({output.width}x{output.height})")
+    return dest_path
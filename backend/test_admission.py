@@ -0,0 +1,73 @@
+import asyncio
+import struct
+import tempfile
+import zlib
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image
+
+from services.admission import AdmissionPolicy, RejectedUpload, admit_or_reject
+from services.file_handler import SavedUpload, _sniff_header
+
+
+def make_image(size, fmt="JPEG"):
+    buffer = BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def png_header_only(width, height):
+    """只有文件头的 PNG（声明的尺寸很大，文件只有几十字节）"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IEND", b"")
+
+
+def save(dest_dir, name, data):
+    path = dest_dir / name
+    path.write_bytes(data)
+    image_format, dimensions = _sniff_header(data[:64 * 1024])
+    return SavedUpload(path=path, original_name=name, size=len(data), content_hash="",
+                       format=image_format, dimensions=dimensions)
+
+
+def test_admission_rejects_without_decoding():
+    policy = AdmissionPolicy(max_bytes=1024 * 1024, max_pixels=50_000_000, max_edge=20000)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        uploads = [
+            save(tmp, "ok.jpg", make_image((800, 1200))),
+            save(tmp, "notes.txt", b"hello world"),
+            save(tmp, "anim.gif", make_image((100, 100), fmt="GIF")),
+            save(tmp, "big.png", make_image((200, 200), fmt="PNG") + b"\0" * (2 * 1024 * 1024)),
+            # 64MP：文件头可识别，按像素数拒绝
+            save(tmp, "bomb.png", png_header_only(8000, 8000)),
+            # 400MP：超过 PIL 自身上限，文件头识别失败，重新探测后按像素数拒绝
+            save(tmp, "huge.png", png_header_only(20000, 20000)),
+            save(tmp, "strip.png", png_header_only(30000, 100)),
+            save(tmp, "empty.jpg", b""),
+        ]
+
+        async def run():
+            return await asyncio.gather(*(admit_or_reject(upload, policy) for upload in uploads))
+
+        results = asyncio.run(run())
+
+        assert isinstance(results[0], SavedUpload) and results[0].path.exists()
+        reasons = {item.original_name: item.reason for item in results[1:]}
+        assert all(isinstance(item, RejectedUpload) for item in results[1:])
+        assert "无法识别" in reasons["notes.txt"]
+        assert "不支持的图片格式 GIF" in reasons["anim.gif"]
+        assert "1MB" in reasons["big.png"]
+        assert "像素" in reasons["bomb.png"] and "像素" in reasons["huge.png"]
+        assert "单边上限" in reasons["strip.png"]
+        assert "为空" in reasons["empty.jpg"]
+        # 被拒绝的文件已删除
+        assert [path.name for path in tmp.iterdir()] == ["ok.jpg"]
+
+
+if __name__ == "__main__":
+    test_admission_rejects_without_decoding()
+    print("OK")
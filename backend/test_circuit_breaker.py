@@ -0,0 +1,57 @@
+import time
+
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def make_breaker():
+    return CircuitBreaker("submit", failure_rate_threshold=0.5, min_requests=4,
+                          window_seconds=60, open_seconds=0.05, half_open_max_calls=1)
+
+
+def rejected(breaker):
+    try:
+        breaker.before_request()
+    except CircuitOpenError:
+        return True
+    return False
+
+
+def test_trips_on_error_rate():
+    breaker = make_breaker()
+    breaker.record_success()
+    breaker.record_failure("HTTP 502")
+    breaker.record_failure("HTTP 503")
+    assert breaker.state == "closed"  # 请求数不足，不计算错误率
+    breaker.record_failure("ReadTimeout")
+    assert breaker.state == "open"
+    assert rejected(breaker)
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_half_open_probe():
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record_failure("HTTP 503")
+    time.sleep(0.06)
+
+    # 半开：只放行一个试探请求
+    assert breaker.state == "half_open"
+    assert not rejected(breaker)
+    assert rejected(breaker)
+
+    # 试探失败重新熔断
+    breaker.record_failure("HTTP 503")
+    assert breaker.state == "open"
+    time.sleep(0.06)
+
+    # 试探成功恢复
+    assert not rejected(breaker)
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.stats()["trips"] == 2
+
+
+if __name__ == "__main__":
+    test_trips_on_error_rate()
+    test_half_open_probe()
+    print("OK")
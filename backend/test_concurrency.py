@@ -0,0 +1,106 @@
+import asyncio
+
+from services.adaptive_concurrency import AIMDController
+from services.concurrency import ConcurrencyLimiter
+
+
+def test_limit_and_resize():
+    async def run():
+        limiter = ConcurrencyLimiter(2, name="test")
+        active = 0
+        peak = 0
+        gate = asyncio.Event()
+
+        async def worker():
+            nonlocal active, peak
+            async with limiter:
+                active += 1
+                peak = max(peak, active)
+                await gate.wait()
+                active -= 1
+
+        tasks = [asyncio.create_task(worker()) for _ in range(6)]
+        await asyncio.sleep(0.01)
+        assert (limiter.in_use, limiter.waiting) == (2, 4)
+
+        # 调大上限立即唤醒排队者
+        limiter.set_limit(4)
+        await asyncio.sleep(0.01)
+        assert (limiter.in_use, limiter.waiting) == (4, 2)
+
+        gate.set()
+        await asyncio.gather(*tasks)
+        return limiter, peak
+
+    limiter, peak = asyncio.run(run())
+    assert peak == 4
+    assert limiter.in_use == 0
+    assert limiter.stats()["acquired"] == 6
+
+
+def test_cancelled_waiter_does_not_leak():
+    async def run():
+        limiter = ConcurrencyLimiter(1)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        limiter.release()
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert (limiter.in_use, limiter.waiting) == (0, 0)
+
+
+def test_waiter_cancelled_before_release_raises_cancelled():
+    async def run():
+        limiter = ConcurrencyLimiter(1, name="test")
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        # 排队者被取消后、恢复执行前名额被归还：_wake 已把它移出队列
+        waiter.cancel()
+        limiter.release()
+        try:
+            await waiter
+            assert False, "应当被取消"
+        except asyncio.CancelledError:
+            pass
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert (limiter.in_use, limiter.waiting) == (0, 0)
+
+
+def test_aimd_grows_and_backs_off():
+    limiter = ConcurrencyLimiter(200)
+    controller = AIMDController(limiter, min_limit=2, max_limit=12, initial_limit=4,
+                                latency_target=5, cooldown=60)
+    assert limiter.limit == 4
+
+    # 每累计 limit 次健康响应 +1
+    for _ in range(4):
+        controller.on_success(0.5)
+    assert limiter.limit == 5
+    # 慢响应不计入
+    for _ in range(10):
+        controller.on_success(30)
+    assert limiter.limit == 5
+    for _ in range(100):
+        controller.on_success(0.5)
+    assert limiter.limit == 12
+
+    # 过载成倍收缩，冷却期内只收缩一次
+    controller.on_overload("HTTP 503")
+    controller.on_overload("HTTP 429")
+    assert limiter.limit == 6
+    assert controller.stats()["overloads"] == 2
+
+
+if __name__ == "__main__":
+    test_limit_and_resize()
+    test_cancelled_waiter_does_not_leak()
+    test_waiter_cancelled_before_release_raises_cancelled()
+    test_aimd_grows_and_backs_off()
+    print("OK")
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+from services.executors import DISK_IO, IMAGE_CPU, BoundedExecutor, executor_stats, get_executor, run_in
+
+
+def test_saturation_metrics():
+    executor = BoundedExecutor("test", max_workers=2)
+    release = threading.Event()
+
+    def blocking(value):
+        release.wait(5)
+        return value * 2
+
+    async def run():
+        tasks = [asyncio.ensure_future(executor.run(blocking, i)) for i in range(5)]
+        await asyncio.sleep(0.1)
+        stats = executor.stats()
+        assert stats["active"] == 2 and stats["queued"] == 3
+        assert stats["saturation"] == 1.0
+        assert stats["saturated_submits"] == 3
+
+        # 排队中的任务被取消：不再计入排队数
+        tasks[-1].cancel()
+        await asyncio.sleep(0.05)
+        assert executor.stats()["queued"] == 2
+
+        release.set()
+        return await asyncio.gather(*tasks[:-1])
+
+    try:
+        assert asyncio.run(run()) == [0, 2, 4, 6]
+    finally:
+        executor.shutdown()
+    stats = executor.stats()
+    assert stats["active"] == 0 and stats["queued"] == 0
+    assert stats["completed"] == 4 and stats["peak_queued"] == 3
+
+
+def test_named_executors_are_separate():
+    async def run():
+        cpu_thread = await run_in(IMAGE_CPU, lambda: threading.current_thread().name)
+        io_thread = await run_in(DISK_IO, lambda: threading.current_thread().name)
+        return cpu_thread, io_thread
+
+    cpu_thread, io_thread = asyncio.run(run())
+    assert cpu_thread.startswith("image_cpu") and io_thread.startswith("disk_io")
+    assert get_executor(IMAGE_CPU) is get_executor(IMAGE_CPU)
+    assert executor_stats()[DISK_IO]["completed"] >= 1
+    try:
+        get_executor("unknown")
+        assert False, "应当失败"
+    except KeyError:
+        pass
+
+
+if __name__ == "__main__":
+    test_saturation_metrics()
+    test_named_executors_are_separate()
+    print("OK")
@@ -0,0 +1,56 @@
+import asyncio
+import hashlib
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+from fastapi import UploadFile
+from PIL import Image
+
+from services import file_handler
+from services.file_handler import save_all_upload_files, save_upload_file
+
+
+def make_image(size, fmt="PNG"):
+    buffer = BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def test_save_upload_file_streams_and_sniffs():
+    data = make_image((640, 480), fmt="JPEG") + b"\0" * (3 * 1024 * 1024)
+    original_chunk_size = file_handler.UPLOAD_CHUNK_SIZE
+    file_handler.UPLOAD_CHUNK_SIZE = 256 * 1024
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            upload = UploadFile(file=BytesIO(data), filename="../photo.jpg")
+            saved = asyncio.run(save_upload_file(upload, Path(tmp)))
+
+            assert saved.path.parent == Path(tmp)
+            assert saved.path.name.endswith("_photo.jpg")
+            assert saved.original_name == "photo.jpg"
+            assert saved.path.read_bytes() == data
+            assert saved.size == len(data)
+            assert saved.content_hash == hashlib.sha256(data).hexdigest()
+            assert saved.format == "JPEG" and saved.dimensions == (640, 480)
+    finally:
+        file_handler.UPLOAD_CHUNK_SIZE = original_chunk_size
+
+
+def test_save_all_upload_files_keeps_order():
+    files = [UploadFile(file=BytesIO(make_image((100 + i, 50))), filename=f"{i}.png") for i in range(6)]
+    files.insert(3, UploadFile(file=BytesIO(b"not an image"), filename="notes.txt"))
+    with tempfile.TemporaryDirectory() as tmp:
+        saved = asyncio.run(save_all_upload_files(files, Path(tmp), concurrency=2))
+
+        assert [upload.original_name for upload in saved] == ["0.png", "1.png", "2.png", "notes.txt",
+                                                              "3.png", "4.png", "5.png"]
+        assert saved[1].dimensions == (101, 50)
+        # 无法识别的文件照常保存，只是没有图片元数据
+        assert saved[3].format is None and saved[3].dimensions is None
+
+
+if __name__ == "__main__":
+    test_save_upload_file_streams_and_sniffs()
+    test_save_all_upload_files_keeps_order()
+    print("OK")
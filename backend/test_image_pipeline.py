@@ -0,0 +1,141 @@
+from io import BytesIO
+
+from PIL import Image
+
+from services.geometry import apply_plan, crop_box_for, plan_geometry
+from services.image_pipeline import best_fit_ratio, draft_decode, prepare_image, probe_image, restore_result
+from services.output_profiles import get_output_profile, media_type_for
+from services.payload_optimizer import PayloadOptimizer
+
+
+def make_image(size, fmt="JPEG", mode="RGB", color=(200, 30, 30)):
+    buffer = BytesIO()
+    Image.new(mode, size, color).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def test_ratio_selection():
+    assert best_fit_ratio(1024, 1024) == "1:1"
+    assert best_fit_ratio(1000, 1500) == "2:3"
+    assert best_fit_ratio(1500, 1000) == "3:2"
+    assert best_fit_ratio(457, 1024) == "2:3"
+
+
+def test_prepare_original_mode():
+    prepared = prepare_image(make_image((1024, 869)))
+    assert prepared.size_ratio == "1:1"
+    assert prepared.original_size == (1024, 869)
+    assert prepared.reference_size == (1024, 869)
+    assert prepared.canvas_size == (1024, 1024)
+    assert prepared.mime_type == "image/jpeg"
+    with Image.open(BytesIO(prepared.payload)) as img:
+        assert img.size == (1024, 1024)
+        # 上下白边
+        assert img.getpixel((512, 5)) == (255, 255, 255)
+
+
+def test_prepare_ozon_mode():
+    prepared = prepare_image(make_image((487, 1024)), target_mode="ozon_3_4")
+    assert prepared.reference_size == (768, 1024)
+    assert prepared.size_ratio == "2:3"
+    assert prepared.canvas_size == (768, 1152)
+
+
+def test_prepare_keeps_png_and_flattens_alpha():
+    prepared = prepare_image(make_image((300, 200), fmt="PNG", mode="RGBA", color=(0, 0, 0, 0)))
+    assert prepared.mime_type == "image/png"
+    with Image.open(BytesIO(prepared.payload)) as img:
+        assert img.mode == "RGB"
+        assert img.getpixel((150, 100)) == (255, 255, 255)
+
+
+def test_geometry_plan_ozon_with_long_edge_limit():
+    plan = plan_geometry((1000, 2000), "ozon_3_4", max_long_edge=1536)
+    assert plan.reference_size == (1500, 2000)
+    assert plan.size_ratio == "2:3"
+    assert plan.canvas_size == (1500, 2250)
+    assert plan.output_size == (1024, 1536)
+    assert plan.content_size == (1024, 1365)
+
+    # 拉伸 + 缩小一次完成，内容区域之外是白边
+    canvas = apply_plan(Image.new("RGB", (1000, 2000), (200, 30, 30)), plan)
+    assert canvas.size == plan.output_size
+    left, top, right, bottom = plan.content_box
+    assert canvas.getpixel((512, top - 1)) == (255, 255, 255)
+    assert canvas.getpixel((512, top + 1)) != (255, 255, 255)
+
+    # 按归一化裁剪框裁剪任意分辨率的结果图都能恢复 3:4
+    box = crop_box_for(plan.crop_box, (2048, 3072))
+    assert abs((box[2] - box[0]) / (box[3] - box[1]) - 0.75) < 0.01
+
+
+def test_prepare_records_crop_box():
+    prepared = prepare_image(make_image((1024, 869)))
+    assert crop_box_for(prepared.crop_box, (1024, 1024)) == (0, 77, 1024, 946)
+
+
+def test_restore_result_in_memory():
+    prepared = prepare_image(make_image((1024, 869)))
+    result = make_image((1024, 1024), fmt="PNG")
+
+    data, reencoded = restore_result(result, prepared.crop_box, get_output_profile("ozon_jpeg"))
+    assert reencoded
+    with Image.open(BytesIO(data)) as img:
+        assert img.format == "JPEG"
+        assert img.size == (1024, 869)
+
+    # 结果已是目标比例、目标格式：原样返回，不重新编码
+    square = prepare_image(make_image((600, 600)))
+    data, reencoded = restore_result(result, square.crop_box, get_output_profile("png"))
+    assert not reencoded and data is result
+
+    # 无需裁剪但格式不同：只转码
+    data, reencoded = restore_result(result, square.crop_box, get_output_profile("webp"))
+    assert reencoded
+    with Image.open(BytesIO(data)) as img:
+        assert img.format == "WEBP"
+
+
+def test_draft_decode_large_jpeg():
+    data = make_image((4000, 5336))
+    info = probe_image(data)
+    assert info.format == "JPEG" and info.size == (4000, 5336)
+
+    # 按目标尺寸缩小解码，解码尺寸不小于目标尺寸
+    with Image.open(BytesIO(data)) as img:
+        assert draft_decode(img, (1000, 1334)) == (1000, 1334)
+    with Image.open(BytesIO(data)) as img:
+        assert draft_decode(img, (1024, 1365)) == (2000, 2668)
+    # PNG 不处理
+    with Image.open(BytesIO(make_image((400, 400), fmt="PNG"))) as img:
+        assert draft_decode(img, (100, 100)) == (400, 400)
+
+    prepared = prepare_image(data, optimizer=PayloadOptimizer(max_long_edge=1536))
+    assert prepared.original_size == (4000, 5336)
+    assert prepared.upload_size == (1024, 1536)
+    # 缩小解码不影响比例恢复
+    assert crop_box_for(prepared.crop_box, (1024, 1536)) == (0, 85, 1024, 1451)
+
+
+def test_output_profiles():
+    assert get_output_profile().name == "ozon_jpeg"
+    assert media_type_for("translated_a.webp") == "image/webp"
+    assert media_type_for("translated_a.JPG") == "image/jpeg"
+    try:
+        get_output_profile("gif")
+        assert False, "应当失败"
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    test_ratio_selection()
+    test_prepare_original_mode()
+    test_prepare_ozon_mode()
+    test_prepare_keeps_png_and_flattens_alpha()
+    test_geometry_plan_ozon_with_long_edge_limit()
+    test_prepare_records_crop_box()
+    test_restore_result_in_memory()
+    test_draft_decode_large_jpeg()
+    test_output_profiles()
+    print("OK")
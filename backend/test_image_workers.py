@@ -0,0 +1,86 @@
+import asyncio
+import os
+from io import BytesIO
+
+from PIL import Image
+
+from services.image_pipeline import prepare_image
+from services.image_workers import ImageProcessPool
+from services.output_profiles import get_output_profile
+from services.payload_optimizer import PayloadOptimizer
+
+
+def make_image(size, fmt="JPEG", color=(200, 30, 30)):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def shared_segments():
+    if not os.path.isdir("/dev/shm"):
+        return set()
+    return {name for name in os.listdir("/dev/shm") if name.startswith("psm_")}
+
+
+def test_prepare_and_restore_in_process_pool():
+    before = shared_segments()
+    pool = ImageProcessPool(max_workers=2)
+    optimizer = PayloadOptimizer(max_long_edge=512)
+
+    async def run():
+        await pool.warmup()
+        data = make_image((914, 2048), fmt="PNG")
+        prepared = await pool.prepare(data, "original", optimizer=optimizer)
+
+        # 与进程内处理结果一致
+        expected = prepare_image(data, "original", optimizer=PayloadOptimizer(max_long_edge=512))
+        assert prepared.size_ratio == expected.size_ratio == "2:3"
+        assert prepared.upload_size == expected.upload_size
+        assert prepared.payload == expected.payload
+        assert optimizer.stats()["images"] == 1
+
+        # 需要裁剪：在工作进程中裁剪并编码
+        result = make_image((1024, 1536), fmt="PNG")
+        restored, reencoded = await pool.restore(result, prepared.crop_box, get_output_profile("ozon_jpeg"))
+        assert reencoded
+        with Image.open(BytesIO(restored)) as img:
+            assert img.format == "JPEG"
+            assert img.height == 1536 and abs(img.width - 685) <= 1
+
+        # 无需处理：原样返回，不回传数据
+        square = make_image((600, 600))
+        square_prepared = await pool.prepare(square)
+        same, reencoded = await pool.restore(square, square_prepared.crop_box, get_output_profile("ozon_jpeg"))
+        assert not reencoded and same is square
+
+        # 并发提交：排队深度统计
+        await asyncio.gather(*(pool.prepare(data) for _ in range(4)))
+
+    try:
+        asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+    stats = pool.stats()
+    assert stats["completed"] == 8 and stats["failed"] == 0
+    assert stats["pending"] == 0 and stats["peak_pending"] >= 4
+    # 共享内存全部释放
+    assert shared_segments() <= before
+
+
+def test_worker_error_is_raised():
+    pool = ImageProcessPool(max_workers=1)
+    try:
+        asyncio.run(pool.prepare(b"not an image"))
+        assert False, "应当失败"
+    except Exception as e:
+        assert "cannot identify" in str(e)
+    finally:
+        pool.shutdown()
+    assert pool.stats()["failed"] == 1
+
+
+if __name__ == "__main__":
+    test_prepare_and_restore_in_process_pool()
+    test_worker_error_is_raised()
+    print("OK")
@@ -0,0 +1,357 @@
+import asyncio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlmodel import Session, SQLModel, create_engine
+
+from services import job_queue, job_worker
+from models.db_models import User
+from services.admission import RejectedUpload
+from services.file_handler import SavedUpload
+from services.job_worker import JobWorker
+
+
+def make_engine(tmp):
+    engine = create_engine(f"sqlite:///{tmp}/queue.db", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def make_upload(tmp, name):
+    path = Path(tmp) / name
+    path.write_bytes(b"image")
+    return SavedUpload(path=path, original_name=name, size=5, content_hash=name,
+                       format="JPEG", dimensions=(100, 150))
+
+
+def test_claims_are_exclusive_and_batch_completes():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(tmp)
+        with Session(engine) as session:
+            user = User(email="a@example.com", hashed_password="x", credits=10)
+            session.add(user)
+            session.commit()
+            job_queue.create_batch(session, "b1", user_id=user.id, target_mode="ozon_3_4")
+            for i in range(3):
+                job_queue.enqueue_upload(session, "b1", i, make_upload(tmp, f"{i}.jpg"))
+            job_queue.record_rejected(session, "b1", 3, RejectedUpload("x.txt", "无法识别的图片文件"))
+
+            # 上传中的批次即可认领；不同执行者不会拿到同一张图片
+            first = job_queue.claim_jobs(session, "a", 2, lease_seconds=60)
+            second = job_queue.claim_jobs(session, "b", 5, lease_seconds=60)
+            assert [job.upload.original_name for job in first] == ["0.jpg", "1.jpg"]
+            assert [job.upload.original_name for job in second] == ["2.jpg"]
+            assert job_queue.claim_jobs(session, "c", 5, lease_seconds=60) == []
+            assert first[0].target_mode == "ozon_3_4" and first[0].upload.dimensions == (100, 150)
+
+            # 只有持有租约的执行者能写入结果
+            assert job_queue.finish_job(session, first[0].id, "b", output_name="x.jpg") is None
+            assert job_queue.finish_job(session, first[0].id, "a", output_name="0_translated.jpg") == "b1"
+            assert job_queue.finish_job(session, first[1].id, "a", error="上游错误") == "b1"
+            assert job_queue.finish_job(session, second[0].id, "b", output_name="2_translated.jpg") == "b1"
+
+            # 入队时预扣积分（未通过校验的不扣）；上传未结束前不会完成
+            session.refresh(user)
+            assert user.credits == 7
+            assert not job_queue.refresh_batch(session, "b1", 1800)
+            assert job_queue.seal_batch(session, "b1", 1800) == 3
+            session.refresh(user)
+            assert user.credits == 7
+
+            status = job_queue.batch_status(session, "b1")
+            assert status["status"] == "completed"
+            assert (status["total"], status["processed"], status["success"], status["failed"]) == (4, 4, 2, 2)
+            assert [image["original_name"] for image in status["images"]] == ["0.jpg", "1.jpg", "2.jpg", "x.txt"]
+            assert status["images"][0]["file_path"] == "b1/output/0_translated.jpg"
+            assert status["images"][3]["error"] == "无法识别的图片文件"
+
+            # 到期后清理记录
+            assert job_queue.pop_expired_batches(session) == []
+            assert job_queue.pop_expired_batches(session, now=datetime.utcnow() + timedelta(hours=1)) == ["b1"]
+            assert job_queue.batch_status(session, "b1") is None
+
+
+def test_expired_lease_is_reclaimed_until_attempts_run_out():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(tmp)
+        with Session(engine) as session:
+            job_queue.create_batch(session, "b2")
+            job_queue.enqueue_upload(session, "b2", 0, make_upload(tmp, "a.jpg"))
+            job_queue.seal_batch(session, "b2", 1800)
+
+            # 执行者 a 退出，租约过期后由 b 接管
+            [job] = job_queue.claim_jobs(session, "a", 1, lease_seconds=-1)
+            assert job_queue.renew_leases(session, "a", [job.id], 60) == 1
+            later = datetime.utcnow() + timedelta(seconds=120)
+            [reclaimed] = job_queue.claim_jobs(session, "b", 1, lease_seconds=60, now=later)
+            assert reclaimed.id == job.id and reclaimed.attempts == 2
+            assert job_queue.renew_leases(session, "a", [job.id], 60) == 0
+            assert job_queue.finish_job(session, job.id, "a", output_name="late.jpg") is None
+
+            # 达到最多执行次数后不再认领，记为失败
+            much_later = later + timedelta(seconds=120)
+            assert job_queue.fail_exhausted_jobs(session, max_attempts=2, now=much_later) == ["b2"]
+            assert job_queue.claim_jobs(session, "c", 1, lease_seconds=60, now=much_later) == []
+            assert job_queue.refresh_batch(session, "b2", 1800)
+            assert job_queue.batch_status(session, "b2")["failed"] == 1
+
+
+def test_cancelled_batch_charges_started_jobs_and_waits_for_them():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(tmp)
+        with Session(engine) as session:
+            user = User(email="c@example.com", hashed_password="x", credits=10)
+            session.add(user)
+            session.commit()
+            job_queue.create_batch(session, "b6", user_id=user.id)
+            for i in range(4):
+                job_queue.enqueue_upload(session, "b6", i, make_upload(tmp, f"{i}.jpg"))
+            done, running, orphan = job_queue.claim_jobs(session, "a", 3, lease_seconds=60)
+            job_queue.finish_job(session, done.id, "a", output_name="0_translated.jpg")
+
+            # 上传中断：排队中的图片取消，已开始执行的 3 张扣积分，执行中的图片结束前不登记清理
+            assert job_queue.cancel_batch(session, "b6", 1800) == 3
+            assert job_queue.cancel_batch(session, "b6", 1800) == 0
+            session.refresh(user)
+            assert user.credits == 7
+            later = datetime.utcnow() + timedelta(days=1)
+            assert job_queue.pop_expired_batches(session, now=later) == []
+            assert job_queue.claim_jobs(session, "b", 5, lease_seconds=60) == []
+
+            status = job_queue.batch_status(session, "b6")
+            assert status["status"] == "failed" and status["success"] == 1
+            assert status["images"][0]["file_path"] == "b6/output/0_translated.jpg"
+
+            # 执行中的图片结束后登记清理；执行者已退出的图片租约过期后记为失败
+            assert job_queue.finish_job(session, running.id, "a", output_name="1_translated.jpg") == "b6"
+            assert not job_queue.refresh_batch(session, "b6", 1800)
+            assert job_queue.pop_expired_batches(session, now=later) == []
+            job_queue.renew_leases(session, "a", [orphan.id], lease_seconds=-1)
+            assert job_queue.fail_orphaned_jobs(session) == ["b6"]
+            job_queue.refresh_batch(session, "b6", 1800)
+            assert job_queue.pop_expired_batches(session) == []
+            assert job_queue.pop_expired_batches(session, now=later) == ["b6"]
+
+
+def test_concurrent_enqueues_never_overdraw_credits():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(tmp)
+        with Session(engine) as session:
+            user = User(email="r@example.com", hashed_password="x", credits=5)
+            session.add(user)
+            session.commit()
+            user_id = user.id
+            for i in range(4):
+                job_queue.create_batch(session, f"r{i}", user_id=user_id)
+
+        def enqueue(batch_id, i):
+            with Session(engine) as session:
+                return job_queue.enqueue_upload(session, batch_id, i, make_upload(tmp, f"{batch_id}-{i}.jpg"))
+
+        # 4 个请求同时各入队 3 张：条件扣除只放行 5 张，不会透支
+        with ThreadPoolExecutor(max_workers=12) as pool:
+            results = list(pool.map(lambda args: enqueue(*args), [(f"r{b}", i) for b in range(4) for i in range(3)]))
+        assert sum(job is not None for job in results) == 5
+        with Session(engine) as session:
+            assert session.get(User, user_id).credits == 0
+            assert job_queue.queue_stats(session)["jobs"]["queued"] == 5
+
+
+def test_stale_upload_is_cancelled_and_expires():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(tmp)
+        with Session(engine) as session:
+            user = User(email="s@example.com", hashed_password="x", credits=10)
+            session.add(user)
+            session.commit()
+            job_queue.create_batch(session, "b7", user_id=user.id)
+            job_queue.create_batch(session, "b8")
+            for i in range(2):
+                job_queue.enqueue_upload(session, "b7", i, make_upload(tmp, f"{i}.jpg"))
+            [job] = job_queue.claim_jobs(session, "a", 1, lease_seconds=60)
+            job_queue.finish_job(session, job.id, "a", output_name="0_translated.jpg")
+
+            # Web 进程在上传中途退出：超时后按上传中断取消，只扣已执行的图片
+            assert job_queue.cancel_stale_uploads(session, 3600, 1800) == []
+            later = datetime.utcnow() + timedelta(hours=2)
+            assert sorted(job_queue.cancel_stale_uploads(session, 3600, 1800, now=later)) == ["b7", "b8"]
+            session.refresh(user)
+            assert user.credits == 9
+            assert job_queue.seal_batch(session, "b7", 1800) is None
+            assert job_queue.batch_status(session, "b7")["status"] == "failed"
+            assert sorted(job_queue.pop_expired_batches(session, now=later)) == ["b7", "b8"]
+
+
+class FakeService:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.limit = None
+        self.calls = []
+
+    def is_available(self):
+        return True
+
+    def capacity(self):
+        return self.limit
+
+    async def translate(self, input_path, output_dir, target_mode="original", output_profile=None, upload=None):
+        self.calls.append((input_path.name, target_mode, upload.content_hash))
+        await asyncio.sleep(self.delay)
+        if input_path.name.startswith("bad"):
+            raise RuntimeError("上游返回错误")
+        output = output_dir / f"{input_path.stem}_translated.jpg"
+        output.write_bytes(b"result")
+        return output
+
+
+def test_worker_drains_queue_and_releases_on_stop():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(tmp)
+        original_root = job_worker.TEMP_ROOT
+        job_worker.TEMP_ROOT = Path(tmp)
+        try:
+            with Session(engine) as session:
+                job_queue.create_batch(session, "b3", target_mode="ozon_3_4")
+                for i, name in enumerate(["0.jpg", "bad.jpg", "2.jpg"]):
+                    job_queue.enqueue_upload(session, "b3", i, make_upload(tmp, name))
+                job_queue.seal_batch(session, "b3", 1800)
+
+            service = FakeService()
+
+            async def drain():
+                worker = JobWorker(engine=engine, service_factory=lambda: service, worker_id="w1",
+                                   concurrency=2, poll_interval=0.05)
+                worker.start()
+                for _ in range(100):
+                    with Session(engine) as session:
+                        if job_queue.batch_status(session, "b3")["status"] == "completed":
+                            break
+                    await asyncio.sleep(0.05)
+                await worker.stop()
+                return worker.stats()
+
+            stats = asyncio.run(drain())
+            assert stats["succeeded"] == 2 and stats["failed"] == 1
+            assert sorted(call[0] for call in service.calls) == ["0.jpg", "2.jpg", "bad.jpg"]
+            assert all(call[1] == "ozon_3_4" for call in service.calls)
+            with Session(engine) as session:
+                status = job_queue.batch_status(session, "b3")
+            assert (status["success"], status["failed"]) == (2, 1)
+            assert (Path(tmp) / "b3" / "output" / "0_translated.jpg").exists()
+
+            # 关闭时执行中的图片退回队列，不计执行次数
+            with Session(engine) as session:
+                job_queue.create_batch(session, "b4")
+                job_queue.enqueue_upload(session, "b4", 0, make_upload(tmp, "slow.jpg"))
+
+            async def interrupt():
+                worker = JobWorker(engine=engine, service_factory=lambda: FakeService(delay=10),
+                                   worker_id="w2", poll_interval=0.05)
+                worker.start()
+                await asyncio.sleep(0.3)
+                assert worker.stats()["running"] == 1
+                await worker.stop()
+
+            asyncio.run(interrupt())
+            with Session(engine) as session:
+                [job] = job_queue.claim_jobs(session, "w3", 5, lease_seconds=60)
+                assert job.upload.original_name == "slow.jpg" and job.attempts == 1
+        finally:
+            job_worker.TEMP_ROOT = original_root
+
+
+def test_worker_claims_follow_service_capacity():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(tmp)
+        original_root = job_worker.TEMP_ROOT
+        job_worker.TEMP_ROOT = Path(tmp)
+        try:
+            with Session(engine) as session:
+                job_queue.create_batch(session, "b9")
+                for i in range(6):
+                    job_queue.enqueue_upload(session, "b9", i, make_upload(tmp, f"{i}.jpg"))
+                job_queue.seal_batch(session, "b9", 1800)
+
+            service = FakeService(delay=0.2)
+            service.limit = 2
+
+            async def observe():
+                worker = JobWorker(engine=engine, service_factory=lambda: service, worker_id="w",
+                                   concurrency=16, poll_interval=0.02)
+                worker.start()
+                await asyncio.sleep(0.1)
+                # 在途上限（容量）为 2：只认领 2 张，上限放大后继续认领
+                running = worker.stats()["running"]
+                service.limit = 5
+                worker.notify()
+                await asyncio.sleep(0.05)
+                grown = worker.stats()["running"]
+                await worker.stop()
+                return running, grown
+
+            assert asyncio.run(observe()) == (2, 5)
+        finally:
+            job_worker.TEMP_ROOT = original_root
+
+
+def test_workers_share_queue_and_register_heartbeats():
+    with tempfile.TemporaryDirectory() as tmp:
+        # 两个工作循环各用自己的引擎，模拟独立的工作进程共用同一个数据库
+        engines = [make_engine(tmp), make_engine(tmp)]
+        original_root = job_worker.TEMP_ROOT
+        job_worker.TEMP_ROOT = Path(tmp)
+        try:
+            with Session(engines[0]) as session:
+                job_queue.create_batch(session, "b5")
+                for i in range(12):
+                    job_queue.enqueue_upload(session, "b5", i, make_upload(tmp, f"{i}.jpg"))
+                job_queue.seal_batch(session, "b5", 1800)
+
+            services = [FakeService(delay=0.05), FakeService(delay=0.05)]
+
+            async def drain():
+                workers = [
+                    JobWorker(engine=engine, service_factory=lambda service=service: service,
+                              worker_id=f"node-{i}", concurrency=3, poll_interval=0.05)
+                    for i, (engine, service) in enumerate(zip(engines, services))
+                ]
+                for worker in workers:
+                    worker.start()
+                for _ in range(100):
+                    with Session(engines[0]) as session:
+                        if job_queue.batch_status(session, "b5")["status"] == "completed":
+                            break
+                    await asyncio.sleep(0.05)
+                with Session(engines[0]) as session:
+                    registered = [item["worker_id"] for item in job_queue.active_workers(session, 60)]
+                for worker in workers:
+                    await worker.stop()
+                return registered
+
+            registered = asyncio.run(drain())
+            assert sorted(registered) == ["node-0", "node-1"]
+            names = [call[0] for service in services for call in service.calls]
+            assert sorted(names) == sorted(f"{i}.jpg" for i in range(12))
+            assert all(service.calls for service in services)
+            with Session(engines[0]) as session:
+                assert job_queue.batch_status(session, "b5")["success"] == 12
+                # 正常退出时注销，超时未心跳的记录被清理
+                assert job_queue.active_workers(session, 60) == []
+                job_queue.record_heartbeat(session, "gone", "host", 1, 4)
+                assert job_queue.prune_workers(session, stale_seconds=-1) == 1
+        finally:
+            job_worker.TEMP_ROOT = original_root
+
+
+if __name__ == "__main__":
+    test_claims_are_exclusive_and_batch_completes()
+    test_expired_lease_is_reclaimed_until_attempts_run_out()
+    test_cancelled_batch_charges_started_jobs_and_waits_for_them()
+    test_concurrent_enqueues_never_overdraw_credits()
+    test_stale_upload_is_cancelled_and_expires()
+    test_worker_drains_queue_and_releases_on_stop()
+    test_worker_claims_follow_service_capacity()
+    test_workers_share_queue_and_register_heartbeats()
+    print("OK")
@@ -0,0 +1,68 @@
+import os
+from io import BytesIO
+
+from PIL import Image, ImageCms
+
+from services.image_pipeline import prepare_image
+from services.payload_optimizer import PayloadOptimizer
+
+
+def make_noise_png(size):
+    img = Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3))
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_caps_long_edge_and_keeps_ratio():
+    data = make_noise_png((2400, 1200))
+    optimizer = PayloadOptimizer(max_long_edge=1536, target_bytes=0)
+    prepared = prepare_image(data, optimizer=optimizer)
+
+    assert prepared.mime_type == "image/jpeg"
+    # 画布和参考尺寸保持原分辨率，供比例恢复使用
+    assert prepared.reference_size == (2400, 1200)
+    assert prepared.canvas_size == (2400, 1600)
+    assert prepared.upload_size == (1536, 1024)
+    with Image.open(BytesIO(prepared.payload)) as img:
+        assert img.size == (1536, 1024)
+    assert optimizer.stats()["images"] == 1
+
+
+def test_meets_byte_budget():
+    data = make_noise_png((1200, 1200))
+    optimizer = PayloadOptimizer(target_bytes=200 * 1024)
+    prepared = prepare_image(data, optimizer=optimizer)
+    assert len(prepared.payload) <= 200 * 1024
+    with Image.open(BytesIO(prepared.payload)) as img:
+        assert img.width == img.height
+
+
+def test_strips_metadata():
+    img = Image.new("RGB", (300, 300), (10, 120, 200))
+    exif = Image.Exif()
+    exif[0x010F] = "camera"
+    icc = ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes()
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG", exif=exif, icc_profile=icc)
+
+    prepared = prepare_image(buffer.getvalue(), optimizer=PayloadOptimizer())
+    with Image.open(BytesIO(prepared.payload)) as out:
+        assert "icc_profile" not in out.info
+        assert "exif" not in out.info
+
+
+def test_submit_report():
+    optimizer = PayloadOptimizer()
+    optimizer.record_submit(payload_bytes=1_000_000, source_bytes=1_000_000, seconds=1.0)
+    saving = optimizer.record_submit(payload_bytes=500_000, source_bytes=5_000_000, seconds=0.5)
+    assert saving["saved_bytes"] == 4_500_000
+    assert abs(saving["estimated_saved_seconds"] - 4.5) < 0.01
+
+
+if __name__ == "__main__":
+    test_caps_long_edge_and_keeps_ratio()
+    test_meets_byte_budget()
+    test_strips_metadata()
+    test_submit_report()
+    print("OK")
@@ -0,0 +1,39 @@
+import asyncio
+import time
+
+from services.rate_limiter import TokenBucket
+
+
+def test_burst_then_rate():
+    async def run():
+        bucket = TokenBucket(rate=50, burst=3)
+        start = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        burst_elapsed = time.monotonic() - start
+        await asyncio.gather(*(bucket.acquire() for _ in range(5)))
+        return bucket, burst_elapsed, time.monotonic() - start
+
+    bucket, burst_elapsed, total_elapsed = asyncio.run(run())
+    # 突发容量内立即放行，之后按 50/s 放行
+    assert burst_elapsed < 0.02
+    assert 0.08 <= total_elapsed < 0.5
+    stats = bucket.stats()
+    assert stats["acquired"] == 8
+    assert stats["waiting"] == 0
+    assert stats["total_wait_seconds"] > 0
+
+
+def test_unlimited():
+    async def run():
+        bucket = TokenBucket(rate=0, burst=1)
+        return await asyncio.gather(*(bucket.acquire() for _ in range(100)))
+
+    waits = asyncio.run(asyncio.wait_for(run(), 1))
+    assert sum(waits) == 0
+
+
+if __name__ == "__main__":
+    test_burst_then_rate()
+    test_unlimited()
+    print("OK")
@@ -0,0 +1,53 @@
+import tempfile
+from pathlib import Path
+
+from services.result_cache import ResultCache, make_cache_key
+
+
+def write(path: Path, size: int) -> Path:
+    path.write_bytes(b"x" * size)
+    return path
+
+
+def test_hit_miss_and_persistence():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        cache = ResultCache(tmp / "cache", max_bytes=10_000)
+        key = make_cache_key("abc", "prompt", "original")
+        assert key != make_cache_key("abc", "prompt", "ozon_3_4")
+
+        assert not cache.get(key, tmp / "out.jpg")
+        cache.put(key, write(tmp / "result.jpg", 100))
+        assert cache.get(key, tmp / "out.jpg")
+        assert (tmp / "out.jpg").read_bytes() == b"x" * 100
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+        # 重启后从磁盘恢复索引
+        reloaded = ResultCache(tmp / "cache", max_bytes=10_000)
+        assert reloaded.stats()["entries"] == 1
+        assert reloaded.get(key, tmp / "out2.jpg")
+
+
+def test_lru_eviction():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        cache = ResultCache(tmp / "cache", max_bytes=250)
+        source = write(tmp / "result.jpg", 100)
+        cache.put("a" * 64, source)
+        cache.put("b" * 64, source)
+        # 访问 a，使 b 成为最久未访问
+        assert cache.get("a" * 64, tmp / "out.jpg")
+        cache.put("c" * 64, source)
+
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["bytes"] == 200
+        assert not cache.get("b" * 64, tmp / "out.jpg")
+        assert cache.get("a" * 64, tmp / "out.jpg")
+        assert cache.get("c" * 64, tmp / "out.jpg")
+
+
+if __name__ == "__main__":
+    test_hit_miss_and_persistence()
+    test_lru_eviction()
+    print("OK")
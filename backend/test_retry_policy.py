@@ -0,0 +1,58 @@
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from services.retry_policy import RetryBudget, RetryPolicy, parse_retry_after
+
+
+def test_classification():
+    idempotent = RetryPolicy(idempotent=True)
+    submit = RetryPolicy(idempotent=False)
+
+    assert idempotent.is_retryable_error(httpx.ReadTimeout("timeout"))
+    assert idempotent.is_retryable_error(httpx.RemoteProtocolError("closed"))
+    # 请求可能已送达：非幂等请求不重试
+    assert not submit.is_retryable_error(httpx.ReadTimeout("timeout"))
+    assert not submit.is_retryable_error(httpx.RemoteProtocolError("closed"))
+    assert submit.is_retryable_error(httpx.ConnectError("refused"))
+
+    assert idempotent.is_retryable_status(502)
+    assert submit.is_retryable_status(429)
+    assert not submit.is_retryable_status(502)
+    assert not idempotent.is_retryable_status(400)
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+    delays = [policy.backoff(10) for _ in range(200)]
+    assert all(0 <= d <= 4.0 for d in delays)
+    assert len(set(delays)) > 1
+    assert all(0 <= policy.backoff(0) <= 1.0 for _ in range(50))
+
+
+def test_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+    future = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 <= parse_retry_after(format_datetime(future, usegmt=True)) <= 31
+
+    policy = RetryPolicy(max_retry_after=10.0)
+    assert policy.delay_for_response(httpx.Response(429, headers={"Retry-After": "2"}), 0) == 2.0
+    assert policy.delay_for_response(httpx.Response(503, headers={"Retry-After": "3600"}), 0) == 10.0
+
+
+def test_budget():
+    budget = RetryBudget(2)
+    assert budget.consume() and budget.consume()
+    assert not budget.consume()
+    assert budget.remaining == 0
+
+
+if __name__ == "__main__":
+    test_classification()
+    test_backoff_is_jittered_and_capped()
+    test_retry_after()
+    test_budget()
+    print("OK")
@@ -0,0 +1,54 @@
+import asyncio
+import base64
+import json
+import os
+
+import httpx
+
+from services.streaming_payload import DATA_URL_PLACEHOLDER, StreamingJSONBody
+
+
+def make_payload():
+    return {"model": "gpt-4o-image", "prompt": "翻译成俄语", "size": "1:1", "n": 1,
+            "image_urls": [DATA_URL_PLACEHOLDER]}
+
+
+def test_body_matches_json_encoding():
+    for size in (0, 1, 2, 3, 1000, 100_001):
+        data = os.urandom(size)
+        body = StreamingJSONBody(make_payload(), data, "image/png", chunk_size=1000)
+        expected = make_payload()
+        expected["image_urls"] = ["data:image/png;base64," + base64.b64encode(data).decode()]
+
+        raw = b"".join(body.chunks())
+        assert json.loads(raw) == expected
+        assert len(raw) == body.content_length
+        # 可重复迭代（重试时重新发送）
+        assert b"".join(body.chunks()) == raw
+
+
+def test_sent_with_content_length():
+    data = os.urandom(50_000)
+    seen = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen["headers"] = request.headers
+        seen["body"] = request.read()
+        return httpx.Response(200)
+
+    async def run():
+        body = StreamingJSONBody(make_payload(), data, "image/jpeg", chunk_size=3 * 1024)
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await client.post("https://api.fake/v1/images/generations", content=body, headers=body.headers)
+        return body
+
+    body = asyncio.run(run())
+    assert seen["headers"]["content-length"] == str(body.content_length)
+    assert "transfer-encoding" not in seen["headers"]
+    assert json.loads(seen["body"])["image_urls"][0].endswith(base64.b64encode(data).decode())
+
+
+if __name__ == "__main__":
+    test_body_matches_json_encoding()
+    test_sent_with_content_length()
+    print("OK")
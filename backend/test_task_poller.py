@@ -0,0 +1,88 @@
+import asyncio
+
+from services.errors import TranslationError
+from services.latency_model import LatencyModel
+from services.task_poller import TaskPoller
+
+
+class FakeStatus:
+    """task_N 在第 N 次查询时完成；task_fail 直接失败；task_stuck 永不完成"""
+
+    def __init__(self):
+        self.calls = {}
+
+    async def __call__(self, task_id, retry_budget=None):
+        self.calls[task_id] = self.calls.get(task_id, 0) + 1
+        if task_id == "task_fail":
+            raise TranslationError("任务失败: boom")
+        if task_id != "task_stuck" and self.calls[task_id] >= int(task_id.split("_")[1]):
+            return {"status": "completed", "progress": 100}
+        return {"status": "processing", "progress": 10}
+
+
+def test_many_tasks_share_one_poller():
+    async def run():
+        fake = FakeStatus()
+        poller = TaskPoller(fake, poll_interval=0.01, max_attempts=500, request_rate=10000, request_burst=100)
+        results = await asyncio.gather(*(poller.wait(f"task_{n}") for n in range(1, 51)))
+        stats = poller.stats()
+        await poller.close()
+        return fake, results, stats
+
+    fake, results, stats = asyncio.run(run())
+    assert all(r["status"] == "completed" for r in results)
+    assert fake.calls["task_7"] == 7
+    assert stats["completed"] == 50
+    assert stats["tracked_tasks"] == 0
+    assert stats["polls"] == sum(range(1, 51))
+
+
+def test_failure_and_timeout():
+    async def run():
+        poller = TaskPoller(FakeStatus(), poll_interval=0.01, max_attempts=3, request_rate=1000, request_burst=100)
+        results = await asyncio.gather(poller.wait("task_fail"), poller.wait("task_stuck"), return_exceptions=True)
+        await poller.close()
+        return poller, results
+
+    poller, (failed, stuck) = asyncio.run(run())
+    assert isinstance(failed, TranslationError) and "boom" in str(failed)
+    assert isinstance(stuck, TranslationError) and "超时" in str(stuck)
+    assert poller.timed_out == 1
+
+
+def test_latency_model_scheduling():
+    model = LatencyModel(min_interval=3, max_interval=15, default_first_delay=20, min_samples=3)
+    assert model.first_delay("2:3|original") == 20
+    assert model.next_delay("2:3|original", elapsed=20, progress=0) == 3
+
+    for duration in (40, 45, 50, 55, 60):
+        model.record("2:3|original", duration, polls=2)
+    # 首次查询安排在历史 P10 附近
+    assert 40 <= model.first_delay("2:3|original") < 45
+    # 按进度外推：已用 30 秒完成 75%，预计还需 10 秒
+    assert model.next_delay("2:3|original", elapsed=30, progress=75) == 10
+    # 超过历史中位数且无进度信息时退回最小间隔
+    assert model.next_delay("2:3|original", elapsed=80, progress=0) == 3
+    assert model.stats()["avg_polls_per_completed_task"] == 2
+
+
+def test_poller_uses_latency_model():
+    async def run():
+        model = LatencyModel(min_interval=0.01, max_interval=0.05, default_first_delay=0.01, min_samples=1)
+        poller = TaskPoller(FakeStatus(), poll_interval=0.01, max_attempts=500,
+                            request_rate=10000, request_burst=100, latency_model=model)
+        await poller.wait("task_3", key="1:1|original")
+        await poller.close()
+        return model
+
+    model = asyncio.run(run())
+    assert model.stats()["completed_tasks"] == 1
+    assert model.quantile("1:1|original", 0.5) > 0
+
+
+if __name__ == "__main__":
+    test_many_tasks_share_one_poller()
+    test_failure_and_timeout()
+    test_latency_model_scheduling()
+    test_poller_uses_latency_model()
+    print("OK")
@@ -0,0 +1,72 @@
+from io import BytesIO
+
+from PIL import Image
+
+from services.output_profiles import get_output_profile
+from services.payload_optimizer import PayloadOptimizer
+from services.tiling import plan_tiles, prepare_tiles, stitch_tiles
+
+
+def make_image(size, fmt="PNG", color=(200, 30, 30)):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def test_plan_tiles():
+    # 普通比例不分块
+    assert plan_tiles((1000, 1500)) is None
+    assert plan_tiles((1000, 1900)) is None
+
+    plan = plan_tiles((1000, 6000))
+    assert plan.vertical and plan.size_ratio == "2:3"
+    assert plan.count == 5
+    assert plan.boxes[0] == (0, 0, 1000, 1500)
+    assert plan.boxes[-1] == (0, 4500, 1000, 6000)
+    for previous, current in zip(plan.boxes, plan.boxes[1:]):
+        # 分块恰好为 2:3，相邻分块重叠不少于 10%
+        assert current[3] - current[1] == 1500
+        assert previous[3] - current[1] >= 150
+
+    wide = plan_tiles((4000, 1000))
+    assert not wide.vertical and wide.size_ratio == "3:2"
+    assert wide.boxes[0] == (0, 0, 1500, 1000)
+
+    # 分块数超过上限：按整图处理
+    assert plan_tiles((500, 20000), max_tiles=8) is None
+
+
+def test_prepare_and_stitch_tiles():
+    source = Image.new("RGB", (600, 2400), (255, 255, 255))
+    source.paste((0, 0, 200), (0, 1200, 600, 2400))
+    buffer = BytesIO()
+    source.save(buffer, format="PNG")
+
+    plan = plan_tiles(source.size)
+    tiles = prepare_tiles(buffer.getvalue(), plan, optimizer=PayloadOptimizer(max_long_edge=768))
+    assert len(tiles) == plan.count
+    for tile in tiles:
+        assert tile.size_ratio == "2:3"
+        assert tile.upload_size == (512, 768)
+
+    # 模拟 API：返回 1024x1536 的结果（上传内容原样放大）
+    results = []
+    for tile in tiles:
+        with Image.open(BytesIO(tile.payload)) as img:
+            result = BytesIO()
+            img.resize((1024, 1536)).save(result, format="PNG")
+            results.append(result.getvalue())
+
+    data = stitch_tiles(results, tiles, plan, get_output_profile("png"))
+    with Image.open(BytesIO(data)) as img:
+        assert img.size == (1024, 4096)
+        # 拼接后内容位置不变
+        assert img.getpixel((512, 1000)) == (255, 255, 255)
+        r, g, b = img.getpixel((512, 3000))
+        assert b > 150 and r < 30
+
+
+if __name__ == "__main__":
+    test_plan_tiles()
+    test_prepare_and_stitch_tiles()
+    print("OK")
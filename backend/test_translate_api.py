@@ -0,0 +1,362 @@
+import asyncio
+import contextlib
+import tempfile
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from unittest import mock
+
+import httpx
+from fastapi import FastAPI
+from PIL import Image
+from sqlmodel import Session, SQLModel, create_engine
+
+import routers.translate as translate_router
+import services.db as db
+import services.file_handler as file_handler
+from models.db_models import TranslationBatch, User
+from services import job_queue, job_worker
+from services.job_worker import JobWorker
+from services.security import create_access_token
+
+BOUNDARY = "test-boundary-5f1c"
+
+
+def make_image(size=(120, 80)):
+    buffer = BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def multipart_parts(parts):
+    """按给定顺序编码 multipart 请求体，每个部分单独成块（便于在部分之间暂停）"""
+    chunks = []
+    for name, value in parts:
+        if isinstance(value, tuple):
+            filename, data = value
+            header = (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                      f"Content-Type: image/png\r\n\r\n")
+        else:
+            header, data = f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n', value.encode()
+        chunks.append(header.encode() + data + b"\r\n")
+    chunks.append(f"--{BOUNDARY}--\r\n".encode())
+    return chunks
+
+
+class FakeService:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.limit = None
+        self.calls = []
+
+    def is_available(self):
+        return True
+
+    def capacity(self):
+        return self.limit
+
+    async def translate(self, input_path, output_dir, target_mode="original", output_profile=None, upload=None):
+        self.calls.append((upload.original_name, target_mode))
+        await asyncio.sleep(self.delay)
+        output = output_dir / f"translated_{input_path.stem}.jpg"
+        output.write_bytes(b"result")
+        return output
+
+
+class ApiEnv:
+    """独立的数据库、临时目录和翻译服务"""
+
+    def __init__(self, root, engine, user_id, service):
+        self.root = root
+        self.engine = engine
+        self.user_id = user_id
+        self.service = service
+        self.app = FastAPI()
+        self.app.include_router(translate_router.router)
+        self.headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+    def credits(self):
+        with Session(self.engine) as session:
+            return session.get(User, self.user_id).credits
+
+    def client(self):
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://test",
+                                 headers=self.headers, timeout=10)
+
+    def worker(self, concurrency=4):
+        return JobWorker(engine=self.engine, service_factory=lambda: self.service, worker_id="test",
+                         concurrency=concurrency, poll_interval=0.02)
+
+
+@contextlib.contextmanager
+def api_env(credits=10, delay=0.0):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        engine = create_engine(f"sqlite:///{tmp}/app.db", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            user = User(email="seller@example.com", hashed_password="x", credits=credits)
+            session.add(user)
+            session.commit()
+            user_id = user.id
+        service = FakeService(delay=delay)
+        with mock.patch.object(db, "engine", engine), \
+                mock.patch.object(file_handler, "TEMP_ROOT", root), \
+                mock.patch.object(translate_router, "TEMP_ROOT", root), \
+                mock.patch.object(job_worker, "TEMP_ROOT", root), \
+                mock.patch.object(translate_router, "get_translation_service", lambda: service), \
+                mock.patch.object(translate_router, "peek_translation_service", lambda: service):
+            yield ApiEnv(root, engine, user_id, service)
+
+
+async def wait_for_status(client, task_id, expected="completed"):
+    for _ in range(200):
+        status = (await client.get(f"/api/task-status/{task_id}")).json()
+        if status["status"] == expected:
+            return status
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"任务未到达 {expected}: {status}")
+
+
+def submit_async(env, chunks, pause_after=None, on_pause=None):
+    """提交异步批次并等待完成：pause_after 个部分发出后暂停，让工作循环有机会认领"""
+    async def body():
+        for index, chunk in enumerate(chunks):
+            yield chunk
+            if index + 1 == pause_after:
+                await asyncio.sleep(0.3)
+                if on_pause is not None:
+                    on_pause()
+
+    async def run():
+        worker = env.worker()
+        worker.start()
+        try:
+            with mock.patch.object(job_worker, "_job_worker", worker):
+                async with env.client() as client:
+                    response = await client.post(
+                        "/api/translate-bulk-async", content=body(),
+                        headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+                    )
+                    if response.status_code != 200:
+                        return response, None
+                    return response, await wait_for_status(client, response.json()["task_id"])
+        finally:
+            await worker.stop()
+
+    return asyncio.run(run())
+
+
+def test_async_fields_before_files_translate_while_uploading():
+    with api_env() as env:
+        chunks = multipart_parts([
+            ("target_mode", "ozon_3_4"),
+            ("output_profile", ""),
+            ("files", ("a.png", make_image())),
+            ("files", ("b.png", make_image())),
+        ])
+
+        def first_file_started():
+            # 字段在前：请求体还没结束，第一个文件已在翻译
+            assert env.service.calls == [("a.png", "ozon_3_4")]
+
+        response, status = submit_async(env, chunks, pause_after=4, on_pause=first_file_started)
+        assert response.status_code == 200
+        assert (status["success"], status["failed"]) == (2, 0)
+        assert sorted(env.service.calls) == [("a.png", "ozon_3_4"), ("b.png", "ozon_3_4")]
+        assert env.credits() == 8
+
+
+def test_async_fields_after_files_apply_to_every_file():
+    with api_env() as env:
+        chunks = multipart_parts([
+            ("files", ("a.png", make_image())),
+            ("files", ("b.png", make_image())),
+            ("target_mode", "ozon_3_4"),
+        ])
+
+        def nothing_started():
+            # 参数未确定：已入队的文件暂不翻译
+            assert env.service.calls == []
+
+        response, status = submit_async(env, chunks, pause_after=3, on_pause=nothing_started)
+        assert response.status_code == 200
+        assert (status["success"], status["failed"]) == (2, 0)
+        assert sorted(env.service.calls) == [("a.png", "ozon_3_4"), ("b.png", "ozon_3_4")]
+        assert env.credits() == 8
+
+
+def post_then_disconnect(env, chunks, pause_after):
+    """直接调用 ASGI 应用：发送前 pause_after 个部分，暂停后客户端断开"""
+    async def receive():
+        if chunks:
+            return {"type": "http.request", "body": chunks.pop(0), "more_body": True}
+        await asyncio.sleep(0.3)
+        return {"type": "http.disconnect"}
+
+    responses = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            responses.append(message["status"])
+
+    chunks = list(chunks[:pause_after])
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/api/translate-bulk-async", "raw_path": b"/api/translate-bulk-async",
+        "query_string": b"", "root_path": "", "client": ("test", 1), "server": ("test", 80),
+        "headers": [
+            (b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode()),
+            (b"authorization", env.headers["Authorization"].encode()),
+        ],
+    }
+    return env.app(scope, receive, send), responses
+
+
+def test_async_disconnect_charges_only_started_files():
+    with api_env(delay=0.6) as env:
+        chunks = multipart_parts([("target_mode", "original"), ("output_profile", "")] +
+                                 [("files", (f"{i}.png", make_image())) for i in range(3)])
+
+        async def run():
+            worker = env.worker(concurrency=1)
+            worker.start()
+            try:
+                with mock.patch.object(job_worker, "_job_worker", worker):
+                    # 第二个文件收完后断开：第一个已在翻译，第二个还在排队
+                    call, responses = post_then_disconnect(env, chunks, pause_after=5)
+                    await call
+                    assert responses == [400]
+                    [task_id] = [path.name for path in env.root.iterdir() if path.is_dir()]
+                    with Session(env.engine) as session:
+                        batch = job_queue.batch_status(session, task_id)
+                    assert batch["status"] == "failed" and [image["status"] for image in batch["images"]] == ["failed"]
+                    # 翻译中的图片结束前不清理上传目录
+                    assert (env.root / task_id / "input").exists()
+                    async with env.client() as client:
+                        for _ in range(100):
+                            status = (await client.get(f"/api/task-status/{task_id}")).json()
+                            if status["success"]:
+                                return status
+                            await asyncio.sleep(0.05)
+            finally:
+                await worker.stop()
+
+        status = asyncio.run(run())
+        assert status["status"] == "failed" and status["success"] == 1
+        assert [image["original_name"] for image in status["images"]] == ["0.png", "1.png"]
+        assert env.service.calls == [("0.png", "original")]
+        assert env.credits() == 9
+
+
+def post_bulk(env, files, path="/api/translate-bulk"):
+    async def run():
+        worker = env.worker()
+        worker.start()
+        try:
+            with mock.patch.object(job_worker, "_job_worker", worker):
+                async with env.client() as client:
+                    response = await client.post(path, data={"target_mode": "original"}, files=files)
+                    if path.endswith("async") and response.status_code == 200:
+                        return response, await wait_for_status(client, response.json()["task_id"])
+                    return response, None
+        finally:
+            await worker.stop()
+
+    return asyncio.run(run())
+
+
+def upload_files(good=2, bad=1):
+    files = [("files", (f"{i}.png", make_image(), "image/png")) for i in range(good)]
+    files += [("files", (f"bad{i}.txt", b"not an image", "text/plain")) for i in range(bad)]
+    return files
+
+
+def test_bulk_charges_only_accepted_files():
+    with api_env() as env:
+        response, _ = post_bulk(env, upload_files())
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["success"], body["failed"]) == (2, 1)
+        assert env.credits() == 8
+
+
+def test_bulk_async_charges_only_accepted_files():
+    with api_env() as env:
+        response, status = post_bulk(env, upload_files(), path="/api/translate-bulk-async")
+        assert response.status_code == 200
+        assert (status["success"], status["failed"]) == (2, 1)
+        assert status["images"][2]["error"] == "无法识别的图片文件"
+        assert env.credits() == 8
+
+
+def test_insufficient_credits():
+    # 同步接口：通过校验的文件多于积分时整批拒绝，不扣积分、不留临时文件
+    with api_env(credits=1) as env:
+        response, _ = post_bulk(env, upload_files(bad=0))
+        assert response.status_code == 403
+        assert env.credits() == 1
+        assert list(env.root.iterdir()) == [env.root / "app.db"]
+
+    # 异步接口：没有积分直接拒绝；积分用完后剩余的文件记为失败、不翻译
+    with api_env(credits=0) as env:
+        response, _ = post_bulk(env, upload_files(), path="/api/translate-bulk-async")
+        assert response.status_code == 403
+    with api_env(credits=1) as env:
+        response, status = post_bulk(env, upload_files(bad=0), path="/api/translate-bulk-async")
+        assert response.status_code == 200
+        assert (status["success"], status["failed"]) == (1, 1)
+        assert status["images"][1]["error"] == "积分不足 (Insufficient credits)"
+        assert env.service.calls == [("0.png", "original")]
+        assert env.credits() == 0
+
+
+def test_bulk_results_expire_and_are_cleaned_up():
+    with api_env() as env:
+        response, _ = post_bulk(env, upload_files(bad=0))
+        assert response.status_code == 200
+        request_id = response.json()["request_id"]
+        assert (env.root / request_id / "output").exists()
+
+        # 同步接口的结果登记到期清理，到期后由工作循环的定期清理删除临时目录和记录
+        with Session(env.engine) as session:
+            batch = session.get(TranslationBatch, request_id)
+            assert batch.status == "completed" and batch.user_id == env.user_id
+            assert batch.expires_at > datetime.utcnow()
+            batch.expires_at = datetime.utcnow()
+            session.add(batch)
+            session.commit()
+
+        async def sweep():
+            await env.worker()._sweep()
+
+        asyncio.run(sweep())
+        assert not (env.root / request_id).exists()
+        with Session(env.engine) as session:
+            assert session.get(TranslationBatch, request_id) is None
+
+
+def test_health_does_not_create_translation_service():
+    import main
+    import services.translation as translation
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            return (await client.get("/health")).json()
+
+    # 纯 Web 进程：不为健康检查创建翻译服务，上游状态由工作进程负责
+    with mock.patch.object(translation, "_translation_service", None):
+        assert asyncio.run(run()) == {"status": "healthy", "upstream": None, "upstream_source": "worker"}
+        assert translation.peek_translation_service() is None
+
+
+if __name__ == "__main__":
+    test_async_fields_before_files_translate_while_uploading()
+    test_async_fields_after_files_apply_to_every_file()
+    test_async_disconnect_charges_only_started_files()
+    test_bulk_charges_only_accepted_files()
+    test_bulk_async_charges_only_accepted_files()
+    test_insufficient_credits()
+    test_bulk_results_expire_and_are_cleaned_up()
+    test_health_does_not_create_translation_service()
+    print("OK")
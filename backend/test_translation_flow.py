@@ -0,0 +1,350 @@
+import asyncio
+import hashlib
+import json
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+import httpx
+from PIL import Image
+
+from services.circuit_breaker import CircuitOpenError
+from services.errors import TranslationError
+from services.file_handler import SavedUpload
+from services.http_client import UpstreamClients
+from services.image_workers import ImageProcessPool
+from services.payload_optimizer import PayloadOptimizer
+from services.result_cache import ResultCache
+from services.translation import RealTranslationService
+
+
+def make_image(size, fmt="JPEG", color=(200, 30, 30)):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+class FakeAPIMart:
+    """模拟 APIMart：提交 -> 轮询 -> 结果图片下载"""
+
+    def __init__(self, result_size=(1024, 1536), pending_polls=1, submit_status=200,
+                 poll_failures=(), download_failures=()):
+        self.result_size = result_size
+        self.submit_status = submit_status
+        self.pending_polls = pending_polls
+        # 依次返回的错误状态码，用完后恢复正常
+        self.poll_failures = list(poll_failures)
+        self.download_failures = list(download_failures)
+        self.submits = []
+        self.polls = 0
+        self.downloads = 0
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.url.host == "cdn.fake":
+            # 结果图片下载不应携带 API Key
+            assert "authorization" not in request.headers
+            self.downloads += 1
+            if self.download_failures:
+                return httpx.Response(self.download_failures.pop(0))
+            return httpx.Response(200, content=make_image(self.result_size))
+        assert request.headers["authorization"] == "Bearer sk-test"
+        if request.url.path == "/v1/images/generations":
+            self.submits.append(json.loads(request.read()))
+            if self.submit_status != 200:
+                return httpx.Response(self.submit_status)
+            return httpx.Response(200, json={"code": 200, "data": [{"task_id": f"task_{len(self.submits)}"}]})
+        if request.url.path.startswith("/v1/tasks/"):
+            if self.poll_failures:
+                return httpx.Response(self.poll_failures.pop(0), headers={"Retry-After": "0"})
+            self.polls += 1
+            if self.polls <= self.pending_polls:
+                return httpx.Response(200, json={"code": 200, "data": {"status": "processing", "progress": 50}})
+            return httpx.Response(200, json={"code": 200, "data": {
+                "status": "completed",
+                "progress": 100,
+                "result": {"images": [{"url": ["https://cdn.fake/result.jpg"]}]},
+            }})
+        return httpx.Response(404)
+
+
+def make_service(fake: FakeAPIMart, result_cache=None, **kwargs) -> RealTranslationService:
+    kwargs.setdefault("retry_policy", {"base_delay": 0.001, "max_delay": 0.01})
+    service = RealTranslationService(
+        api_key="sk-test",
+        api_endpoint="https://api.fake",
+        prompt="test",
+        poll_interval=0,
+        poll_max_attempts=5,
+        result_cache=result_cache,
+        http_clients=UpstreamClients("sk-test", "https://api.fake", transport=httpx.MockTransport(fake.handler)),
+        **kwargs,
+    )
+    return service
+
+
+def make_request_dirs(root: Path, request_id: str = "req00001"):
+    input_dir = root / request_id / "input"
+    output_dir = root / request_id / "output"
+    input_dir.mkdir(parents=True)
+    output_dir.mkdir(parents=True)
+    return input_dir, output_dir
+
+
+def test_translate_restores_original_ratio():
+    fake = FakeAPIMart(result_size=(1024, 1536))
+    service = make_service(fake)
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir, output_dir = make_request_dirs(Path(tmp))
+        input_path = input_dir / "tall.jpg"
+        input_path.write_bytes(make_image((457, 1024)))
+
+        result_path = asyncio.run(service.translate(input_path, output_dir))
+
+        assert fake.submits[0]["size"] == "2:3"
+        assert fake.submits[0]["image_urls"][0].startswith("data:image/jpeg;base64,")
+        # 中间文件不落盘
+        assert sorted(p.name for p in input_dir.iterdir()) == ["tall.jpg"]
+        with Image.open(result_path) as img:
+            assert img.height == 1536 and abs(img.width - 685) <= 1
+
+
+def test_translate_with_payload_optimizer():
+    fake = FakeAPIMart(result_size=(1024, 1536))
+    service = make_service(fake, payload_optimizer=PayloadOptimizer(max_long_edge=512))
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir, output_dir = make_request_dirs(Path(tmp))
+        input_path = input_dir / "tall.png"
+        input_path.write_bytes(make_image((914, 2048), fmt="PNG"))
+
+        result_path = asyncio.run(service.translate(input_path, output_dir))
+
+        assert fake.submits[0]["image_urls"][0].startswith("data:image/jpeg;base64,")
+        # 上传缩小不影响比例恢复
+        with Image.open(result_path) as img:
+            assert img.height == 1536 and abs(img.width - 685) <= 1
+        assert service.payload_optimizer.stats()["images"] == 1
+
+
+def test_translate_with_process_pool():
+    fake = FakeAPIMart(result_size=(1024, 1536))
+    service = make_service(
+        fake, payload_optimizer=PayloadOptimizer(max_long_edge=512), image_pool=ImageProcessPool(max_workers=1)
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir, output_dir = make_request_dirs(Path(tmp))
+        input_path = input_dir / "tall.png"
+        input_path.write_bytes(make_image((914, 2048), fmt="PNG"))
+
+        async def run():
+            try:
+                return await service.translate(input_path, output_dir)
+            finally:
+                await service.close()
+
+        result_path = asyncio.run(run())
+
+        assert fake.submits[0]["size"] == "2:3"
+        with Image.open(result_path) as img:
+            assert img.height == 1536 and abs(img.width - 685) <= 1
+        metrics = service.metrics()
+        assert metrics["image_pool"]["completed"] == 2
+        assert metrics["payload_optimizer"]["images"] == 1
+
+
+def test_translate_tall_image_in_tiles():
+    fake = FakeAPIMart(result_size=(1024, 1536), pending_polls=0)
+    service = make_service(fake, tiling={"min_aspect": 2.0, "overlap_ratio": 0.1, "max_tiles": 8})
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir, output_dir = make_request_dirs(Path(tmp))
+        input_path = input_dir / "long.png"
+        input_path.write_bytes(make_image((800, 3200), fmt="PNG"))
+
+        result_path = asyncio.run(service.translate(input_path, output_dir))
+
+        # 分块恰好为 2:3，不再整图填充
+        assert len(fake.submits) == 3
+        assert all(submit["size"] == "2:3" for submit in fake.submits)
+        assert fake.downloads == 3
+        with Image.open(result_path) as img:
+            assert img.size == (1024, 4096)
+        assert service.metrics()["tiling"]["tiles_submitted"] == 3
+
+    # Ozon 模式整体拉伸到 3:4，不分块
+    fake = FakeAPIMart(result_size=(1024, 1536), pending_polls=0)
+    service = make_service(fake, tiling={"min_aspect": 2.0})
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir, output_dir = make_request_dirs(Path(tmp))
+        input_path = input_dir / "long.png"
+        input_path.write_bytes(make_image((800, 3200), fmt="PNG"))
+        asyncio.run(service.translate(input_path, output_dir, target_mode="ozon_3_4"))
+        assert len(fake.submits) == 1
+
+
+def test_translate_output_profile():
+    fake = FakeAPIMart(result_size=(1536, 1024))
+    service = make_service(fake)
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir, output_dir = make_request_dirs(Path(tmp))
+        input_path = input_dir / "photo.jpg"
+        input_path.write_bytes(make_image((800, 600)))
+
+        result_path = asyncio.run(service.translate(input_path, output_dir, output_profile="webp"))
+
+        assert result_path.name == "translated_photo.webp"
+        with Image.open(result_path) as img:
+            assert img.format == "WEBP"
+            assert img.height == 1024 and abs(img.width - 1365) <= 1
+
+
+def test_translate_ozon_mode():
+    fake = FakeAPIMart(result_size=(1024, 1536))
+    service = make_service(fake)
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir, output_dir = make_request_dirs(Path(tmp))
+        input_path = input_dir / "tall.jpg"
+        input_path.write_bytes(make_image((487, 1024)))
+
+        result_path = asyncio.run(service.translate(input_path, output_dir, target_mode="ozon_3_4"))
+
+        with Image.open(result_path) as img:
+            assert abs(img.width / img.height - 0.75) < 0.01
+
+
+def test_translate_reuses_cached_result():
+    fake = FakeAPIMart(result_size=(1024, 1024))
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        service = make_service(fake, result_cache=ResultCache(tmp / "cache", max_bytes=50 * 1024 * 1024))
+        data = make_image((800, 600))
+        for request_id in ("req00001", "req00002"):
+            input_dir, output_dir = make_request_dirs(tmp, request_id)
+            (input_dir / "same.jpg").write_bytes(data)
+            result_path = asyncio.run(service.translate(input_dir / "same.jpg", output_dir))
+            assert result_path.exists()
+
+        assert len(fake.submits) == 1
+        assert service.result_cache.stats()["hits"] == 1
+
+        # 上传时已计算哈希：缓存命中时不读取输入文件
+        input_dir, output_dir = make_request_dirs(tmp, "req00003")
+        upload = SavedUpload(
+            path=input_dir / "missing.jpg", original_name="missing.jpg", size=len(data),
+            content_hash=hashlib.sha256(data).hexdigest(), format="JPEG", dimensions=(800, 600),
+        )
+        result_path = asyncio.run(service.translate(upload.path, output_dir, upload=upload))
+        assert result_path.exists() and not upload.path.exists()
+        assert len(fake.submits) == 1
+
+
+def test_circuit_breaker_fails_fast():
+    fake = FakeAPIMart(submit_status=503)
+    service = make_service(fake, circuit_breaker={"min_requests": 3, "open_seconds": 60})
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir, output_dir = make_request_dirs(Path(tmp))
+        input_path = input_dir / "a.jpg"
+        input_path.write_bytes(make_image((600, 600)))
+
+        async def run():
+            errors = []
+            for _ in range(5):
+                try:
+                    await service.translate(input_path, output_dir)
+                except TranslationError as e:
+                    errors.append(e)
+            return errors
+
+        errors = asyncio.run(run())
+
+    assert len(errors) == 5
+    assert isinstance(errors[-1], CircuitOpenError)
+    assert not service.is_available()
+    # 熔断后不再打到上游
+    assert len(fake.submits) == 3
+
+
+def test_retries_idempotent_requests_but_not_submit_errors():
+    fake = FakeAPIMart(result_size=(1024, 1024), poll_failures=[503, 429], download_failures=[502])
+    service = make_service(fake)
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir, output_dir = make_request_dirs(Path(tmp))
+        input_path = input_dir / "a.jpg"
+        input_path.write_bytes(make_image((600, 600)))
+
+        assert asyncio.run(service.translate(input_path, output_dir)).exists()
+        assert service.retries == {"submit": 0, "status": 2, "download": 1}
+
+        # 提交是非幂等请求：500 可能已在上游创建任务，不重试
+        fake.submit_status = 500
+        try:
+            asyncio.run(service.translate(input_path, output_dir))
+            assert False, "应当失败"
+        except TranslationError:
+            pass
+        assert len(fake.submits) == 2
+
+
+def test_retry_budget_limits_retries_per_image():
+    fake = FakeAPIMart(submit_status=429)
+    service = make_service(fake, retry_budget=2)
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir, output_dir = make_request_dirs(Path(tmp))
+        input_path = input_dir / "a.jpg"
+        input_path.write_bytes(make_image((600, 600)))
+        try:
+            asyncio.run(service.translate(input_path, output_dir))
+            assert False, "应当失败"
+        except TranslationError:
+            pass
+
+    # 首次 + 预算内 2 次重试（单次调用最多 4 次尝试）
+    assert len(fake.submits) == 3
+    assert service.retry_budget_exhausted == 1
+
+
+def test_prepared_payloads_wait_under_preprocess_slots():
+    fake = FakeAPIMart(result_size=(1024, 1024), pending_polls=0)
+    service = make_service(fake, preprocess_concurrency=1, max_inflight_tasks=1)
+    counts = {"prepared": 0, "submitted": 0, "peak_waiting": 0}
+    run_prepare, submit_and_wait = service._run_prepare, service._submit_and_wait
+
+    async def counting_prepare(*args, **kwargs):
+        prepared = await run_prepare(*args, **kwargs)
+        counts["prepared"] += 1
+        counts["peak_waiting"] = max(counts["peak_waiting"], counts["prepared"] - counts["submitted"])
+        return prepared
+
+    async def slow_submit(*args, **kwargs):
+        counts["submitted"] += 1
+        await asyncio.sleep(0.05)
+        return await submit_and_wait(*args, **kwargs)
+
+    service._run_prepare, service._submit_and_wait = counting_prepare, slow_submit
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir, output_dir = make_request_dirs(Path(tmp))
+        paths = []
+        for i in range(4):
+            paths.append(input_dir / f"{i}.jpg")
+            paths[-1].write_bytes(make_image((512, 512), color=(i * 40, 30, 30)))
+
+        async def run():
+            return await asyncio.gather(*(service.translate(path, output_dir) for path in paths))
+
+        assert len(asyncio.run(run())) == 4
+    # 在途名额被占满时，已预处理、等待提交的图片不超过预处理并发
+    assert counts["peak_waiting"] == 1
+    assert (service.preprocess_slots.in_use, service.inflight_slots.in_use) == (0, 0)
+
+
+if __name__ == "__main__":
+    test_translate_restores_original_ratio()
+    test_translate_with_payload_optimizer()
+    test_translate_with_process_pool()
+    test_translate_tall_image_in_tiles()
+    test_translate_output_profile()
+    test_translate_ozon_mode()
+    test_translate_reuses_cached_result()
+    test_circuit_breaker_fails_fast()
+    test_retries_idempotent_requests_but_not_submit_errors()
+    test_retry_budget_limits_retries_per_image()
+    test_prepared_payloads_wait_under_preprocess_slots()
+    print("OK")
@@ -0,0 +1,123 @@
+import asyncio
+import hashlib
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+import httpx
+from PIL import Image
+
+from services.admission import AdmissionPolicy, RejectedUpload
+from services.file_handler import SavedUpload
+from services.upload_stream import MultipartError, iter_multipart_uploads
+
+
+def make_image(size, fmt="PNG"):
+    buffer = BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def encode_multipart(data, files):
+    request = httpx.Request("POST", "http://test/upload", data=data, files=files)
+    return request.headers["content-type"], request.read()
+
+
+def test_fields_and_files_in_order():
+    images = [make_image((120 + i, 80), fmt="JPEG") for i in range(3)]
+    content_type, body = encode_multipart(
+        {"target_mode": "ozon_3_4"},
+        [("files", (f"{i}.jpg", image, "image/jpeg")) for i, image in enumerate(images)],
+    )
+
+    async def chunks():
+        # 小块发送，部分边界和头部跨块
+        for start in range(0, len(body), 7):
+            yield body[start:start + 7]
+
+    async def run(dest_dir):
+        return [item async for item in iter_multipart_uploads(content_type, chunks(), dest_dir)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        items = asyncio.run(run(Path(tmp)))
+
+        assert items[0] == ("target_mode", "ozon_3_4")
+        assert [name for name, _ in items[1:]] == ["files"] * 3
+        for i, (_, saved) in enumerate(items[1:]):
+            assert isinstance(saved, SavedUpload)
+            assert saved.original_name == f"{i}.jpg"
+            assert saved.path.read_bytes() == images[i]
+            assert saved.content_hash == hashlib.sha256(images[i]).hexdigest()
+            assert saved.format == "JPEG" and saved.dimensions == (120 + i, 80)
+
+
+def test_files_are_yielded_before_body_ends():
+    images = [make_image((64, 64)) for _ in range(2)]
+    content_type, body = encode_multipart({}, [("files", (f"{i}.png", image, "image/png"))
+                                               for i, image in enumerate(images)])
+    second_part = body.index(b"1.png")
+    received = []
+
+    async def chunks():
+        yield body[:second_part]
+        # 第一个文件在请求体接收完之前就已交给调用方
+        await asyncio.sleep(0)
+        assert len(received) == 1
+        yield body[second_part:]
+
+    async def run(dest_dir):
+        async for _, saved in iter_multipart_uploads(content_type, chunks(), dest_dir):
+            received.append(saved)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(Path(tmp)))
+        assert [saved.original_name for saved in received] == ["0.png", "1.png"]
+
+
+def test_truncated_body_removes_partial_file():
+    content_type, body = encode_multipart({}, [("files", ("big.png", make_image((300, 300)), "image/png"))])
+
+    async def chunks():
+        yield body[:len(body) // 2]
+
+    async def run(dest_dir):
+        return [item async for item in iter_multipart_uploads(content_type, chunks(), dest_dir)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            asyncio.run(run(Path(tmp)))
+            assert False, "应当失败"
+        except MultipartError:
+            pass
+        assert list(Path(tmp).iterdir()) == []
+
+
+def test_oversized_file_is_dropped_while_streaming():
+    small = make_image((64, 64))
+    content_type, body = encode_multipart({}, [
+        ("files", ("big.png", make_image((64, 64)) + b"\0" * 300_000, "image/png")),
+        ("files", ("small.png", small, "image/png")),
+    ])
+    policy = AdmissionPolicy(max_bytes=100_000)
+
+    async def chunks():
+        for start in range(0, len(body), 16 * 1024):
+            yield body[start:start + 16 * 1024]
+
+    async def run(dest_dir):
+        return [item async for item in iter_multipart_uploads(content_type, chunks(), dest_dir, admission=policy)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        items = asyncio.run(run(Path(tmp)))
+
+        assert items[0] == ("files", RejectedUpload("big.png", "文件超过 0.1MB"))
+        assert items[1][1].original_name == "small.png" and items[1][1].path.read_bytes() == small
+        assert [path.name for path in Path(tmp).iterdir()] == [items[1][1].path.name]
+
+
+if __name__ == "__main__":
+    test_fields_and_files_in_order()
+    test_files_are_yielded_before_body_ends()
+    test_truncated_body_removes_partial_file()
+    test_oversized_file_is_dropped_while_streaming()
+    print("OK")
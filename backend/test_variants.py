@@ -0,0 +1,101 @@
+import asyncio
+import gc
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+from unittest import mock
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import routers.translate as translate_router
+from services.variants import parse_variant_spec, render_variant
+
+
+def make_client() -> TestClient:
+    app = FastAPI()
+    app.include_router(translate_router.router)
+    return TestClient(app)
+
+
+def test_spec_allow_list():
+    assert parse_variant_spec(320, None, "webp").key == "w320_h0_q75.webp"
+    for args in ((None, None, "webp"), (333, None, "webp"), (320, None, "gif"), (320, None, "webp", 77)):
+        try:
+            parse_variant_spec(*args)
+            assert False, f"应当拒绝: {args}"
+        except ValueError:
+            pass
+
+
+def test_variant_render_cache_and_etag():
+    with tempfile.TemporaryDirectory() as tmp:
+        temp_root = Path(tmp)
+        output_dir = temp_root / "req00001" / "output"
+        output_dir.mkdir(parents=True)
+        Image.new("RGB", (1024, 1536), (10, 120, 200)).save(output_dir / "translated_a.jpg")
+
+        with mock.patch.object(translate_router, "TEMP_ROOT", temp_root):
+            client = make_client()
+            url = "/api/variants/req00001/output/translated_a.jpg?w=320&fmt=webp"
+
+            first = client.get(url)
+            assert first.status_code == 200
+            assert first.headers["content-type"] == "image/webp"
+            with Image.open(BytesIO(first.content)) as img:
+                assert img.size == (320, 480)
+            assert len(list((temp_root / "req00001" / "variants").iterdir())) == 1
+
+            # 缓存命中不再经过 PIL
+            with mock.patch.object(translate_router, "render_variant", side_effect=AssertionError):
+                second = client.get(url)
+                assert second.content == first.content
+                not_modified = client.get(url, headers={"If-None-Match": first.headers["etag"]})
+                assert not_modified.status_code == 304
+
+            assert client.get("/api/variants/req00001/output/translated_a.jpg?w=321").status_code == 400
+            assert client.get("/api/variants/req00001/input/a.jpg?w=320").status_code == 403
+
+
+def test_concurrent_requests_render_once_and_release_locks():
+    with tempfile.TemporaryDirectory() as tmp:
+        temp_root = Path(tmp)
+        output_dir = temp_root / "req00002" / "output"
+        output_dir.mkdir(parents=True)
+        Image.new("RGB", (600, 900), (10, 120, 200)).save(output_dir / "translated_b.jpg")
+        Image.new("RGB", (600, 900), (10, 120, 200)).save(output_dir / "translated_c.jpg")
+        renders = []
+
+        def slow_render(path, spec):
+            renders.append(path.name)
+            time.sleep(0.1)
+            if path.name == "translated_c.jpg":
+                raise OSError("损坏的图片")
+            return render_variant(path, spec)
+
+        async def fetch_all(name):
+            app = make_client().app
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                url = f"/api/variants/req00002/output/{name}?w=320&fmt=webp"
+                responses = await asyncio.gather(*(client.get(url) for _ in range(5)))
+            return [response.status_code for response in responses]
+
+        with mock.patch.object(translate_router, "TEMP_ROOT", temp_root), \
+                mock.patch.object(translate_router, "render_variant", side_effect=slow_render):
+            assert asyncio.run(fetch_all("translated_b.jpg")) == [200] * 5
+            assert renders == ["translated_b.jpg"]
+            # 渲染失败也不残留锁
+            assert asyncio.run(fetch_all("translated_c.jpg")) == [422] * 5
+        # 异常的 traceback 可能形成引用环，回收后锁即释放
+        gc.collect()
+        assert len(translate_router._variant_locks) == 0
+
+
+if __name__ == "__main__":
+    test_spec_allow_list()
+    test_variant_render_cache_and_etag()
+    test_concurrent_requests_render_once_and_release_locks()
+    print("OK")
@@ -0,0 +1,84 @@
+"""
+翻译任务工作进程 - 独立于 Web 服务运行的工作循环
+与 Web 服务共用数据库和 temp 目录，从任务队列按租约认领图片执行，
+翻译容量通过增加工作进程扩展，不受 Web 服务 worker 数量限制
+
+用法（在 backend 目录下）：
+    python -m worker [--concurrency 16] [--worker-id host-1]
+
+Web 服务设置 EMBEDDED_WORKER=false 后只负责接收上传和查询进度
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+from typing import Optional, Sequence
+
+from services.db import init_db
+from services.executors import shutdown_executors
+from services.file_handler import ensure_temp_root_exists
+from services.job_worker import create_job_worker
+from services.translation import close_translation_service, get_translation_service
+
+# 配置日志格式
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S"
+)
+
+logger = logging.getLogger("worker")
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """解析命令行参数（未指定的使用 .env 中的配置）"""
+    parser = argparse.ArgumentParser(description="图片翻译任务工作进程")
+    parser.add_argument("--concurrency", type=int, default=None, help="同时执行的图片数上限（默认 JOB_WORKER_CONCURRENCY）")
+    parser.add_argument("--worker-id", default=None, help="租约持有者标识（默认 主机名:进程号:随机后缀）")
+    return parser.parse_args(argv)
+
+
+async def run_worker(concurrency: Optional[int] = None, worker_id: Optional[str] = None) -> None:
+    """运行工作循环，直到收到 SIGINT / SIGTERM"""
+    logger.info("🚀 翻译任务工作进程启动中...")
+    ensure_temp_root_exists()
+    init_db()
+
+    # 创建共享翻译服务并预热上游连接池
+    await get_translation_service().warmup()
+
+    overrides = {}
+    if concurrency is not None:
+        overrides["concurrency"] = concurrency
+    if worker_id:
+        overrides["worker_id"] = worker_id
+    worker = create_job_worker(**overrides)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows 不支持，Ctrl+C 时由 asyncio.run 取消
+            pass
+
+    worker.start()
+    try:
+        await stop.wait()
+    finally:
+        # 执行中的图片退回队列，由其他工作进程继续处理
+        logger.info("👋 翻译任务工作进程正在关闭...")
+        await worker.stop()
+        await close_translation_service()
+        shutdown_executors()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    asyncio.run(run_worker(concurrency=args.concurrency, worker_id=args.worker_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -184,6 +184,8 @@ function App() {
 
   // 翻译模式状态
   const [targetMode, setTargetMode] = useState<"original" | "ozon_3_4">("original");
+  // 输出格式
+  const [outputProfile, setOutputProfile] = useState<"ozon_jpeg" | "webp" | "png">("ozon_jpeg");
 
   // 文件选择处理
   // 文件选择处理
@@ -223,12 +225,13 @@ function App() {
 
     try {
       // 构建 FormData
+      // 表单字段放在文件之前：后端收到第一个文件时参数已确定，可以边接收边翻译
       const formData = new FormData();
+      formData.append("target_mode", targetMode);
+      formData.append("output_profile", outputProfile);
       selectedFiles.forEach((file) => {
         formData.append("files", file);
       });
-      // 添加目标模式
-      formData.append("target_mode", targetMode);
 
       // 提交翻译任务（立即返回任务ID）
       const submitResponse = await axios.post<{
@@ -304,7 +307,7 @@ function App() {
         setErrorMessage("提交任务失败，请检查网络连接或稍后重试");
       }
     }
-  }, [selectedFiles, targetMode, token, fetchBalance]);
+  }, [selectedFiles, targetMode, outputProfile, token, fetchBalance]);
 
   // 下载单张图片
   const handleDownloadImage = useCallback((image: TranslatedImage) => {
@@ -542,6 +545,21 @@ function App() {
                   </div>
                 </div>
 
+                <div className="mt-4 flex items-center gap-3">
+                  <label htmlFor="output-profile" className="text-sm font-medium text-slate-600">输出格式</label>
+                  <select
+                    id="output-profile"
+                    value={outputProfile}
+                    disabled={isProcessing}
+                    onChange={(e) => setOutputProfile(e.target.value as "ozon_jpeg" | "webp" | "png")}
+                    className="text-sm border border-slate-200 rounded-md px-2 py-1 bg-white text-slate-700"
+                  >
+                    <option value="ozon_jpeg">JPEG（Ozon 上传推荐）</option>
+                    <option value="webp">WebP（体积最小）</option>
+                    <option value="png">PNG（无损）</option>
+                  </select>
+                </div>
+
                 {/* Status Bar */}
                 <div className="mt-8 pt-6 border-t border-slate-100 flex items-center justify-between">
                   <div className="flex items-center gap-3">
@@ -623,8 +641,9 @@ function App() {
                     {image.status === "success" ? (
                       <>
                         <img
-                          src={`/api/download/${image.file_path}`}
+                          src={`/api/variants/${image.file_path}?w=480&fmt=webp`}
                           alt={image.translated_name}
+                          loading="lazy"
                           className="w-full h-full object-cover"
                         />
                         <div className="absolute inset-0 bg-slate-900/50 opacity-0 group-hover:opacity-100 transition-opacity flex items-center justify-center">